@@ -11,8 +11,17 @@ from src.api.v1.routes.comment import router as comment_router
 from src.api.v1.routes.user import router as user_router
 from src.api.v1.routes.article import router as article_router
 from src.api.v1.routes.ai import router as ai_router
+from src.api.v1.routes.file import router as file_router
 from app.websockets.ticket_events import router as ticket_ws_router
 from app.websockets.connection import connection_manager
+from src.services.kb_vector_service import KBVectorService
+from src.services.duplicate_service import DuplicateService
+from src.services.search import SearchService
+from src.services.suggest_service import SuggestService
+from src.services.tag_service import TagService
+from src.services.related_service import RelatedArticleService
+from src.services.file_service import file_service
+from src.utils import process_pool
 
 import sys
 import os
@@ -21,7 +30,19 @@ sys.path.append(os.path.join(os.path.dirname(__file__), "src"))
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await init_db()
+    await TagService.ensure_indexes()
+    await file_service.ensure_indexes()
+    await KBVectorService.initialize()
+    await DuplicateService.initialize()
+    await SearchService.initialize()
+    # ENHANCEMENT L2 KB EMBEDDINGS - Re-embed articles written by other workers
+    SearchService.add_listener(KBVectorService.article_changed)
+    await SuggestService.initialize()
+    RelatedArticleService.initialize()
     yield
+    await KBVectorService.snapshot()
+    await SearchService.snapshot()
+    process_pool.shutdown()
     await connection_manager.shutdown()
 
 app = FastAPI(
@@ -72,4 +93,5 @@ app.include_router(comment_router, prefix="/api/v1")
 app.include_router(user_router, prefix="/api/v1")
 app.include_router(article_router, prefix="/api/v1")
 app.include_router(ai_router, prefix="/api/v1")
+app.include_router(file_router, prefix="/api/v1")
 app.include_router(ticket_ws_router)
\ No newline at end of file
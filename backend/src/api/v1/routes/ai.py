@@ -3,6 +3,7 @@ from src.schemas.summary import TicketSummaryResponse
 from src.schemas.closing_comments import ClosingComments
 from src.utils.security import get_current_agent_user
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 
 
 router = APIRouter(prefix="/tickets", tags=["Tickets"], dependencies=[Depends(get_current_agent_user)])
@@ -18,6 +19,20 @@ async def summarize_ticket(ticket_id: str):
         raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+# ENHANCEMENT L1 AI TICKET SUMMARY STREAMING - Relay summary tokens over server-sent events
+@router.get("/{ticket_id}/summary/stream")
+async def stream_ticket_summary(ticket_id: str):
+    events = await AIService.stream_ticket_summary(ticket_id)
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
+    )
+
 @router.get("/{ticket_id}/closing_comments", response_model=ClosingComments)
 async def summarize_ticket(ticket_id: str):
     try:
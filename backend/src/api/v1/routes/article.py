@@ -1,5 +1,5 @@
-from fastapi import APIRouter, HTTPException, Depends
-from src.schemas.article import ArticleCreate, ArticleUpdate, ArticleResponse
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from src.schemas.article import ArticleCreate, ArticleUpdate, ArticleResponse, ArticleSuggestion, ArticleSearchResponse, DeflectRequest, DeflectResponse
 from beanie import PydanticObjectId
 from src.services.article_service import ArticleService
 from src.services.ai_service import AIService
@@ -7,6 +7,7 @@ from typing import List
 from src.utils.security import get_current_agent_user, get_current_user
 from pydantic import BaseModel
 from src.services.search import SearchService
+from src.services.kb_cache import KBResultCache
 
 router = APIRouter(prefix="/articles", tags=["Articles"])
 
@@ -44,29 +45,83 @@ async def delete_article(article_id: str):
     return {"message": "Article deleted"}
 
 # Public routes (all authenticated users can browse)
+# ENHANCEMENT L2 KB RESULT CACHE - List and search responses are cached per KB generation, with ETags
 @router.get("/", response_model=List[ArticleResponse], dependencies=[Depends(get_current_user)])
-async def get_all_articles():
-    return await ArticleService.get_all_articles()
+async def get_all_articles(request: Request):
+    return await KBResultCache.respond(request, "all", {}, ArticleService.get_all_articles, List[ArticleResponse])
 
 # ENHANCEMENT L1 KB TITLE SEARCH - Search endpoint (must come before parameterized routes)
 @router.get("/search", response_model=List[ArticleResponse], dependencies=[Depends(get_current_user)])
-async def search_articles(q: str, categoryId: str = None, subcategoryId: str = None):
-    return await ArticleService.search_articles(q, categoryId, subcategoryId)
+async def search_articles(request: Request, q: str, categoryId: str = None, subcategoryId: str = None):
+    query = KBResultCache.normalize_query(q)
+    return await KBResultCache.respond(
+        request,
+        "search",
+        {"q": query, "categoryId": categoryId, "subcategoryId": subcategoryId},
+        lambda: ArticleService.search_articles(query, categoryId, subcategoryId),
+        List[ArticleResponse],
+    )
+
+# ENHANCEMENT L2 KB FACETS - Hits plus category, subcategory and AI tag counts in one round trip
+@router.get("/search/faceted", response_model=ArticleSearchResponse, dependencies=[Depends(get_current_user)])
+async def search_articles_faceted(request: Request, q: str, categoryId: str = None, subcategoryId: str = None):
+    query = KBResultCache.normalize_query(q)
+    return await KBResultCache.respond(
+        request,
+        "search_faceted",
+        {"q": query, "categoryId": categoryId, "subcategoryId": subcategoryId},
+        lambda: ArticleService.search_articles_faceted(query, categoryId, subcategoryId),
+        ArticleSearchResponse,
+    )
+
+# ENHANCEMENT L2 KB SUGGEST - Search-box autocomplete (must come before parameterized routes)
+@router.get("/suggest", response_model=List[ArticleSuggestion], dependencies=[Depends(get_current_user)])
+async def suggest_articles(q: str, limit: int = Query(8, ge=1, le=20)):
+    return await ArticleService.suggest(q, limit)
+
+# ENHANCEMENT L2 KB DEFLECTION - Suggest articles while a ticket is drafted (called as the user types)
+@router.post("/deflect", response_model=DeflectResponse, dependencies=[Depends(get_current_user)])
+async def deflect_articles(request: Request, draft: DeflectRequest):
+    # Keystrokes inside a word produce the same terms, so they share one cache entry
+    terms = SearchService.deflection_terms(draft.title, draft.description)
+    return await KBResultCache.respond(
+        request,
+        "deflect",
+        {"terms": " ".join(terms), "categoryId": draft.category_id, "subcategoryId": draft.subcategory_id, "limit": draft.limit},
+        lambda: ArticleService.deflect_articles(terms, draft.category_id, draft.subcategory_id, draft.limit),
+        DeflectResponse,
+        # Results cut short by the latency budget are retried on the next keystroke
+        cacheable=lambda result: result.complete,
+    )
 
 @router.get("/category/{category_id}", response_model=List[ArticleResponse], dependencies=[Depends(get_current_user)])
-async def get_articles_by_category(category_id: str):
-    return await ArticleService.get_articles_by_category(category_id)
+async def get_articles_by_category(request: Request, category_id: str):
+    return await KBResultCache.respond(
+        request,
+        "category",
+        {"id": category_id},
+        lambda: ArticleService.get_articles_by_category(category_id),
+        List[ArticleResponse],
+    )
 
 @router.get("/subcategory/{subcategory_id}", response_model=List[ArticleResponse], dependencies=[Depends(get_current_user)])
-async def get_articles_by_subcategory(subcategory_id: str):
-    return await ArticleService.get_articles_by_subcategory(subcategory_id)
+async def get_articles_by_subcategory(request: Request, subcategory_id: str):
+    return await KBResultCache.respond(
+        request,
+        "subcategory",
+        {"id": subcategory_id},
+        lambda: ArticleService.get_articles_by_subcategory(subcategory_id),
+        List[ArticleResponse],
+    )
 
 @router.get("/{article_id}", response_model=ArticleResponse, dependencies=[Depends(get_current_user)])
 async def get_article(article_id: str):
     try:
-        return await ArticleService.get_article(article_id)
+        article = await ArticleService.get_article(article_id)
     except Exception as e:
         raise HTTPException(status_code=404, detail=str(e))
+    await ArticleService.record_view(article)
+    return article
 
 # ENHANCEMENT L2 AI KB TAGS - AI tag generation endpoints
 @router.post("/generate-tags", response_model=GenerateTagsResponse, dependencies=[Depends(get_current_agent_user)])
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, HTTPException
 from src.schemas.category import CategoryCreate, CategoryResponse, CategoryUpdate
 from src.services.category_service import CategoryService
+from src.services.search import SearchService
 from typing import List
 from beanie import PydanticObjectId
 from src.schemas.subcategory import SubCategoryResponse
@@ -32,11 +33,13 @@ async def update_category(category_id: str, category: CategoryUpdate):
     updated = await CategoryService.update_category(category_id, category)
     if not updated:
         raise HTTPException(status_code=404, detail="Category not found")
+    await SearchService.kb_metadata_changed("categoryId", category_id)
     return updated
 
 @router.delete("/{category_id}")
 async def delete_category(category_id: str):
     await CategoryService.delete_category(category_id)
+    await SearchService.kb_metadata_changed("categoryId", category_id)
     return {"status": "deleted"}
 
 @router.get("/", response_model=List[CategoryResponse])
@@ -5,18 +5,24 @@ FastAPI routes for file upload, download, and attachment management
 Provides secure file handling with JWT authentication and GridFS storage
 """
 
-import io
-from typing import List
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
-from fastapi.responses import StreamingResponse
+from typing import List, Literal
+from beanie import PydanticObjectId
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, UploadFile
+from fastapi.responses import FileResponse, Response, StreamingResponse
 
 from ....schemas.file import (
     FileUploadResponse, 
     AttachFilesRequest, 
-    FileAttachmentResponse
+    FileAttachmentResponse,
+    StorageStatsResponse,
+    BatchUploadResponse
 )
+from ....core.config import settings
 from ....services.file_service import file_service
-from ....utils.security import get_current_user
+from ....services.ticket_service import TicketService
+from ....utils.security import get_current_user, get_current_agent_user
+from ....utils.http_range import RangeNotSatisfiable, parse_range
+from ....utils.http_cache import accepts_encoding, http_date, if_range_allows, not_modified
 
 router = APIRouter(prefix="/files", tags=["files"])
 
@@ -35,9 +41,26 @@ async def upload_file(
     return await file_service.upload_file(file, str(current_user.id))
 
 
+@router.post("/upload/batch", response_model=BatchUploadResponse)
+async def upload_files(
+    files: List[UploadFile] = File(...),
+    current_user = Depends(get_current_user)
+):
+    """
+    ENHANCEMENT L2 BATCH UPLOADS - Upload several files in one request
+    
+    - **files**: The files to upload (max 5 files, 5MB each)
+    - **Returns**: One result per file, in request order; failures do not affect the other files
+    """
+    results = await file_service.upload_files(files, str(current_user.id))
+    uploaded = sum(1 for result in results if result.file is not None)
+    return BatchUploadResponse(results=results, uploaded=uploaded, failed=len(results) - uploaded)
+
+
 @router.get("/{file_id}/download")
 async def download_file(
     file_id: str,
+    request: Request,
     current_user = Depends(get_current_user)
 ):
     """
@@ -45,26 +68,131 @@ async def download_file(
     Used for both file downloads and secure preview functionality
     
     - **file_id**: The ID of the file to download
+    - **Range**: Optional single byte range (e.g. `bytes=0-1023`), answered with 206 Partial Content
+    - **If-None-Match** / **If-Modified-Since**: Answered with 304 when the cached copy is current
+    - **Accept-Encoding**: Compressed files are sent as stored when it allows their encoding, decompressed otherwise
     - **Returns**: File content with appropriate headers
     """
-    file_content, file_doc = await file_service.get_file(file_id, str(current_user.id))
+    file_doc = await file_service.get_file_metadata(file_id, str(current_user.id))
+    
+    # ENHANCEMENT L2 FILE COMPRESSION - Pick the representation: the stored (encoded) bytes or the original ones
+    send_encoded = bool(file_doc.encoding) and accepts_encoding(request.headers.get("accept-encoding"), file_doc.encoding)
+    length = (file_doc.stored_size or file_doc.size) if send_encoded else file_doc.size
+    etag = file_service.etag(file_doc, file_doc.encoding if send_encoded else None)
+    headers = {
+        "Content-Disposition": f"attachment; filename=\"{file_doc.filename}\"",
+        "Cache-Control": "private, max-age=3600",
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        "Last-Modified": http_date(file_doc.upload_date),
+    }
+    if file_doc.encoding:
+        headers["Vary"] = "Accept-Encoding"
+    if send_encoded:
+        headers["Content-Encoding"] = file_doc.encoding
+    
+    # ENHANCEMENT L2 FILE ETAGS - Revalidation needs only the metadata and access check, never the content
+    if not_modified(request.headers, etag, file_doc.upload_date):
+        return Response(status_code=304, headers=headers)
+    
+    # ENHANCEMENT L2 STREAMING DOWNLOADS - Serve only the requested bytes, read from GridFS as they are sent
+    range_header = request.headers.get("range")
+    if not if_range_allows(request.headers, etag, file_doc.upload_date):
+        range_header = None  # The client's partial copy is stale; send the whole file
+    try:
+        byte_range = parse_range(range_header, length)  # Ranges address the representation being sent
+    except RangeNotSatisfiable:
+        raise HTTPException(status_code=416, detail="Requested range not satisfiable", headers={"Content-Range": f"bytes */{length}"})
     
+    grid_out = await file_service.open_file(file_doc)
+    
+    # ENHANCEMENT L2 FILE STORAGE - Content on the local engine is sent from its path, ranges included
+    # (unless it has to be decompressed on the way)
+    path = getattr(grid_out, "path", None)
+    if path is not None and (send_encoded or not file_doc.encoding):
+        grid_out.close()
+        if settings.file_storage_accel_prefix and not file_doc.encoding:
+            # nginx sends the file itself (sendfile, Range and all); the worker only checked access
+            headers["X-Accel-Redirect"] = f"{settings.file_storage_accel_prefix.rstrip('/')}/{grid_out.relative_path}"
+            return Response(media_type=file_doc.content_type, headers=headers)
+        return FileResponse(path, media_type=file_doc.content_type, headers=headers, stat_result=grid_out.stat)
+    
+    iter_content = file_service.iter_decoded if file_doc.encoding and not send_encoded else file_service.iter_file
+    if byte_range is None:
+        headers["Content-Length"] = str(length)
+        return StreamingResponse(iter_content(grid_out, 0, length - 1), media_type=file_doc.content_type, headers=headers)
+    
+    start, end = byte_range
+    headers["Content-Length"] = str(end - start + 1)
+    headers["Content-Range"] = f"bytes {start}-{end}/{length}"
     return StreamingResponse(
-        io.BytesIO(file_content),
+        iter_content(grid_out, start, end),
+        status_code=206,
         media_type=file_doc.content_type,
-        headers={
-            "Content-Disposition": f"attachment; filename=\"{file_doc.filename}\"",
-            "Content-Length": str(file_doc.size),
-            "Cache-Control": "private, max-age=3600"
-        }
+        headers=headers
     )
 
 
+@router.get("/{file_id}/preview")
+async def preview_file(
+    file_id: str,
+    request: Request,
+    size: Literal["thumb", "small", "medium"] = Query("small"),
+    current_user = Depends(get_current_user)
+):
+    """
+    ENHANCEMENT L2 FILE PREVIEWS - Thumbnail or web-sized preview of an image
+    
+    - **file_id**: The ID of an image file
+    - **size**: `thumb` (128px), `small` (480px) or `medium` (1280px) longest side
+    - **Returns**: WebP (or JPEG/PNG) image; generated on first request if the background job has not run yet
+    """
+    file_doc = await file_service.get_file_metadata(file_id, str(current_user.id))
+    preview_id = await file_service.get_preview_id(file_doc, size)
+    
+    # A preview never changes once stored; a regenerated one gets a new id and so a new ETag
+    etag = f'"{preview_id}"'
+    headers = {
+        "Cache-Control": "private, max-age=31536000, immutable",
+        "ETag": etag,
+        "Last-Modified": http_date(file_doc.upload_date),
+    }
+    if not_modified(request.headers, etag, file_doc.upload_date):
+        return Response(status_code=304, headers=headers)
+    
+    grid_out, content_type = await file_service.open_preview(preview_id)
+    headers["Content-Length"] = str(grid_out.length)
+    return StreamingResponse(file_service.iter_file(grid_out), media_type=content_type, headers=headers)
+
+
+@router.delete("/{file_id}")
+async def delete_file(
+    file_id: str,
+    current_user = Depends(get_current_user)
+):
+    """
+    ENHANCEMENT L2 FILE DEDUP - Delete a file you uploaded
+    
+    - **file_id**: The ID of the file to delete
+    - Shared content is only removed from storage when no other file references it
+    """
+    await file_service.delete_file(file_id, str(current_user.id))
+    return {"message": "File deleted"}
+
+
+@router.get("/storage/stats", response_model=StorageStatsResponse, dependencies=[Depends(get_current_agent_user)])
+async def get_storage_stats():
+    """
+    ENHANCEMENT L2 FILE DEDUP - Upload storage before and after content deduplication
+    """
+    return await file_service.get_storage_stats()
+
+
 # ENHANCEMENT L2: FILE ATTACHMENTS - Ticket file attachment routes
 
 @router.post("/tickets/{ticket_id}/attach", response_model=List[FileAttachmentResponse])
 async def attach_files_to_ticket(
-    ticket_id: str,
+    ticket_id: PydanticObjectId,
     request: AttachFilesRequest,
     current_user = Depends(get_current_user)
 ):
@@ -75,8 +203,11 @@ async def attach_files_to_ticket(
     - **file_ids**: List of file IDs to attach
     - **Returns**: List of attached file information
     """
+    if not await TicketService.can_access_ticket(ticket_id, current_user):
+        raise HTTPException(status_code=403, detail="Access denied")
+    
     return await file_service.attach_files_to_ticket(
-        ticket_id, 
+        str(ticket_id), 
         request.file_ids, 
         str(current_user.id)
     )
@@ -84,7 +215,7 @@ async def attach_files_to_ticket(
 
 @router.get("/tickets/{ticket_id}", response_model=List[FileAttachmentResponse])
 async def get_ticket_files(
-    ticket_id: str,
+    ticket_id: PydanticObjectId,
     current_user = Depends(get_current_user)
 ):
     """
@@ -93,4 +224,7 @@ async def get_ticket_files(
     - **ticket_id**: The ID of the ticket
     - **Returns**: List of attached files
     """
-    return await file_service.get_ticket_attachments(ticket_id)
\ No newline at end of file
+    if not await TicketService.can_access_ticket(ticket_id, current_user):
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    return await file_service.get_ticket_attachments(str(ticket_id))
\ No newline at end of file
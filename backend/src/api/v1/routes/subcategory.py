@@ -1,6 +1,7 @@
 from fastapi import APIRouter, HTTPException, Depends
 from src.schemas.subcategory import SubCategoryCreate, SubCategoryUpdate, SubCategoryResponse
 from src.services.subcategory_service import SubCategoryService
+from src.services.search import SearchService
 from src.utils.security import get_current_user
 from typing import List
 
@@ -32,9 +33,11 @@ async def update_subcategory(subcategory_id: str, subcategory: SubCategoryUpdate
     updated = await SubCategoryService.update_subcategory(subcategory_id, subcategory)
     if not updated:
         raise HTTPException(status_code=404, detail="SubCategory not found")
+    await SearchService.kb_metadata_changed("subCategoryId", subcategory_id)
     return updated
 
 @router.delete("/{subcategory_id}")
 async def delete_subcategory(subcategory_id: str):
     await SubCategoryService.delete_subcategory(subcategory_id)
+    await SearchService.kb_metadata_changed("subCategoryId", subcategory_id)
     return {"status": "deleted"}
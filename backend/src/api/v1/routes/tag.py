@@ -1,6 +1,8 @@
 from fastapi import APIRouter, HTTPException, Depends
+from pymongo.errors import DuplicateKeyError
 from src.schemas.tag import TagCreate, TagResponse, TagUpdate
 from src.services.tag_service import TagService
+from src.services.search import SearchService
 from src.utils.security import get_current_user
 from typing import List
 
@@ -20,14 +22,19 @@ async def get_tag(tag_id: str):
 
 @router.put("/{tag_id}", response_model=TagResponse)
 async def update_tag(tag_id: str, tag: TagUpdate):
-    updated = await TagService.update_tag(tag_id, tag)
+    try:
+        updated = await TagService.update_tag(tag_id, tag)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail="A tag with this key and value already exists")
     if not updated:
         raise HTTPException(status_code=404, detail="Tag not found")
+    await SearchService.kb_metadata_changed("tags", tag_id)
     return updated
 
 @router.delete("/{tag_id}")
 async def delete_tag(tag_id: str):
     await TagService.delete_tag(tag_id)
+    await SearchService.kb_metadata_changed("tags", tag_id)
     return {"status": "deleted"}
 
 @router.get("/", response_model=List[TagResponse])
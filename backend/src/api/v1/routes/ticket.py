@@ -3,7 +3,7 @@ from typing import List
 from beanie import PydanticObjectId
 from src.models.user import User
 from src.models.enums import TicketStatus
-from src.schemas.ticket import TicketCreate, TicketUpdate, TicketResponse
+from src.schemas.ticket import TicketCreate, TicketUpdate, TicketResponse, DuplicateTicketResponse
 from src.schemas.comment import CommentCreate, CommentResponse
 from src.schemas.file import AttachFilesRequest, FileAttachmentResponse
 from src.services.ticket_service import TicketService
@@ -66,6 +66,13 @@ async def get_ticket_stats(current_user: User = Depends(get_current_user)):
     """Get ticket statistics"""
     return await TicketService.get_ticket_stats(current_user)
 
+# ENHANCEMENT L2 DUPLICATE DETECTION - Candidate duplicates for agents triaging an incident
+@router.get("/{ticket_id}/duplicates", response_model=List[DuplicateTicketResponse])
+async def get_duplicate_tickets(ticket_id: PydanticObjectId, current_user: User = Depends(get_current_agent_user)):
+    if not await TicketService.can_access_ticket(ticket_id, current_user):
+        raise HTTPException(status_code=403, detail="Access denied")
+    return await TicketService.get_duplicate_candidates(ticket_id, current_user)
+
 @router.get("/{ticket_id}", response_model=TicketResponse)
 async def get_ticket(ticket_id: PydanticObjectId, current_user: User = Depends(get_current_user)):
     # Check access permissions
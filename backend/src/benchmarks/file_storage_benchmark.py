@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+ENHANCEMENT L2 FILE STORAGE - Benchmark file storage engines.
+
+Writes, reads (whole files and random 64 KiB ranges, the way downloads do)
+and deletes the same synthetic files on the GridFS and local-filesystem
+engines at a given concurrency, and reports throughput and per-operation
+latency. GridFS runs in a scratch database (``<db>_file_bench``) and the
+local engine in a temporary directory (or ``--dir``, to measure a
+particular volume), so real data is never touched.
+
+Usage:
+    python -m src.benchmarks.file_storage_benchmark --files 200 --size-kb 512 --concurrency 8
+"""
+
+import argparse
+import asyncio
+import io
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from typing import Awaitable, Callable, List
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from src.core.config import settings
+from src.services.file_storage import CHUNK_SIZE, BlobStorage, GridFSStorage, LocalStorage
+
+RANGE_BYTES = 64 * 1024
+
+
+async def _timed(items: list, operation: Callable[[object], Awaitable[int]], concurrency: int) -> tuple:
+    """Run ``operation`` over ``items`` with bounded concurrency; returns (seconds, bytes, latencies in ms)."""
+    slots = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+
+    async def run(item) -> int:
+        async with slots:
+            start = time.perf_counter()
+            moved = await operation(item)
+            latencies.append((time.perf_counter() - start) * 1000)
+            return moved
+
+    start = time.perf_counter()
+    moved = sum(await asyncio.gather(*(run(item) for item in items)))
+    return time.perf_counter() - start, moved, latencies
+
+
+def _summary(seconds: float, moved: int, latencies: List[float]) -> str:
+    latencies = sorted(latencies)
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    rate = f"{moved / seconds / 1e6:8.1f} MB/s" if moved else f"{len(latencies) / seconds:8.0f} op/s"
+    return f"{rate}   p50 {statistics.median(latencies):7.2f} ms   p95 {p95:7.2f} ms"
+
+
+async def _bench(storage: BlobStorage, payloads: List[bytes], concurrency: int, rng: random.Random) -> None:
+    ids = []
+
+    async def write(payload) -> int:
+        ids.append(await storage.save(io.BytesIO(payload), "bench.bin"))
+        return len(payload)
+
+    async def read(blob_id) -> int:
+        reader = await storage.open(blob_id)
+        size = 0
+        try:
+            while True:
+                chunk = await reader.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+        finally:
+            reader.close()
+        return size
+
+    async def read_range(blob_id) -> int:
+        reader = await storage.open(blob_id)
+        try:
+            reader.seek(rng.randrange(max(1, reader.length - RANGE_BYTES)))
+            return len(await reader.read(RANGE_BYTES))
+        finally:
+            reader.close()
+
+    async def delete(blob_id) -> int:
+        await storage.delete(blob_id)
+        return 0
+
+    print(f"\n=== {storage.name} ===")
+    print(f"write        {_summary(*await _timed(payloads, write, concurrency))}")
+    print(f"read         {_summary(*await _timed(list(ids), read, concurrency))}")
+    print(f"read range   {_summary(*await _timed(list(ids), read_range, concurrency))}")
+    print(f"delete       {_summary(*await _timed(list(ids), delete, concurrency))}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--size-kb", type=int, default=512)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--dir", default=None, help="Directory for the local engine (default: a temporary directory)")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch database afterwards")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    payloads = [os.urandom(args.size_kb * 1024) for _ in range(args.files)]
+    print(f"{args.files} files of {args.size_kb} KiB, concurrency {args.concurrency}")
+
+    client = AsyncIOMotorClient(settings.mongodb_uri)
+    db_name = f"{client.get_default_database().name}_file_bench"
+    root = args.dir or tempfile.mkdtemp(prefix="file_bench_")
+    try:
+        await _bench(GridFSStorage(db=client[db_name], bucket_name="bench"), payloads, args.concurrency, rng)
+        await _bench(LocalStorage(os.path.join(root, "blobs")), payloads, args.concurrency, rng)
+    finally:
+        if not args.keep:
+            await client.drop_database(db_name)
+        if args.dir is None:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+ENHANCEMENT L2 KB HYBRID SEARCH - Evaluate BM25, vector and hybrid ranking.
+
+Runs the labeled queries in ``kb_eval_queries.json`` (seed ticket titles
+plus paraphrases, labeled with seed article titles) against the articles
+in the configured database and reports recall@k, MRR and p50/p95 latency
+for BM25 alone, vector similarity alone and hybrid fusion at each of the
+given weight pairs. Seed the database first with ``python -m src.seed_data``.
+
+Indexes are built through the same services the API uses, in a temporary
+directory, so existing snapshots are left alone.
+
+Usage:
+    python -m src.benchmarks.kb_hybrid_eval --weights 1:1 1:2 2:1 --k 1 3 5
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+
+from src.core.config import settings
+from src.db.init_db import get_database, init_db
+from src.services.kb_vector_service import KBVectorService
+from src.services.search import SearchService
+
+QUERIES_FILE = os.path.join(os.path.dirname(__file__), "kb_eval_queries.json")
+
+
+def _percentile(samples: list, fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def load_labeled_queries(path: str) -> list:
+    """``(query, relevant article ids)`` pairs; labels not found in the database are dropped."""
+    with open(path, encoding="utf-8") as handle:
+        labeled = json.load(handle)["queries"]
+
+    db = await get_database()
+    ids_by_title = {}
+    async for doc in db.articles.find({}, {"title": 1}):
+        ids_by_title.setdefault(doc.get("title", "").strip().lower(), set()).add(str(doc["_id"]))
+
+    queries = []
+    for item in labeled:
+        relevant = set().union(*(ids_by_title.get(title.strip().lower(), set()) for title in item["relevant"]))
+        if relevant:
+            queries.append((item["query"], relevant))
+    return queries
+
+
+async def evaluate(name: str, run, queries: list, ks: list) -> None:
+    recalls = {k: [] for k in ks}
+    reciprocal_ranks = []
+    latencies = []
+    for query, relevant in queries:
+        started = time.perf_counter()
+        ranked = await run(query)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+        for k in ks:
+            recalls[k].append(len(relevant.intersection(ranked[:k])) / len(relevant))
+        rank = next((position for position, article_id in enumerate(ranked, start=1) if article_id in relevant), None)
+        reciprocal_ranks.append(1 / rank if rank else 0.0)
+
+    recall_text = "  ".join(f"R@{k} {statistics.fmean(recalls[k]):.3f}" for k in ks)
+    print(
+        f"{name:<22} {recall_text}  MRR {statistics.fmean(reciprocal_ranks):.3f}"
+        f"   p50 {statistics.median(latencies):7.2f} ms   p95 {_percentile(latencies, 0.95):7.2f} ms"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", default=QUERIES_FILE, help="Labeled query file")
+    parser.add_argument("--weights", nargs="+", default=["1:1", "1:2", "2:1"], help="lexical:vector RRF weight pairs")
+    parser.add_argument("--rrf-k", type=int, default=settings.kb_hybrid_rrf_k)
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 3, 5])
+    parser.add_argument("--repeat", type=int, default=5, help="Passes over the query set, for steadier latencies")
+    args = parser.parse_args()
+
+    settings.kb_index_dir = tempfile.mkdtemp(prefix="kb_eval_")
+    settings.kb_hybrid_rrf_k = args.rrf_k
+    await init_db()
+    await SearchService.initialize()
+    await KBVectorService.initialize()
+
+    queries = await load_labeled_queries(args.queries)
+    if not queries:
+        print("No labeled articles found; seed the database with `python -m src.seed_data` first")
+        return
+    print(f"{len(queries)} labeled queries, {len(await SearchService.get_index())} articles, RRF k={args.rrf_k}\n")
+    queries = queries * args.repeat
+    limit = max(args.k)
+
+    async def bm25(query):
+        return [article_id for article_id, _ in await SearchService.bm25_search(query, limit=limit)]
+
+    async def vector(query):
+        return await SearchService.vector_ranking(query, limit=limit)
+
+    await evaluate("bm25", bm25, queries, args.k)
+    await evaluate("vector", vector, queries, args.k)
+    for pair in args.weights:
+        lexical_weight, vector_weight = (float(part) for part in pair.split(":"))
+
+        async def hybrid(query, lexical_weight=lexical_weight, vector_weight=vector_weight):
+            hits = await SearchService.hybrid_search(
+                query, limit=limit, lexical_weight=lexical_weight, vector_weight=vector_weight
+            )
+            return [article_id for article_id, _ in hits]
+
+        await evaluate(f"hybrid {pair}", hybrid, queries, args.k)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+ENHANCEMENT L2 KB SEARCH - Benchmark article search engines.
+
+Compares the previous unanchored ``$regex`` scan, the weighted MongoDB
+``$text`` index and the in-process BM25 index on synthetic articles.
+Articles are written to a scratch database (``<db>_kb_bench``) so real
+data is never touched.
+
+Usage:
+    python -m src.benchmarks.kb_search_benchmark --sizes 10000 100000 --queries 200
+"""
+
+import argparse
+import asyncio
+import random
+import re
+import statistics
+import time
+from datetime import datetime, timezone
+
+from bson import DBRef, ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from src.core.config import settings
+from src.services.search import FACET_FIELDS, SearchService
+from src.utils.bm25_index import BM25Index
+
+DOMAIN_TERMS = [
+    "vpn", "password", "reset", "printer", "network", "outlook", "email", "laptop", "wifi", "account",
+    "locked", "install", "software", "license", "backup", "restore", "permissions", "sharepoint", "teams",
+    "camera", "monitor", "docking", "bluetooth", "certificate", "firewall", "proxy", "browser", "update",
+    "windows", "macos", "drive", "onedrive", "calendar", "meeting", "headset", "keyboard", "battery",
+]
+
+
+def _vocabulary(rng: random.Random, size: int = 5000) -> list:
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    filler = {"".join(rng.choice(letters) for _ in range(rng.randint(3, 10))) for _ in range(size)}
+    vocabulary = DOMAIN_TERMS + sorted(filler)
+    rng.shuffle(vocabulary)  # Domain terms land at random frequency ranks
+    return vocabulary
+
+
+def _zipf_words(rng: random.Random, vocabulary: list, count: int) -> list:
+    # Zipf-like draw so some words are common and most are rare, as in real text
+    n = len(vocabulary)
+    return [vocabulary[min(n - 1, int(rng.paretovariate(1.1)) - 1)] if rng.random() < 0.7 else rng.choice(vocabulary) for _ in range(count)]
+
+
+def generate_articles(count: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    vocabulary = _vocabulary(rng)
+    categories = [ObjectId() for _ in range(8)]
+    subcategories = [ObjectId() for _ in range(40)]
+    now = datetime.now(timezone.utc)
+
+    articles = []
+    for _ in range(count):
+        title_words = _zipf_words(rng, vocabulary, rng.randint(3, 8))
+        body = " ".join(_zipf_words(rng, vocabulary, rng.randint(80, 400)))
+        articles.append({
+            "_id": ObjectId(),
+            "title": " ".join(title_words).capitalize(),
+            "content": {"html": f"<p>{body}</p>", "text": body, "json": {}},
+            "categoryId": DBRef("categories", rng.choice(categories)),
+            "subCategoryId": DBRef("subcategories", rng.choice(subcategories)),
+            "tags": [],
+            "aiGeneratedTags": rng.sample(DOMAIN_TERMS, 4),
+            "vectorIds": [],
+            "createdAt": now,
+            "updatedAt": now,
+        })
+    return articles
+
+
+def generate_queries(count: int, seed: int = 11) -> list:
+    rng = random.Random(seed)
+    return [" ".join(rng.sample(DOMAIN_TERMS, rng.choice([1, 1, 2, 2, 3]))) for _ in range(count)]
+
+
+def _summary(samples: list) -> str:
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return f"p50 {statistics.median(ordered):8.2f} ms   p95 {p95:8.2f} ms   mean {statistics.fmean(ordered):8.2f} ms"
+
+
+async def _time_async(queries, run) -> list:
+    samples = []
+    for query in queries:
+        started = time.perf_counter()
+        await run(query)
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+async def benchmark_size(db, size: int, queries: list, limit: int) -> None:
+    print(f"\n=== {size} articles ===")
+    articles = generate_articles(size)
+
+    await db.articles.drop()
+    for start in range(0, size, 5000):
+        await db.articles.insert_many(articles[start:start + 5000], ordered=False)
+    await db.articles.create_index(
+        [(field, "text") for field in SearchService.TEXT_INDEX_WEIGHTS],
+        weights=SearchService.TEXT_INDEX_WEIGHTS,
+        default_language="english",
+        name=SearchService.TEXT_INDEX_NAME,
+    )
+
+    async def regex_search(query):
+        # The query shape search_articles used before the search engines existed
+        pattern = re.compile(re.escape(query), re.IGNORECASE)
+        await db.articles.find({"$or": [
+            {"title": {"$regex": pattern}},
+            {"content.text": {"$regex": pattern}},
+            {"aiGeneratedTags": {"$regex": pattern}},
+        ]}, {"_id": 1}).to_list(None)
+
+    async def text_search(query):
+        score = {"$meta": "textScore"}
+        await db.articles.find({"$text": {"$search": query}}, {"score": score}).sort([("score", score)]).limit(limit).to_list(None)
+
+    started = time.perf_counter()
+    index = BM25Index(SearchService.FIELD_BOOSTS)
+    for doc in articles:
+        index.upsert(str(doc["_id"]), SearchService.document_fields(doc, {}), metadata={
+            "category_id": str(doc["categoryId"].id),
+            "subcategory_id": str(doc["subCategoryId"].id),
+            "ai_tags": doc["aiGeneratedTags"],
+        })
+    build_seconds = time.perf_counter() - started
+
+    async def bm25_search(query):
+        index.search(query, limit=limit)
+
+    facet_keys = [key for key, _ in FACET_FIELDS.values()]
+
+    async def bm25_faceted_search(query):
+        scores = index.score(query)
+        index.facet_counts(scores, facet_keys)
+        index.rank(scores, limit)
+
+    print(f"$regex scan       {_summary(await _time_async(queries, regex_search))}")
+    print(f"$text index       {_summary(await _time_async(queries, text_search))}")
+    print(f"BM25 in-process   {_summary(await _time_async(queries, bm25_search))}   (build {build_seconds:.1f} s, {index.vocabulary_size()} terms)")
+    print(f"BM25 + facets     {_summary(await _time_async(queries, bm25_faceted_search))}")
+
+    plan = await db.articles.find({"title": {"$regex": re.compile("vpn", re.IGNORECASE)}}).explain()
+    stats = plan.get("executionStats", {})
+    print(f"$regex docs examined for one query: {stats.get('totalDocsExamined', 'n/a')}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch database afterwards")
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(settings.mongodb_uri)
+    db_name = f"{client.get_default_database().name}_kb_bench"
+    db = client[db_name]
+    print(f"Benchmarking in scratch database '{db_name}'")
+
+    queries = generate_queries(args.queries)
+    try:
+        for size in args.sizes:
+            await benchmark_size(db, size, queries, args.limit)
+    finally:
+        if not args.keep:
+            await client.drop_database(db_name)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -6,7 +6,48 @@ class Settings(BaseSettings):
     mongodb_uri: str = Field(..., alias="MONGODB_URI")  # Required from env variable
     google_api_key: str = Field(..., alias="GOOGLE_API_KEY")
 
+    # ENHANCEMENT L2 KB EMBEDDINGS - Local embedding pipeline and vector index
+    kb_index_dir: str = Field("data/kb_index", alias="KB_INDEX_DIR")
+    embedding_encoder: str = Field("hashing", alias="EMBEDDING_ENCODER")  # "hashing" or "package.module:ClassName"
+    embedding_dim: int = Field(1024, alias="EMBEDDING_DIM")
+
+    # ENHANCEMENT L2 KB SEARCH - Article search engine: in-process BM25 or MongoDB $text index
+    kb_search_engine: str = Field("bm25", alias="KB_SEARCH_ENGINE")  # "bm25", "mongo_text" or "hybrid"
+
+    # ENHANCEMENT L2 KB HYBRID SEARCH - Reciprocal rank fusion of BM25 and embedding similarity
+    kb_hybrid_lexical_weight: float = Field(1.0, alias="KB_HYBRID_LEXICAL_WEIGHT")
+    kb_hybrid_vector_weight: float = Field(1.0, alias="KB_HYBRID_VECTOR_WEIGHT")
+    kb_hybrid_rrf_k: int = Field(60, alias="KB_HYBRID_RRF_K")
+    kb_hybrid_candidates: int = Field(100, alias="KB_HYBRID_CANDIDATES")  # Articles taken from each ranking before fusion
+    kb_hybrid_min_similarity: float = Field(0.1, alias="KB_HYBRID_MIN_SIMILARITY")  # Vector hits less similar than this are not fused
+
+    # ENHANCEMENT L2 DUPLICATE DETECTION - Off: duplicates are only flagged, and go through assignment and summary like any ticket
+    duplicate_routing: bool = Field(False, alias="DUPLICATE_ROUTING")  # Route duplicates of an open ticket to its agent and skip their eager summary
+
+    # ENHANCEMENT L2 KB DEFLECTION - Article suggestions while a ticket is being drafted
+    kb_deflect_budget_ms: float = Field(50.0, alias="KB_DEFLECT_BUDGET_MS")  # Scoring stops when this is spent
+    kb_deflect_max_terms: int = Field(24, alias="KB_DEFLECT_MAX_TERMS")  # Rarest draft terms scored; long descriptions are truncated
+
+    # ENHANCEMENT L2 KB RENDERING - Worker processes for CPU-bound rendering
+    cpu_pool_workers: int = Field(0, alias="CPU_POOL_WORKERS")  # 0: one per CPU, at most 4
+    render_inline_max_chars: int = Field(4000, alias="RENDER_INLINE_MAX_CHARS")  # Smaller HTML renders in-process; the worker round trip costs more
+
+    # ENHANCEMENT L2 FILE STORAGE - Engine for new file content; existing content stays where it is until migrated
+    file_storage_backend: str = Field("gridfs", alias="FILE_STORAGE_BACKEND")  # "gridfs" or "local"
+    file_storage_dir: str = Field("data/files", alias="FILE_STORAGE_DIR")  # Root of the local engine (a volume shared by all workers)
+    file_storage_accel_prefix: str = Field("", alias="FILE_STORAGE_ACCEL_PREFIX")  # e.g. "/protected-files": local downloads are handed to nginx via X-Accel-Redirect
+
+    # ENHANCEMENT L2 FAKE LLM - Local fake chat model for load testing the AI paths
+    llm_backend: str = Field("gemini", alias="LLM_BACKEND")  # "gemini" or "fake"
+    fake_llm_latency: str = Field("lognormal:400:0.4", alias="FAKE_LLM_LATENCY")
+    fake_llm_task_latency: str = Field("", alias="FAKE_LLM_TASK_LATENCY")  # e.g. "assign_agent=constant:800,tags=uniform:100:300"
+    fake_llm_failure_rate: float = Field(0.0, alias="FAKE_LLM_FAILURE_RATE")
+    fake_llm_seed: int = Field(42, alias="FAKE_LLM_SEED")
+    fake_llm_stream_chunk_chars: int = Field(24, alias="FAKE_LLM_STREAM_CHUNK_CHARS")
+    fake_llm_stream_chunk_delay_ms: float = Field(15.0, alias="FAKE_LLM_STREAM_CHUNK_DELAY_MS")
+    fake_llm_responses_file: str = Field("", alias="FAKE_LLM_RESPONSES_FILE")  # JSON object of task -> response text
+
     class Config:
         env_file = ".env"  # Load from a .env file (recommended for local dev)
         case_sensitive = True
-settings = Settings()
\ No newline at end of file
+settings = Settings()
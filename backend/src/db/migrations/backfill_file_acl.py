@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+ENHANCEMENT L2 FILE ACL - Fill the access list of existing ticket attachments.
+
+Attachments made before the precomputed ACL have none, so only their
+uploaders can open them. This derives each ticket's ACL once and writes
+it to all of the ticket's attachments, then creates the (file_id, acl)
+index. Safe to re-run.
+
+Usage:
+    python -m src.db.migrations.backfill_file_acl
+"""
+
+import asyncio
+
+from src.db.init_db import get_database
+from src.services.file_service import file_service
+
+
+async def backfill_file_acl() -> int:
+    db = await get_database()
+    ticket_ids = await db.ticket_file_attachments.distinct("ticket_id")
+    for ticket_id in ticket_ids:
+        await file_service.refresh_ticket_acl(ticket_id)
+    await file_service.ensure_indexes()
+    return len(ticket_ids)
+
+
+async def main():
+    tickets = await backfill_file_acl()
+    print(f"Refreshed attachment access for {tickets} tickets")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+ENHANCEMENT L2 FILE DEDUP - Content-address files uploaded before deduplication.
+
+Hashes the GridFS content of every ``file_metadata`` document without a
+``sha256``, registers it in ``file_blobs`` and, when the same content is
+already stored, points the file at the existing blob and deletes its own
+copy. Prints the storage reclaimed. Safe to re-run; hashed files are
+skipped.
+
+Usage:
+    python -m src.db.migrations.dedup_files [--dry-run]
+"""
+
+import argparse
+import asyncio
+import hashlib
+from datetime import datetime
+
+from pymongo.errors import DuplicateKeyError
+
+from src.db.init_db import get_database
+from src.services.file_service import file_service
+from src.services.file_storage import CHUNK_SIZE, BlobNotFound, get_storage, open_blob
+
+
+async def _sha256(storage, gridfs_id) -> str:
+    reader = await open_blob(storage, gridfs_id)
+    digest = hashlib.sha256()
+    try:
+        while True:
+            chunk = await reader.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+    finally:
+        reader.close()
+    return digest.hexdigest()
+
+
+async def dedup_files(dry_run: bool = False) -> dict:
+    db = await get_database()
+    stats = {"hashed": 0, "duplicates": 0, "missing": 0, "saved_bytes": 0}
+    seen = {}  # sha256 -> size, for dry runs
+
+    async for doc in db.file_metadata.find({"sha256": None}, {"gridfs_id": 1, "size": 1, "storage": 1}):
+        try:
+            sha256 = await _sha256(doc.get("storage"), doc["gridfs_id"])
+        except BlobNotFound:
+            stats["missing"] += 1
+            continue
+        stats["hashed"] += 1
+
+        if dry_run:
+            exists = sha256 in seen or await db.file_blobs.count_documents(
+                {"_id": sha256, "gridfs_id": {"$ne": doc["gridfs_id"]}}, limit=1
+            )
+            seen.setdefault(sha256, doc["size"])
+            if exists:
+                stats["duplicates"] += 1
+                stats["saved_bytes"] += doc["size"]
+            continue
+
+        try:
+            await db.file_blobs.insert_one({
+                "_id": sha256,
+                "gridfs_id": doc["gridfs_id"],
+                "storage": doc.get("storage"),
+                "size": doc["size"],
+                "ref_count": 1,
+                "created_at": datetime.utcnow(),
+            })
+            await db.file_metadata.update_one({"_id": doc["_id"]}, {"$set": {"sha256": sha256}})
+        except DuplicateKeyError:
+            blob = await db.file_blobs.find_one({"_id": sha256}, {"gridfs_id": 1})
+            if blob["gridfs_id"] == doc["gridfs_id"]:
+                # Registered by an earlier run that died before marking the file; it already holds the reference
+                await db.file_metadata.update_one({"_id": doc["_id"]}, {"$set": {"sha256": sha256}})
+                continue
+            blob = await db.file_blobs.find_one_and_update({"_id": sha256}, {"$inc": {"ref_count": 1}})
+            # Re-point the file before deleting its copy, so an interrupted run never leaves it dangling
+            await db.file_metadata.update_one(
+                {"_id": doc["_id"]},
+                {"$set": {"sha256": sha256, "gridfs_id": blob["gridfs_id"], "storage": blob.get("storage")}},
+            )
+            await get_storage(doc.get("storage")).delete(doc["gridfs_id"])
+            stats["duplicates"] += 1
+            stats["saved_bytes"] += doc["size"]
+
+    if not dry_run:
+        await file_service.ensure_indexes()
+    return stats
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="Report what would change without writing")
+    args = parser.parse_args()
+
+    stats = await dedup_files(dry_run=args.dry_run)
+    prefix = "Would free" if args.dry_run else "Freed"
+    print(
+        f"Hashed {stats['hashed']} files ({stats['missing']} without content); "
+        f"{prefix} {stats['saved_bytes']} bytes from {stats['duplicates']} duplicates"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
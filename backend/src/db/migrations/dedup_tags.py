@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+ENHANCEMENT L2 INTERNED TAGS - One-time merge of duplicate tag documents.
+
+Article creation used to insert a new ``Tag`` for every tag on every
+article. This groups tags by their trimmed ``(key, value)``, keeps the
+oldest document of each group, rewrites article tag links to point at it
+(dropping links that become repeats), deletes the other copies and then
+creates the unique ``(key, value)`` index that keeps the store interned.
+Safe to re-run; a second run finds nothing to merge.
+
+Usage:
+    python -m src.db.migrations.dedup_tags [--dry-run]
+"""
+
+import argparse
+import asyncio
+from typing import Dict, List, Tuple
+
+from bson import DBRef, ObjectId
+from pymongo import DeleteMany, UpdateOne
+
+from src.db.init_db import get_database
+from src.services.tag_service import TagService
+
+BATCH_SIZE = 1000
+
+
+def _batches(items: List, size: int = BATCH_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+async def find_duplicates(db) -> Tuple[Dict[ObjectId, ObjectId], List[UpdateOne]]:
+    """Map of duplicate tag id -> id of the tag replacing it, and updates trimming the kept tags."""
+    kept: Dict[Tuple[str, str], ObjectId] = {}
+    replacements: Dict[ObjectId, ObjectId] = {}
+    renames = []
+    # Oldest first, so the surviving tag is the one most links already point at
+    async for tag in db.tags.find({}, {"key": 1, "value": 1}).sort("_id", 1):
+        key, value = TagService._normalize(tag.get("key"), tag.get("value"))
+        keep = kept.setdefault((key, value), tag["_id"])
+        if keep != tag["_id"]:
+            replacements[tag["_id"]] = keep
+        elif (tag.get("key"), tag.get("value")) != (key, value):
+            renames.append(UpdateOne({"_id": keep}, {"$set": {"key": key, "value": value}}))
+    return replacements, renames
+
+
+async def dedup_tags(dry_run: bool = False) -> dict:
+    db = await get_database()
+    replacements, renames = await find_duplicates(db)
+    stats = {"duplicate_tags": len(replacements), "renamed_tags": len(renames), "articles_rewritten": 0}
+
+    duplicate_ids = list(replacements)
+    for batch in _batches(duplicate_ids):
+        updates = []
+        async for article in db.articles.find({"tags.$id": {"$in": batch}}, {"tags": 1}):
+            tags, seen = [], set()
+            for link in article.get("tags") or []:
+                tag_id = replacements.get(link.id, link.id)
+                if tag_id not in seen:
+                    seen.add(tag_id)
+                    tags.append(DBRef(link.collection, tag_id, link.database))
+            updates.append(UpdateOne({"_id": article["_id"]}, {"$set": {"tags": tags}}))
+        stats["articles_rewritten"] += len(updates)
+        if updates and not dry_run:
+            await db.articles.bulk_write(updates, ordered=False)
+
+    if not dry_run:
+        # Links are rewritten before the copies go, so an interrupted run never leaves dangling tags
+        if duplicate_ids:
+            await db.tags.bulk_write([DeleteMany({"_id": {"$in": batch}}) for batch in _batches(duplicate_ids)])
+        if renames:
+            await db.tags.bulk_write(renames, ordered=False)
+        await TagService.ensure_indexes()
+    return stats
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="Report what would change without writing")
+    args = parser.parse_args()
+
+    stats = await dedup_tags(dry_run=args.dry_run)
+    prefix = "Would merge" if args.dry_run else "Merged"
+    print(
+        f"{prefix} {stats['duplicate_tags']} duplicate tags, "
+        f"rewrote {stats['articles_rewritten']} articles, trimmed {stats['renamed_tags']} tags"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+ENHANCEMENT L2 FILE STORAGE - Move file content between storage engines.
+
+Copies every blob not yet on the target engine (deduplicated contents in
+``file_blobs``, files stored before deduplication, and their previews),
+keeping its id, then switches the ``storage`` field of the documents that
+reference it and deletes the source copy. Copies are verified by length
+before anything is switched. Safe to interrupt and re-run: a blob is only
+switched once fully copied, and a partial copy from an earlier run is
+replaced. Readers fall back to the other engines, so documents written
+while a blob moves still find it.
+
+Set ``FILE_STORAGE_BACKEND`` to the target engine first, so no new content
+is written to the source while the migration runs.
+
+Usage:
+    python -m src.db.migrations.move_file_storage --to local [--dry-run] [--keep-source]
+"""
+
+import argparse
+import asyncio
+import io
+from typing import Optional
+
+from src.db.init_db import get_database
+from src.services.file_service import file_service
+from src.services.file_storage import DEFAULT_STORAGE, STORAGE_ENGINES, BlobNotFound, get_storage
+
+
+async def _copy(blob_id, source: Optional[str], target: str, expected_size: Optional[int]) -> int:
+    reader = await get_storage(source).open(blob_id)
+    try:
+        data = await reader.read()  # Uploads are capped at MAX_FILE_SIZE, so a blob fits in memory
+    finally:
+        reader.close()
+    if expected_size is not None and len(data) != expected_size:
+        raise ValueError(f"blob {blob_id} has {len(data)} bytes, expected {expected_size}")
+
+    engine = get_storage(target)
+    await engine.delete(blob_id)  # Left over from an interrupted run
+    await engine.save(
+        io.BytesIO(data),
+        getattr(reader, "filename", None) or str(blob_id),
+        getattr(reader, "metadata", None),
+        blob_id=blob_id,
+    )
+    copy = await engine.open(blob_id)
+    copy.close()
+    if copy.length != len(data):
+        raise ValueError(f"copy of blob {blob_id} has {copy.length} bytes, expected {len(data)}")
+    return len(data)
+
+
+async def move_file_storage(target: str, dry_run: bool = False, keep_source: bool = False) -> dict:
+    db = await get_database()
+    stats = {"blobs": 0, "previews": 0, "bytes": 0, "missing": 0, "failed": 0}
+    # Documents without a storage field are on the default engine
+    elsewhere = {"storage": {"$nin": [target, None]}} if target == DEFAULT_STORAGE else {"storage": {"$ne": target}}
+
+    async def move(doc: dict, switch) -> bool:
+        """Copy one blob, switch the documents referencing it, then drop the source copy."""
+        blob_id, source = doc["_id"], doc.get("storage")
+        if not dry_run:
+            try:
+                await _copy(blob_id, source, target, doc.get("size"))
+            except BlobNotFound:
+                stats["missing"] += 1
+                return False
+            except Exception as e:
+                print(f"Failed to copy blob {blob_id}: {e}")
+                stats["failed"] += 1
+                return False
+            await switch()
+            if not keep_source:
+                await get_storage(source).delete(blob_id)
+        stats["bytes"] += doc.get("size") or 0
+        return True
+
+    # Contents: deduplicated blobs, then files that own their content (stored before deduplication)
+    contents = [
+        {"_id": blob["gridfs_id"], "storage": blob.get("storage"), "size": blob.get("stored_size", blob["size"]), "blob": blob["_id"]}
+        async for blob in db.file_blobs.find(elsewhere)
+    ] + [
+        {"_id": doc["gridfs_id"], "storage": doc.get("storage"), "size": doc["size"]}
+        async for doc in db.file_metadata.find({"sha256": None, **elsewhere}, {"gridfs_id": 1, "storage": 1, "size": 1})
+    ]
+
+    for content in contents:
+        # Previews first, so a switched content never points at previews still on the source
+        async for preview in db.file_previews.find({"derived_from": content["_id"], **elsewhere}):
+            async def switch_preview(preview_id=preview["_id"]):
+                await db.file_previews.update_one({"_id": preview_id}, {"$set": {"storage": target}})
+            if await move(preview, switch_preview):
+                stats["previews"] += 1
+
+        async def switch_content():
+            if "blob" in content:
+                await db.file_blobs.update_one({"_id": content["blob"]}, {"$set": {"storage": target}})
+            await db.file_metadata.update_many({"gridfs_id": content["_id"]}, {"$set": {"storage": target}})
+        if await move(content, switch_content):
+            stats["blobs"] += 1
+
+    if not dry_run:
+        await file_service.ensure_indexes()
+    return stats
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--to", required=True, choices=STORAGE_ENGINES, help="Target storage engine")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would move without copying")
+    parser.add_argument("--keep-source", action="store_true", help="Leave the source copies in place")
+    args = parser.parse_args()
+
+    stats = await move_file_storage(args.to, dry_run=args.dry_run, keep_source=args.keep_source)
+    verb = "Would move" if args.dry_run else "Moved"
+    print(
+        f"{verb} {stats['blobs']} blobs and {stats['previews']} previews ({stats['bytes']} bytes) to '{args.to}'; "
+        f"{stats['missing']} missing, {stats['failed']} failed"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+ENHANCEMENT L2 KB RENDERING - Backfill ``Article.rendered``.
+
+Articles saved before rendering existed, or by an older renderer, get
+their sanitized HTML, table of contents, plain text and word count
+computed in the worker pool and stored. Reads render missing artifacts on
+demand anyway; this removes that first-read cost and refreshes every
+article after ``RENDER_VERSION`` changes. Safe to re-run.
+
+Usage:
+    python -m src.db.migrations.render_articles [--dry-run]
+"""
+
+import argparse
+import asyncio
+
+from pymongo import UpdateOne
+
+from src.db.init_db import get_database
+from src.models.rich_text import RichTextContent
+from src.services.article_render_service import ArticleRenderService
+from src.utils import process_pool
+from src.utils.html_render import RENDER_VERSION
+
+BATCH_SIZE = 200
+
+
+def _content(doc: dict) -> RichTextContent:
+    content = doc.get("content") or {}
+    return RichTextContent(html=content.get("html") or "", text=content.get("text") or "")
+
+
+async def _write(db, batch) -> None:
+    renderings = await asyncio.gather(*(ArticleRenderService.render(_content(doc)) for doc in batch))
+    await db.articles.bulk_write([
+        UpdateOne(
+            {"_id": doc["_id"], "content.html": (doc.get("content") or {}).get("html")},
+            {"$set": {"rendered": rendering.model_dump(by_alias=True)}},
+        )
+        for doc, rendering in zip(batch, renderings)
+    ], ordered=False)
+
+
+async def render_articles(dry_run: bool = False) -> int:
+    db = await get_database()
+    query = {"$or": [{"rendered": None}, {"rendered.version": {"$ne": RENDER_VERSION}}]}
+    if dry_run:
+        return await db.articles.count_documents(query)
+
+    rendered = 0
+    batch = []
+    async for doc in db.articles.find(query, {"content": 1}):
+        batch.append(doc)
+        if len(batch) >= BATCH_SIZE:
+            await _write(db, batch)
+            rendered += len(batch)
+            batch = []
+    if batch:
+        await _write(db, batch)
+        rendered += len(batch)
+    return rendered
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="Count articles that need rendering without writing")
+    args = parser.parse_args()
+
+    try:
+        count = await render_articles(dry_run=args.dry_run)
+    finally:
+        process_pool.shutdown()
+    print(f"{'Would render' if args.dry_run else 'Rendered'} {count} articles (renderer version {RENDER_VERSION})")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -16,6 +16,9 @@ async def generate_closing_comments(ticket_data: dict) -> ClosingComments:
         f"Tags: {', '.join(ticket_data['tags'])}\n"
         f"Comments:\n" + "\n".join(ticket_data["comments"])
     )
+    # ENHANCEMENT L2 AI CLOSING RAG - Ground the suggestion in retrieved KB articles
+    if ticket_data.get("kb_context"):
+        content += f"\n\nRelevant knowledge base articles:\n{ticket_data['kb_context']}"
 
     try:
         messages = [
@@ -26,6 +29,8 @@ async def generate_closing_comments(ticket_data: dict) -> ClosingComments:
              {"reason": "Brief reason category (e.g., 'Issue Resolved', 'Configuration Fixed', 'User Assisted')", "comment": "Professional closing comment explaining the resolution"}
              
              Make the closing comment professional, specific to the issue, and helpful to the user.
+             If knowledge base articles are provided and relevant to the resolution, refer the user to them by title.
+             Do not mention articles that are not relevant.
              """},
             {"role": "user", "content": f"Generate a closing reason and comment for this resolved ticket:\n{content}"}
         ]
@@ -1,6 +1,7 @@
+from typing import AsyncIterator
 from src.langchain_app.config.model_config import llm
 
-async def summarize_ticket_data(ticket_data: dict) -> str:
+def _build_messages(ticket_data: dict) -> list:
     content = (
         f"Ticket Title: {ticket_data['title']}\n"
         f"Description: {ticket_data['description']}\n"
@@ -10,23 +11,19 @@ async def summarize_ticket_data(ticket_data: dict) -> str:
         f"Comments:\n" + "\n".join(ticket_data["comments"])
     )
 
-    try:
-        messages = [
-            {"role": "system", "content": """You are a helpful assistant that summarizes ticket information. 
-             Please provide a concise summary of the ticket including the main issue, any relevant details, and current status.
-             """},
-            {"role": "user", "content": f"Please summarize the following ticket:\n{content}"}
-        ]
-
-        response = await llm.ainvoke(messages)
-        return response.content.strip()
-    except Exception as e:
-        print(f"AI summarization failed: {e}")
-        # Fallback to simple text-based summary for development
-        comment_count = len(ticket_data["comments"])
-        tags_text = ", ".join(ticket_data['tags']) if ticket_data['tags'] else "None"
-        
-        fallback_summary = f"""**Ticket Summary (AI unavailable - using fallback)**
+    return [
+        {"role": "system", "content": """You are a helpful assistant that summarizes ticket information.
+         Please provide a concise summary of the ticket including the main issue, any relevant details, and current status.
+         """},
+        {"role": "user", "content": f"Please summarize the following ticket:\n{content}"}
+    ]
+
+def fallback_summary(ticket_data: dict) -> str:
+    # Fallback to simple text-based summary for development
+    comment_count = len(ticket_data["comments"])
+    tags_text = ", ".join(ticket_data['tags']) if ticket_data['tags'] else "None"
+
+    return f"""**Ticket Summary (AI unavailable - using fallback)**
 
 **Issue:** {ticket_data['title']}
 **Category:** {ticket_data['category']} → {ticket_data['subcategory']}
@@ -35,5 +32,35 @@ async def summarize_ticket_data(ticket_data: dict) -> str:
 **Comments:** {comment_count} comment{'s' if comment_count != 1 else ''}
 
 *Note: This is a basic summary. Full AI summarization requires valid Google API key.*"""
-        
-        return fallback_summary
+
+async def summarize_ticket_data(ticket_data: dict) -> str:
+    try:
+        response = await llm.ainvoke(_build_messages(ticket_data))
+        return response.content.strip()
+    except Exception as e:
+        print(f"AI summarization failed: {e}")
+        return fallback_summary(ticket_data)
+
+# ENHANCEMENT L1 AI TICKET SUMMARY STREAMING - Relay model tokens as they arrive
+async def stream_summarize_ticket_data(ticket_data: dict) -> AsyncIterator[str]:
+    """
+    Stream the ticket summary chunk by chunk.
+
+    Falls back to the plain-text summary when the model fails before producing
+    any output; a failure mid-stream is re-raised so callers don't persist a
+    truncated summary.
+    """
+    produced = False
+    try:
+        async for chunk in llm.astream(_build_messages(ticket_data)):
+            text = chunk.content if isinstance(chunk.content, str) else "".join(
+                part.get("text", "") if isinstance(part, dict) else str(part) for part in chunk.content
+            )
+            if text:
+                produced = True
+                yield text
+    except Exception as e:
+        if produced:
+            raise
+        print(f"AI summary streaming failed: {e}")
+        yield fallback_summary(ticket_data)
@@ -0,0 +1,221 @@
+"""
+ENHANCEMENT L2 FAKE LLM
+
+Local stand-in for the Gemini chat model, selected with ``LLM_BACKEND=fake``.
+
+It recognises which chain is calling it from the system prompt and returns
+a canned response in the shape that chain parses (agent-selection JSON, tag
+arrays, closing-comment JSON, plain-text summaries), after a simulated
+latency drawn from a configurable distribution. A configurable fraction of
+calls fail so the fallback paths get exercised too. Everything is driven by
+a seeded RNG, so a benchmark run can be reproduced exactly.
+
+Latency specs look like ``constant:300``, ``uniform:100:400``,
+``normal:250:50`` or ``lognormal:250:0.5`` (median ms, sigma), and can be
+set per task through ``FAKE_LLM_TASK_LATENCY``, e.g.
+``assign_agent=lognormal:800:0.4,tags=constant:150``.
+"""
+
+import asyncio
+import json
+import math
+import random
+import re
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import Field, PrivateAttr
+
+TASK_ASSIGN_AGENT = "assign_agent"
+TASK_EXPLAIN_ASSIGNMENT = "explain_assignment"
+TASK_TAGS = "tags"
+TASK_CLOSING_COMMENTS = "closing_comments"
+TASK_SUMMARY = "summary"
+TASK_OTHER = "other"
+
+_TASK_MARKERS = [
+    (TASK_ASSIGN_AGENT, "ticket assignment system"),
+    (TASK_EXPLAIN_ASSIGNMENT, "explaining why a specific agent"),
+    (TASK_TAGS, "generates relevant tags"),
+    (TASK_CLOSING_COMMENTS, "closing comments"),
+    (TASK_SUMMARY, "summarizes ticket information"),
+]
+
+_WORD_RE = re.compile(r"[a-zA-Z][a-zA-Z0-9\-]{2,}")
+_STOPWORDS = {
+    "the", "and", "for", "with", "this", "that", "from", "your", "you", "are", "how", "not",
+    "can", "when", "what", "will", "have", "has", "into", "about", "after", "before", "using",
+}
+
+
+class FakeLLMError(RuntimeError):
+    """Simulated provider failure."""
+
+
+def parse_latency(spec: str):
+    """Turn a latency spec into a sampler ``rng -> seconds``."""
+    kind, _, params = spec.partition(":")
+    values = [float(v) for v in params.split(":") if v]
+    kind = kind.strip().lower()
+
+    if kind == "constant" and len(values) == 1:
+        return lambda rng: values[0] / 1000
+    if kind == "uniform" and len(values) == 2:
+        return lambda rng: rng.uniform(values[0], values[1]) / 1000
+    if kind == "normal" and len(values) == 2:
+        return lambda rng: max(0.0, rng.gauss(values[0], values[1])) / 1000
+    if kind == "lognormal" and len(values) == 2:
+        mu = math.log(max(values[0], 1e-3))
+        return lambda rng: rng.lognormvariate(mu, values[1]) / 1000
+    raise ValueError(f"Invalid fake LLM latency spec: {spec!r}")
+
+
+def parse_task_latencies(spec: str) -> Dict[str, Any]:
+    samplers = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        task, _, latency = item.partition("=")
+        samplers[task.strip()] = parse_latency(latency)
+    return samplers
+
+
+def detect_task(messages: List[BaseMessage]) -> str:
+    system = " ".join(m.content for m in messages if m.type == "system" and isinstance(m.content, str)).lower()
+    for task, marker in _TASK_MARKERS:
+        if marker in system:
+            return task
+    return TASK_OTHER
+
+
+def _field(text: str, label: str) -> str:
+    match = re.search(rf"^{re.escape(label)}:\s*(.*)$", text, re.MULTILINE)
+    return match.group(1).strip() if match else ""
+
+
+def _keywords(text: str, limit: int) -> List[str]:
+    seen = []
+    for word in _WORD_RE.findall(text.lower()):
+        if word not in _STOPWORDS and word not in seen:
+            seen.append(word)
+        if len(seen) == limit:
+            break
+    return seen
+
+
+def canned_response(task: str, prompt: str) -> str:
+    """Deterministic response for a task, shaped like what its chain parses."""
+    if task == TASK_ASSIGN_AGENT:
+        # Least loaded listed agent, as a sensible stand-in for the model's choice
+        agents = re.findall(r"Agent ID: (\S+).*?Current Workload: (\d+) active", prompt, re.DOTALL)
+        if not agents:
+            return json.dumps({"selected_agent_id": None, "reasoning": "No agents available"})
+        agent_id, active = min(agents, key=lambda agent: int(agent[1]))
+        return json.dumps({
+            "selected_agent_id": agent_id,
+            "reasoning": f"Lowest current workload ({active} active tickets)",
+        })
+
+    if task == TASK_EXPLAIN_ASSIGNMENT:
+        return "The agent was selected for matching category skills and the lightest current workload."
+
+    if task == TASK_TAGS:
+        title = _field(prompt, "Article Title")
+        content = _field(prompt, "Article Content")
+        return json.dumps(_keywords(f"{title} {content}", 6) or ["general"])
+
+    title = _field(prompt, "Ticket Title") or "the reported issue"
+    if task == TASK_CLOSING_COMMENTS:
+        return json.dumps({
+            "reason": "Issue Resolved",
+            "comment": (
+                f"Thank you for reporting '{title}'. The issue has been resolved following the steps "
+                f"discussed in this ticket. Please reopen it if the problem returns."
+            ),
+        })
+
+    if task == TASK_SUMMARY:
+        category = _field(prompt, "Category") or "Uncategorized"
+        description = _field(prompt, "Description")
+        return (
+            f"The user reports '{title}' in {category}. {description[:200]}"
+            f"{'...' if len(description) > 200 else ''} The ticket is awaiting agent follow-up."
+        )
+
+    return "OK"
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model that simulates provider latency and failures with canned output."""
+
+    latency: str = "lognormal:400:0.4"
+    task_latency: str = ""
+    failure_rate: float = 0.0
+    stream_chunk_chars: int = 24
+    stream_chunk_delay_ms: float = 15.0
+    seed: int = 42
+    responses: Dict[str, str] = Field(default_factory=dict)  # Per-task overrides of the canned output
+
+    _rng: random.Random = PrivateAttr()
+    _default_sampler: Any = PrivateAttr()
+    _task_samplers: Dict[str, Any] = PrivateAttr()
+
+    def model_post_init(self, __context: Any) -> None:
+        super().model_post_init(__context)
+        self._rng = random.Random(self.seed)
+        self._default_sampler = parse_latency(self.latency)
+        self._task_samplers = parse_task_latencies(self.task_latency)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _plan(self, messages: List[BaseMessage]):
+        """Draw latency and failure for one call, and build its response."""
+        task = detect_task(messages)
+        sampler = self._task_samplers.get(task, self._default_sampler)
+        delay = sampler(self._rng)
+        failed = self._rng.random() < self.failure_rate
+
+        prompt = "\n".join(m.content for m in messages if isinstance(m.content, str))
+        text = self.responses.get(task) or canned_response(task, prompt)
+        return task, delay, failed, text
+
+    def _chunks(self, text: str) -> List[str]:
+        size = max(1, self.stream_chunk_chars)
+        return [text[i:i + size] for i in range(0, len(text), size)]
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        task, delay, failed, text = self._plan(messages)
+        time.sleep(delay)
+        if failed:
+            raise FakeLLMError(f"Simulated {task} failure")
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        task, delay, failed, text = self._plan(messages)
+        await asyncio.sleep(delay)
+        if failed:
+            raise FakeLLMError(f"Simulated {task} failure")
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        task, delay, failed, text = self._plan(messages)
+        time.sleep(delay)  # Time to first token
+        if failed:
+            raise FakeLLMError(f"Simulated {task} failure")
+        for chunk in self._chunks(text):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=chunk))
+            time.sleep(self.stream_chunk_delay_ms / 1000)
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        task, delay, failed, text = self._plan(messages)
+        await asyncio.sleep(delay)  # Time to first token
+        if failed:
+            raise FakeLLMError(f"Simulated {task} failure")
+        for chunk in self._chunks(text):
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=chunk))
+            await asyncio.sleep(self.stream_chunk_delay_ms / 1000)
@@ -1,13 +1,44 @@
+import json
+
 from langchain_google_genai import ChatGoogleGenerativeAI
 from src.core.config import settings
 
 
+# ENHANCEMENT L2 FAKE LLM - Select the chat model backend from config
+def _build_fake_llm():
+    from src.langchain_app.config.fake_llm import FakeChatModel
+
+    responses = {}
+    if settings.fake_llm_responses_file:
+        with open(settings.fake_llm_responses_file, encoding="utf-8") as handle:
+            responses = json.load(handle)
+
+    print(f"Using fake LLM backend (latency={settings.fake_llm_latency}, failure_rate={settings.fake_llm_failure_rate})")
+    return FakeChatModel(
+        latency=settings.fake_llm_latency,
+        task_latency=settings.fake_llm_task_latency,
+        failure_rate=settings.fake_llm_failure_rate,
+        seed=settings.fake_llm_seed,
+        stream_chunk_chars=settings.fake_llm_stream_chunk_chars,
+        stream_chunk_delay_ms=settings.fake_llm_stream_chunk_delay_ms,
+        responses=responses,
+    )
+
+
+def _build_llm():
+    if settings.llm_backend == "fake":
+        return _build_fake_llm()
+    if settings.llm_backend != "gemini":
+        raise ValueError(f"Unknown LLM_BACKEND: {settings.llm_backend!r}")
+
+    return ChatGoogleGenerativeAI(
+        google_api_key = settings.google_api_key,
+        model="gemini-2.0-flash",
+        temperature=0,
+        max_tokens=None,
+        timeout=None,
+        max_retries=2,
+    )
+
 
-llm = ChatGoogleGenerativeAI(
-    google_api_key = settings.google_api_key,
-    model="gemini-2.0-flash",
-    temperature=0,
-    max_tokens=None,
-    timeout=None,
-    max_retries=2,
-)
\ No newline at end of file
+llm = _build_llm()
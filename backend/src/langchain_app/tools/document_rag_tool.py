@@ -0,0 +1,123 @@
+"""
+ENHANCEMENT L2 AI CLOSING RAG
+
+Retrieves knowledge base article chunks relevant to a ticket from the local
+KB vector index so they can be quoted in AI prompts.
+
+Retrieved chunks are cached per ticket, keyed by a fingerprint of the query
+text and the vector index generation: asking for closing suggestions again
+reuses the earlier retrieval until the ticket text or the KB changes.
+"""
+
+import hashlib
+import time
+from collections import OrderedDict
+from typing import List, NamedTuple
+
+from bson import ObjectId
+
+from src.db.init_db import get_database
+from src.services.kb_vector_service import KBVectorService
+from src.services.search import SearchService
+
+TOP_K = 4
+MAX_CHUNKS_PER_ARTICLE = 2
+MAX_CHUNK_CHARS = 800
+CACHE_SIZE = 512
+
+
+class KBChunk(NamedTuple):
+    key: str
+    article_id: str
+    title: str
+    text: str
+    score: float
+
+
+class _CacheEntry(NamedTuple):
+    fingerprint: str
+    generation: int
+    chunks: List[KBChunk]
+
+
+_cache: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+
+
+def build_ticket_query(ticket_data: dict) -> str:
+    """Retrieval query for a ticket; comments are left out so new replies don't invalidate the cache."""
+    return "\n".join(
+        part for part in (
+            ticket_data.get("title", ""),
+            ticket_data.get("description", ""),
+            ticket_data.get("category", ""),
+            ticket_data.get("subcategory", ""),
+        ) if part
+    )
+
+
+def _fingerprint(query: str, k: int) -> str:
+    return hashlib.sha1(f"{k}\n{query}".encode("utf-8")).hexdigest()
+
+
+async def _article_titles(article_ids: List[str]) -> dict:
+    db = await get_database()
+    cursor = db.articles.find({"_id": {"$in": [ObjectId(a) for a in article_ids]}}, {"title": 1})
+    return {str(doc["_id"]): doc.get("title", "") async for doc in cursor}
+
+
+async def _search(query: str, k: int) -> List[KBChunk]:
+    # Over-fetch so a single long article can't crowd out the others
+    hits = await KBVectorService.search(query, k=k * MAX_CHUNKS_PER_ARTICLE)
+
+    per_article = {}
+    selected = []
+    for hit in hits:
+        if per_article.get(hit.owner, 0) >= MAX_CHUNKS_PER_ARTICLE:
+            continue
+        per_article[hit.owner] = per_article.get(hit.owner, 0) + 1
+        selected.append(hit)
+        if len(selected) == k:
+            break
+
+    titles = await _article_titles(list(per_article)) if selected else {}
+    return [
+        KBChunk(hit.key, hit.owner, titles.get(hit.owner, ""), hit.metadata.get("text", "")[:MAX_CHUNK_CHARS], hit.score)
+        for hit in selected
+        if hit.owner in titles  # Skip articles deleted since they were indexed
+    ]
+
+
+async def retrieve_kb_chunks(ticket_id: str, ticket_data: dict, k: int = TOP_K) -> List[KBChunk]:
+    """Top-k KB chunks for a ticket, served from the per-ticket cache when still valid."""
+    query = build_ticket_query(ticket_data)
+    if not query:
+        return []
+
+    fingerprint = _fingerprint(query, k)
+    await SearchService.ensure_kb_indexes()  # Other workers' article edits reach the vector index through it
+    generation = (await KBVectorService.get_index()).generation
+
+    entry = _cache.get(ticket_id)
+    if entry and entry.fingerprint == fingerprint and entry.generation == generation:
+        _cache.move_to_end(ticket_id)
+        print(f"KB retrieval for ticket {ticket_id}: cache hit, chunks={[c.key for c in entry.chunks]}")
+        return entry.chunks
+
+    started = time.perf_counter()
+    chunks = await _search(query, k)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    print(f"KB retrieval for ticket {ticket_id}: {elapsed_ms:.1f} ms, chunks={[c.key for c in chunks]}")
+
+    _cache[ticket_id] = _CacheEntry(fingerprint, generation, chunks)
+    _cache.move_to_end(ticket_id)
+    while len(_cache) > CACHE_SIZE:
+        _cache.popitem(last=False)
+    return chunks
+
+
+def format_kb_context(chunks: List[KBChunk]) -> str:
+    """Render chunks as numbered prompt context."""
+    return "\n\n".join(
+        f"[{n}] {chunk.title} (article {chunk.article_id})\n{chunk.text}"
+        for n, chunk in enumerate(chunks, start=1)
+    )
@@ -0,0 +1,127 @@
+"""
+ENHANCEMENT L2 KB EMBEDDINGS
+
+Offline text-to-vector pipeline for knowledge base articles.
+
+Article text is split into overlapping word windows and each chunk is
+encoded into a dense, L2-normalised float32 vector. The encoder is
+pluggable through the ``EMBEDDING_ENCODER`` setting; the default is a
+deterministic hashing vectorizer that needs no model download or network
+access, so every worker produces identical vectors for identical text.
+"""
+
+import hashlib
+import importlib
+import math
+import re
+from functools import lru_cache
+from typing import List, Protocol, Sequence
+
+import numpy as np
+
+from src.core.config import settings
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+@lru_cache(maxsize=262144)
+def _feature_hash(feature: str) -> int:
+    return int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class TextEncoder(Protocol):
+    """Anything that turns texts into an (n, dim) float32 matrix of unit vectors."""
+
+    name: str
+    dim: int
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        ...
+
+
+def chunk_text(text: str, max_words: int = 120, overlap: int = 30) -> List[str]:
+    """
+    Split text into overlapping windows of at most ``max_words`` words.
+    Overlap keeps sentences that straddle a boundary retrievable from both sides.
+    """
+    words = text.split()
+    if not words:
+        return []
+    if len(words) <= max_words:
+        return [" ".join(words)]
+
+    step = max(1, max_words - overlap)
+    chunks = []
+    for start in range(0, len(words), step):
+        chunks.append(" ".join(words[start:start + max_words]))
+        if start + max_words >= len(words):
+            break
+    return chunks
+
+
+class HashingEncoder:
+    """
+    Signed feature-hashing vectorizer over words, word bigrams and character
+    4-grams. Character n-grams give some robustness to inflections and
+    compound words; blake2b keeps the hashing stable across processes
+    (unlike the built-in ``hash``).
+    """
+
+    def __init__(self, dim: int = 1024):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def _bucket(self, feature: str) -> tuple:
+        digest = _feature_hash(feature)
+        return digest % self.dim, 1.0 if digest >> 63 else -1.0
+
+    def _features(self, text: str):
+        words = [w.lower() for w in _WORD_RE.findall(text)]
+        for word in words:
+            yield "w:" + word, 1.0
+            padded = f"<{word}>"
+            if len(padded) > 4:
+                for i in range(len(padded) - 3):
+                    yield "c:" + padded[i:i + 4], 0.25
+        for first, second in zip(words, words[1:]):
+            yield f"b:{first} {second}", 0.5
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            counts = {}
+            for feature, weight in self._features(text):
+                counts[feature] = counts.get(feature, 0.0) + weight
+            for feature, weight in counts.items():
+                bucket, sign = self._bucket(feature)
+                # Sublinear term frequency so repeated words don't dominate
+                matrix[row, bucket] += sign * (1.0 + math.log(weight)) if weight >= 1.0 else sign * weight
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+
+@lru_cache(maxsize=1)
+def get_encoder() -> TextEncoder:
+    """
+    Resolve the configured encoder. ``hashing`` selects the built-in
+    vectorizer; anything else is a ``package.module:ClassName`` path to a
+    class exposing ``name``, ``dim`` and ``encode``.
+    """
+    spec = settings.embedding_encoder
+    if spec == "hashing":
+        return HashingEncoder(dim=settings.embedding_dim)
+
+    module_name, _, class_name = spec.partition(":")
+    encoder_cls = getattr(importlib.import_module(module_name), class_name)
+    return encoder_cls()
+
+
+def article_chunks(title: str, text: str) -> List[str]:
+    """Chunks for an article's plain text (title alone when there is no body)."""
+    return chunk_text(text) or ([title] if title else [])
+
+
+def encode_chunks(title: str, chunks: Sequence[str]) -> np.ndarray:
+    """Encode chunks with the article title prepended for context."""
+    return get_encoder().encode([f"{title}\n{chunk}" for chunk in chunks])
@@ -0,0 +1,231 @@
+"""
+ENHANCEMENT L2 KB EMBEDDINGS
+
+In-process vector index backed by a single NumPy matrix.
+
+Rows are unit vectors, so cosine similarity is a plain matrix-vector
+product. Vectors are grouped by an owner (the article id) so an article's
+chunks can be replaced or removed together. Snapshots are a ``.npy``
+matrix plus a JSON sidecar; loading memory-maps the matrix so startup does
+not read the whole file, and the first write copies it into a growable
+in-memory buffer.
+
+Several workers snapshot into the same directory. Each snapshot writes its
+matrix under a unique name and then atomically replaces the sidecar, which
+names the matrix it belongs to, so a reader always gets a matching pair.
+"""
+
+import glob
+import json
+import os
+import time
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+VECTORS_FILE = "vectors.npy"  # Matrix of snapshots whose sidecar names none
+META_FILE = "meta.json"
+STALE_VECTORS_SECONDS = 300  # Unreferenced matrices older than this are left over from other snapshots
+LOAD_ATTEMPTS = 3
+
+
+class VectorHit(NamedTuple):
+    key: str
+    owner: str
+    score: float
+    metadata: dict
+
+
+class VectorIndex:
+    def __init__(self, dim: int, encoder_name: str):
+        self.dim = dim
+        self.encoder_name = encoder_name
+        self.generation = 0  # Bumped on every mutation; lets callers cache results
+        self.owner_versions: Dict[str, str] = {}
+
+        self._vectors = np.zeros((0, dim), dtype=np.float32)
+        self._size = 0
+        self._keys: List[str] = []
+        self._owners: List[str] = []
+        self._metadata: List[dict] = []
+        self._rows: Dict[str, int] = {}
+        self._owner_keys: Dict[str, List[str]] = {}
+
+    def __len__(self) -> int:
+        return self._size
+
+    def owners(self) -> List[str]:
+        return list(self._owner_keys)
+
+    def keys_for(self, owner: str) -> List[str]:
+        return list(self._owner_keys.get(owner, []))
+
+    def _ensure_capacity(self, needed: int) -> None:
+        # Memory-mapped snapshots are read-only; grow into a private buffer
+        if needed <= self._vectors.shape[0] and self._vectors.flags.writeable:
+            return
+        capacity = max(needed, 2 * self._vectors.shape[0], 64)
+        grown = np.zeros((capacity, self.dim), dtype=np.float32)
+        grown[:self._size] = self._vectors[:self._size]
+        self._vectors = grown
+
+    def _remove_row(self, key: str) -> None:
+        row = self._rows.pop(key)
+        last = self._size - 1
+        if row != last:
+            # Swap the last row into the hole to keep storage dense
+            self._vectors[row] = self._vectors[last]
+            moved_key = self._keys[last]
+            self._keys[row] = moved_key
+            self._owners[row] = self._owners[last]
+            self._metadata[row] = self._metadata[last]
+            self._rows[moved_key] = row
+        self._keys.pop()
+        self._owners.pop()
+        self._metadata.pop()
+        self._size = last
+
+    def upsert(
+        self,
+        owner: str,
+        keys: Sequence[str],
+        vectors: np.ndarray,
+        metadata: Sequence[dict],
+        version: Optional[str] = None,
+    ) -> None:
+        """Replace every vector belonging to ``owner`` with the given rows."""
+        if vectors.shape != (len(keys), self.dim):
+            raise ValueError(f"Expected vectors of shape ({len(keys)}, {self.dim}), got {vectors.shape}")
+
+        self._ensure_capacity(self._size + len(keys))
+        for stale in set(self._owner_keys.get(owner, [])) - set(keys):
+            self._remove_row(stale)
+
+        for key, vector, meta in zip(keys, vectors, metadata):
+            row = self._rows.get(key)
+            if row is None:
+                row = self._size
+                self._rows[key] = row
+                self._keys.append(key)
+                self._owners.append(owner)
+                self._metadata.append(meta)
+                self._size += 1
+            else:
+                self._metadata[row] = meta
+            self._vectors[row] = vector
+
+        self._owner_keys[owner] = list(keys)
+        if version is not None:
+            self.owner_versions[owner] = version
+        self.generation += 1
+
+    def delete(self, owner: str) -> None:
+        keys = self._owner_keys.pop(owner, None)
+        self.owner_versions.pop(owner, None)
+        if not keys:
+            return
+        self._ensure_capacity(self._size)
+        for key in keys:
+            self._remove_row(key)
+        self.generation += 1
+
+    def search(self, query: np.ndarray, k: int = 5, owners: Optional[set] = None) -> List[VectorHit]:
+        """Top-k rows by cosine similarity to a unit query vector."""
+        if self._size == 0 or k <= 0:
+            return []
+
+        scores = self._vectors[:self._size] @ query.astype(np.float32, copy=False)
+        if owners is not None:
+            mask = np.fromiter((owner in owners for owner in self._owners), dtype=bool, count=self._size)
+            scores = np.where(mask, scores, -np.inf)
+
+        k = min(k, self._size)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            VectorHit(self._keys[row], self._owners[row], float(scores[row]), self._metadata[row])
+            for row in top
+            if np.isfinite(scores[row])
+        ]
+
+    def export(self) -> dict:
+        """Copy the index state so it can be written off the event loop."""
+        return {
+            "vectors": np.array(self._vectors[:self._size]),
+            "meta": {
+                "dim": self.dim,
+                "encoder": self.encoder_name,
+                "keys": list(self._keys),
+                "owners": list(self._owners),
+                "metadata": list(self._metadata),
+                "owner_versions": dict(self.owner_versions),
+            },
+        }
+
+    @staticmethod
+    def write(directory: str, state: dict) -> None:
+        """Write an exported state atomically: a uniquely named matrix, then the sidecar naming it."""
+        os.makedirs(directory, exist_ok=True)
+        token = f"{os.getpid()}.{time.time_ns()}"
+
+        vectors_name = f"vectors.{token}.npy"
+        vectors_tmp = os.path.join(directory, vectors_name + ".tmp")
+        with open(vectors_tmp, "wb") as handle:
+            np.save(handle, state["vectors"])
+        os.replace(vectors_tmp, os.path.join(directory, vectors_name))
+
+        meta_tmp = os.path.join(directory, f"{META_FILE}.{token}.tmp")
+        with open(meta_tmp, "w", encoding="utf-8") as handle:
+            json.dump({**state["meta"], "vectors_file": vectors_name}, handle)
+        os.replace(meta_tmp, os.path.join(directory, META_FILE))
+
+        # Matrices of replaced snapshots; recent ones may belong to a snapshot another worker is still writing
+        cutoff = time.time() - STALE_VECTORS_SECONDS
+        for path in glob.glob(os.path.join(directory, "vectors*.npy")):
+            if os.path.basename(path) != vectors_name:
+                try:
+                    if os.path.getmtime(path) < cutoff:
+                        os.unlink(path)  # Memory-mapped readers keep their copy
+                except FileNotFoundError:
+                    pass
+
+    def save(self, directory: str) -> None:
+        self.write(directory, self.export())
+
+    @classmethod
+    def load(cls, directory: str, dim: int, encoder_name: str) -> Optional["VectorIndex"]:
+        """
+        Load a snapshot, memory-mapping the vectors. Returns None when there
+        is no snapshot or it was built with a different encoder.
+        """
+        meta_path = os.path.join(directory, META_FILE)
+        for _ in range(LOAD_ATTEMPTS):
+            try:
+                with open(meta_path, encoding="utf-8") as handle:
+                    meta = json.load(handle)
+            except FileNotFoundError:
+                return None
+            if meta.get("dim") != dim or meta.get("encoder") != encoder_name:
+                return None
+            try:
+                vectors = np.load(os.path.join(directory, meta.get("vectors_file", VECTORS_FILE)), mmap_mode="r")
+                break
+            except FileNotFoundError:
+                continue  # Replaced by a newer snapshot between the two reads
+        else:
+            return None
+
+        if vectors.shape != (len(meta["keys"]), dim):
+            return None
+
+        index = cls(dim, encoder_name)
+        index._vectors = vectors
+        index._size = vectors.shape[0]
+        index._keys = list(meta["keys"])
+        index._owners = list(meta["owners"])
+        index._metadata = list(meta["metadata"])
+        index._rows = {key: row for row, key in enumerate(index._keys)}
+        for key, owner in zip(index._keys, index._owners):
+            index._owner_keys.setdefault(owner, []).append(key)
+        index.owner_versions = dict(meta.get("owner_versions", {}))
+        return index
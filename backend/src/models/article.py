@@ -1,12 +1,34 @@
 from typing import List, Optional
 from beanie import Document, Link, PydanticObjectId
-from pydantic import Field
+from pydantic import BaseModel, Field
 from datetime import datetime, timezone
 from src.models.category import Category
 from src.models.subcategory import SubCategory
 from src.models.tag import Tag
 from src.models.rich_text import RichTextContent
 
+# ENHANCEMENT L2 KB RELATED ARTICLES - Precomputed neighbour, denormalised so reads need no extra query
+class RelatedArticleRef(BaseModel):
+    id: str
+    title: str
+    score: float
+
+# ENHANCEMENT L2 KB RENDERING - Derived from content.html on every write by ArticleRenderService
+class TocEntry(BaseModel):
+    level: int
+    text: str
+    anchor: str  # id attribute of the heading in the sanitized HTML
+
+class ArticleRendering(BaseModel):
+    html: str = Field(..., description="Sanitized HTML with heading anchors")
+    toc: List[TocEntry] = Field(default_factory=list, description="Headings in document order")
+    text: str = Field(..., description="Normalized plain text, one block per line")
+    word_count: int = Field(0, alias="wordCount")
+    version: int = Field(0, description="Renderer version that produced these artifacts")
+
+    class Config:
+        populate_by_name = True
+
 class Article(Document):
     id: Optional[PydanticObjectId] = Field(default=None, alias="_id", description="Primary key (MongoDB ObjectId)")
     title: str = Field(..., description="Title of the article")
@@ -16,6 +38,12 @@ class Article(Document):
     tags: List[Link[Tag]] = Field(default_factory=list, description="Tags associated with the article")
     ai_generated_tags: List[str] = Field(default_factory=list, description="AI-generated tags based on article content", alias="aiGeneratedTags")
     vector_ids: List[str] = Field(default_factory=list, description="Vector IDs for AI search", alias="vectorIds")
+    # ENHANCEMENT L2 KB SUGGEST - Popularity signal for autocomplete ranking
+    view_count: int = Field(default=0, description="Number of times the article was opened", alias="viewCount")
+    # ENHANCEMENT L2 KB RELATED ARTICLES - Maintained by RelatedArticleService, most similar first
+    related_articles: List[RelatedArticleRef] = Field(default_factory=list, description="Most similar articles by TF-IDF", alias="relatedArticles")
+    # ENHANCEMENT L2 KB RENDERING - Precomputed display and text artifacts of the content
+    rendered: Optional[ArticleRendering] = Field(default=None, description="Sanitized HTML, TOC, plain text and word count")
     
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), alias="createdAt")
     updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), alias="updatedAt")
@@ -6,7 +6,7 @@ Uses GridFS for efficient file storage and metadata management
 """
 
 from datetime import datetime
-from typing import Optional
+from typing import Dict, List, Optional
 from bson import ObjectId
 from pydantic import BaseModel, Field, ConfigDict
 
@@ -32,7 +32,13 @@ class FileDocument(BaseModel):
     upload_date: datetime
     uploaded_by: str  # user_id
     gridfs_id: ObjectId  # GridFS file ID
+    encoding: Optional[str] = None  # ENHANCEMENT L2 FILE COMPRESSION - Content-Encoding of the stored bytes ("gzip"), None if stored as is
+    stored_size: Optional[int] = None  # ENHANCEMENT L2 FILE COMPRESSION - Bytes in storage (size is the original length)
+    storage: Optional[str] = None  # ENHANCEMENT L2 FILE STORAGE - Engine holding gridfs_id's content ("gridfs" or "local"; None: gridfs)
     md5: Optional[str] = None  # File hash for integrity checking
+    sha256: Optional[str] = None  # ENHANCEMENT L2 FILE DEDUP - Content key in file_blobs (None for files stored before dedup)
+    previews: Dict[str, ObjectId] = Field(default_factory=dict)  # ENHANCEMENT L2 FILE PREVIEWS - Preview size -> derived GridFS id
+    preview_version: Optional[int] = None  # ENHANCEMENT L2 FILE PREVIEWS - PREVIEW_VERSION the linked previews were made with
     is_virus_scanned: bool = False
     virus_scan_result: Optional[str] = None
 
@@ -55,4 +61,5 @@ class TicketFileAttachment(BaseModel):
     ticket_id: str
     file_id: str
     attached_by: str  # user_id
-    attached_at: datetime
\ No newline at end of file
+    attached_at: datetime
+    acl: List[str] = Field(default_factory=list)  # ENHANCEMENT L2 FILE ACL - "user:<id>" / "category:<id>" the ticket grants access to
\ No newline at end of file
@@ -39,6 +39,10 @@ class Ticket(Document):
     sla_paused_at: Optional[datetime] = Field(None, description="When SLA was paused (waiting for customer)")
     sla_total_paused_time: int = Field(default=0, description="Total minutes SLA has been paused")
 
+    # ENHANCEMENT L2 DUPLICATE DETECTION - MinHash signature and likely duplicates found at creation
+    minhash_signature: Optional[List[int]] = Field(None, description="MinHash signature of title + content text")
+    possible_duplicate_ids: List[str] = Field(default_factory=list, description="Likely duplicate tickets detected at creation")
+
     class Settings:
         name = "tickets"  # MongoDB collection name
 
@@ -3,6 +3,7 @@ from typing import List, Optional, Dict
 from datetime import datetime
 from beanie import PydanticObjectId
 from src.models.rich_text import RichTextContent
+from src.models.article import ArticleRendering
 from src.schemas.category import CategoryResponse
 from src.schemas.subcategory import SubCategoryResponse
 
@@ -31,9 +32,72 @@ class ArticleResponse(BaseModel):
     created_at: datetime = Field(alias="createdAt")
     updated_at: datetime = Field(alias="updatedAt")
 
+    # ENHANCEMENT L2 KB SEARCH - Set on search results only
+    snippet: Optional[str] = None  # HTML-escaped excerpt with query terms wrapped in <mark>
+
+    # ENHANCEMENT L2 KB RELATED ARTICLES - Set on single-article reads only
+    related: Optional[List["RelatedArticle"]] = None
+
+    # ENHANCEMENT L2 KB RENDERING - Set on single-article reads only
+    rendered: Optional[ArticleRendering] = None
+
+    class Config:
+        populate_by_name = True
+
+# ENHANCEMENT L2 KB RELATED ARTICLES - Precomputed similar article
+class RelatedArticle(BaseModel):
+    id: str
+    title: str
+    score: float  # TF-IDF cosine similarity
+
+ArticleResponse.model_rebuild()
+
+# ENHANCEMENT L2 KB SUGGEST - Autocomplete entry for the KB search box
+class ArticleSuggestion(BaseModel):
+    text: str
+    kind: str  # "title", "tag", "category" or "subcategory"
+    id: Optional[str] = None  # Article id for titles, category/subcategory id for categories
+    popularity: float = 0
+
+# ENHANCEMENT L2 KB FACETS - Search hits with per-facet counts over all matches
+class FacetCount(BaseModel):
+    value: str  # Category/subcategory id, or the AI tag itself
+    label: str  # Display name
+    count: int
+
+class ArticleSearchFacets(BaseModel):
+    categories: List[FacetCount] = Field(default_factory=list)
+    subcategories: List[FacetCount] = Field(default_factory=list)
+    ai_tags: List[FacetCount] = Field(default_factory=list, alias="aiTags")
+
     class Config:
         populate_by_name = True
 
+class ArticleSearchResponse(BaseModel):
+    hits: List[ArticleResponse]
+    total: int  # Matching articles, including those beyond the returned hits
+    facets: ArticleSearchFacets
+
+# ENHANCEMENT L2 KB DEFLECTION - Articles that may answer a ticket before it is submitted
+class DeflectRequest(BaseModel):
+    title: str = ""
+    description: str = ""
+    category_id: Optional[str] = Field(None, alias="categoryId")
+    subcategory_id: Optional[str] = Field(None, alias="subcategoryId")
+    limit: int = Field(5, ge=1, le=10)
+
+    class Config:
+        populate_by_name = True
+
+class DeflectSuggestion(BaseModel):
+    id: str
+    title: str
+    score: float  # BM25 score
+
+class DeflectResponse(BaseModel):
+    articles: List[DeflectSuggestion]
+    complete: bool = True  # False when scoring was cut short by the latency budget
+
 class ArticleUpdate(BaseModel):
     title: Optional[str] = None
     content: Optional[RichTextContent] = None
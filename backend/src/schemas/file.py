@@ -6,7 +6,7 @@ Defines the data structures used for file-related API operations
 """
 
 from datetime import datetime
-from typing import List
+from typing import List, Optional
 from pydantic import BaseModel, Field
 
 
@@ -20,6 +20,7 @@ class FileUploadResponse(BaseModel):
     size: int
     url: str
     uploaded_at: datetime
+    preview_url: Optional[str] = None  # ENHANCEMENT L2 FILE PREVIEWS - Set for images; add ?size=thumb|small|medium
 
 
 class AttachFilesRequest(BaseModel):
@@ -38,4 +39,35 @@ class FileAttachmentResponse(BaseModel):
     content_type: str
     size: int
     url: str
-    uploaded_at: datetime
\ No newline at end of file
+    uploaded_at: datetime
+    preview_url: Optional[str] = None  # ENHANCEMENT L2 FILE PREVIEWS - Set for images
+
+
+class StorageStatsResponse(BaseModel):
+    """
+    ENHANCEMENT L2 FILE DEDUP - Storage used by uploads, before and after deduplication
+    """
+    files: int
+    blobs: int  # Distinct stored contents
+    logical_bytes: int  # Sum of all file sizes
+    stored_bytes: int  # Bytes actually kept in GridFS
+    saved_bytes: int
+
+
+class BatchUploadResult(BaseModel):
+    """
+    ENHANCEMENT L2 BATCH UPLOADS - Outcome of one file in a batch upload
+    """
+    filename: str
+    status_code: int  # HTTP status the file would have got on its own
+    file: Optional[FileUploadResponse] = None
+    error: Optional[str] = None
+
+
+class BatchUploadResponse(BaseModel):
+    """
+    ENHANCEMENT L2 BATCH UPLOADS - Per-file results of a batch upload, in request order
+    """
+    results: List[BatchUploadResult]
+    uploaded: int
+    failed: int
@@ -68,6 +68,21 @@ class TicketResponse(BaseModel):
     sla_total_paused_time: Optional[int] = Field(None, description="Total minutes SLA has been paused", alias="slaTotalPausedTime")
     version: int = Field(..., description="Current optimistic locking version")
 
+    # ENHANCEMENT L2 DUPLICATE DETECTION - Likely duplicates flagged at creation
+    possible_duplicate_ids: List[str] = Field(default_factory=list, alias="possibleDuplicateIds")
+
+    class Config:
+        populate_by_name = True
+
+# ENHANCEMENT L2 DUPLICATE DETECTION - Candidate duplicate returned by /tickets/{id}/duplicates
+class DuplicateTicketResponse(BaseModel):
+    id: str
+    title: str
+    status: TicketStatus
+    similarity: float
+    created_at: datetime = Field(alias="createdAt")
+    agent_info: Optional[UserInfo] = Field(None, alias="agentInfo")
+
     class Config:
         populate_by_name = True
 
@@ -1,8 +1,10 @@
-from src.langchain_app.chains.summarize_ticket_data import summarize_ticket_data
+from src.langchain_app.chains.summarize_ticket_data import fallback_summary, stream_summarize_ticket_data
 from src.langchain_app.chains.generate_closing_comments import generate_closing_comments
+from src.langchain_app.tools.document_rag_tool import retrieve_kb_chunks, format_kb_context
 from src.langchain_app.chains.generate_tags import generate_tags_for_article
 from .ticket_service import TicketService
 from .comment_service import CommentService
+from .summary_stream import SummaryGeneration, summary_stream_broker, format_sse
 from src.schemas.summary import TicketSummaryResponse
 from src.schemas.closing_comments import ClosingComments
 # ENHANCEMENT L1 AI CLOSING SUGGESTIONS - Additional imports for direct database access
@@ -10,14 +12,12 @@ from src.models.ticket import Ticket
 from src.models.comment import Comment
 from beanie import PydanticObjectId
 from fastapi import HTTPException
+from datetime import datetime, timezone
+from typing import AsyncIterator
 
 class AIService:
     @staticmethod
-    async def get_ticket_summary(ticket_id: str) -> str:
-        # Import here to avoid circular imports
-        from src.models.ticket import Ticket
-        from beanie import PydanticObjectId
-        
+    async def _load_ticket(ticket_id: str) -> Ticket:
         # Get the raw ticket model directly from database
         try:
             ticket_obj_id = PydanticObjectId(ticket_id)
@@ -27,11 +27,10 @@ class AIService:
 
         if not ticket:
             raise HTTPException(status_code=404, detail="Ticket not found")
-            
-        # Return cached summary if it exists
-        if ticket.ai_summary:
-            return TicketSummaryResponse(summary=ticket.ai_summary)
-            
+        return ticket
+
+    @staticmethod
+    async def _build_summary_data(ticket: Ticket) -> dict:
         # Handle linked objects - they might be Link objects (need fetch) or actual objects (already fetched)
         if hasattr(ticket.category_id, 'fetch'):
             category = await ticket.category_id.fetch() if ticket.category_id else None
@@ -44,10 +43,9 @@ class AIService:
             subcategory = ticket.sub_category_id
 
         # Fetch comments separately if not linked
-        comments = await CommentService.get_comments_by_ticket(ticket_id)
+        comments = await CommentService.get_comments_by_ticket(str(ticket.id))
 
-        # Build data for summary
-        summary_data = {
+        return {
             "title": ticket.title,
             "description": ticket.description,
             "category": category.name if category else "Uncategorized",
@@ -56,16 +54,75 @@ class AIService:
             "comments": [c.content.text for c in comments],
         }
 
-        # Send to LangChain summary function
-        summary = await summarize_ticket_data(summary_data)
-        
-        # Store the summary in the ticket
-        from datetime import datetime, timezone
-        ticket.ai_summary = summary
-        ticket.summary_generated_at = datetime.now(timezone.utc)
-        await ticket.save()
-        
-        return TicketSummaryResponse(summary=summary)
+    @staticmethod
+    async def _produce_summary(ticket: Ticket, generation: SummaryGeneration) -> None:
+        """Run the model for a ticket, publishing chunks and persisting the final text."""
+        summary_data = await AIService._build_summary_data(ticket)
+
+        async for chunk in stream_summarize_ticket_data(summary_data):
+            await generation.publish(chunk)
+
+        # Store the summary in the ticket once the stream completes
+        await Ticket.find_one(Ticket.id == ticket.id).update({
+            "$set": {
+                "ai_summary": generation.text.strip(),
+                "summary_generated_at": datetime.now(timezone.utc),
+            }
+        })
+
+    @staticmethod
+    def _attach_summary_generation(ticket: Ticket) -> SummaryGeneration:
+        # Concurrent callers for the same ticket share the in-flight generation
+        return summary_stream_broker.attach(
+            str(ticket.id),
+            lambda generation: AIService._produce_summary(ticket, generation),
+        )
+
+    @staticmethod
+    async def get_ticket_summary(ticket_id: str) -> TicketSummaryResponse:
+        ticket = await AIService._load_ticket(ticket_id)
+
+        # Return cached summary if it exists
+        if ticket.ai_summary:
+            return TicketSummaryResponse(summary=ticket.ai_summary)
+
+        generation = AIService._attach_summary_generation(ticket)
+        try:
+            chunks = [chunk async for chunk in generation.subscribe()]
+        except Exception as e:
+            # A generation that failed part-way is not persisted; answer with the plain-text summary instead
+            print(f"AI summary generation failed: {e}")
+            return TicketSummaryResponse(summary=fallback_summary(await AIService._build_summary_data(ticket)))
+        return TicketSummaryResponse(summary="".join(chunks).strip())
+
+    # ENHANCEMENT L1 AI TICKET SUMMARY STREAMING - Server-sent events for the summary
+    @staticmethod
+    async def stream_ticket_summary(ticket_id: str) -> AsyncIterator[str]:
+        """
+        Validate the ticket up front (so errors surface as normal HTTP errors)
+        and return an iterator of SSE frames: ``token`` events carrying text
+        chunks, followed by a single ``done`` or ``error`` event.
+        """
+        ticket = await AIService._load_ticket(ticket_id)
+        return AIService._summary_events(ticket)
+
+    @staticmethod
+    async def _summary_events(ticket: Ticket) -> AsyncIterator[str]:
+        if ticket.ai_summary:
+            yield format_sse("token", {"text": ticket.ai_summary})
+            yield format_sse("done", {"summary": ticket.ai_summary, "cached": True})
+            return
+
+        generation = AIService._attach_summary_generation(ticket)
+        try:
+            async for chunk in generation.subscribe():
+                yield format_sse("token", {"text": chunk})
+        except Exception as e:
+            yield format_sse("error", {"detail": str(e)})
+            return
+
+        yield format_sse("done", {"summary": generation.text.strip(), "cached": False})
+
     # ENHANCEMENT L1 AI CLOSING SUGGESTIONS - Generate AI-powered closing suggestions
     @staticmethod
     async def get_closing_comments(ticket_id: str) -> ClosingComments:
@@ -114,6 +171,13 @@ class AIService:
             "comments": [comment.content.get('text', '') if hasattr(comment.content, 'get') else str(comment.content) for comment in comments],
         }
 
+        # ENHANCEMENT L2 AI CLOSING RAG - Retrieval is best effort; the chain works without it
+        try:
+            kb_chunks = await retrieve_kb_chunks(str(ticket.id), data)
+            data["kb_context"] = format_kb_context(kb_chunks)
+        except Exception as e:
+            print(f"KB retrieval for ticket {ticket.id} failed: {e}")
+
         try:
             closing_suggestion = await generate_closing_comments(data)
             return closing_suggestion
@@ -150,20 +214,9 @@ class AIService:
                     raise HTTPException(status_code=404, detail="Article not found")
                 
                 title = article.title
-                # Extract plain text from rich content
-                if hasattr(article.content, 'text') and article.content.text:
-                    content = article.content.text
-                elif hasattr(article.content, 'html') and article.content.html:
-                    # Strip HTML tags to get plain text
-                    import re
-                    content = re.sub(r'<[^>]+>', '', article.content.html).strip()
-                else:
-                    # Last resort - try to extract text from any structure
-                    content_str = str(article.content)
-                    if 'text' in content_str and not content_str.startswith('{'):
-                        content = content_str
-                    else:
-                        content = "No readable content available"
+                # ENHANCEMENT L2 KB RENDERING - Precomputed plain text (rendered and stored if missing)
+                from src.services.article_render_service import ArticleRenderService
+                content = await ArticleRenderService.plain_text(article) or "No readable content available"
                     
             except Exception as e:
                 raise HTTPException(status_code=400, detail=f"Invalid article ID: {str(e)}")
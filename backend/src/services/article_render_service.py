@@ -0,0 +1,74 @@
+# ENHANCEMENT L2 KB RENDERING - Sanitized HTML, TOC, plain text and word count, computed once per write
+
+import asyncio
+from typing import Iterable, List
+
+from pymongo import UpdateOne
+
+from src.core.config import settings
+from src.db.init_db import get_database
+from src.models.article import Article, ArticleRendering, TocEntry
+from src.models.rich_text import RichTextContent
+from src.utils.html_render import RENDER_VERSION, Rendering, render_html, render_text
+from src.utils.process_pool import run_in_process
+
+
+class ArticleRenderService:
+    """
+    Produces ``Article.rendered`` from ``Article.content``.
+
+    Article writes render before saving, so reads, search indexing and the
+    AI chains use the stored artifacts instead of re-parsing HTML. Large
+    documents render in the shared process pool; small ones render inline,
+    where the worker round trip would cost more than the parse. Articles
+    written before rendering existed (or by an older renderer) are rendered
+    on first read and stored.
+    """
+
+    @staticmethod
+    def _model(rendering: Rendering) -> ArticleRendering:
+        return ArticleRendering(
+            html=rendering.html,
+            toc=[TocEntry(level=entry.level, text=entry.text, anchor=entry.anchor) for entry in rendering.toc],
+            text=rendering.text,
+            word_count=rendering.word_count,
+            version=rendering.version,
+        )
+
+    @classmethod
+    async def render(cls, content: RichTextContent) -> ArticleRendering:
+        if content.html.strip():
+            fn, source = render_html, content.html
+        else:
+            fn, source = render_text, content.text  # Plain-text content has no HTML to render
+        if len(source) <= settings.render_inline_max_chars:
+            return cls._model(fn(source))
+        return cls._model(await run_in_process(fn, source))
+
+    @staticmethod
+    def is_current(article: Article) -> bool:
+        return article.rendered is not None and article.rendered.version == RENDER_VERSION
+
+    @classmethod
+    async def ensure_rendered(cls, articles: Iterable[Article]) -> None:
+        """Render and store artifacts for articles that lack current ones."""
+        stale: List[Article] = [article for article in articles if not cls.is_current(article)]
+        if not stale:
+            return
+        renderings = await asyncio.gather(*(cls.render(article.content) for article in stale))
+        requests = []
+        for article, rendering in zip(stale, renderings):
+            article.rendered = rendering
+            # Skip the write if the content changed meanwhile; that write rendered its own
+            requests.append(UpdateOne(
+                {"_id": article.id, "content.html": article.content.html, "content.text": article.content.text},
+                {"$set": {"rendered": rendering.model_dump(by_alias=True)}},
+            ))
+        db = await get_database()
+        await db.articles.bulk_write(requests, ordered=False)
+
+    @classmethod
+    async def plain_text(cls, article: Article) -> str:
+        """Normalized plain text of an article, rendering it first if needed."""
+        await cls.ensure_rendered([article])
+        return article.rendered.text
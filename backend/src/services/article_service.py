@@ -2,15 +2,26 @@ from src.models.article import Article
 from src.models.category import Category
 from src.models.subcategory import SubCategory
 from src.models.tag import Tag
-from src.schemas.article import ArticleCreate, ArticleUpdate, ArticleResponse, TagBase
+from src.schemas.article import (
+    ArticleCreate, ArticleUpdate, ArticleResponse, TagBase, ArticleSuggestion,
+    ArticleSearchResponse, ArticleSearchFacets, FacetCount, RelatedArticle,
+    DeflectResponse, DeflectSuggestion,
+)
 from src.schemas.category import CategoryResponse
 from src.schemas.subcategory import SubCategoryResponse
 from beanie import PydanticObjectId
-from typing import List
+from beanie.operators import In
+from typing import Dict, List, Optional
 from datetime import datetime, timezone
 from src.services.search import SearchService
+from src.services.kb_vector_service import KBVectorService
+from src.services.suggest_service import SuggestService
+from src.services.tag_service import TagService
+from src.services.article_render_service import ArticleRenderService
 
 class ArticleService:
+    SEARCH_LIMIT = 100
+
     @staticmethod
     async def create_article(data: ArticleCreate) -> ArticleResponse:
         # Convert string IDs to PydanticObjectId
@@ -26,24 +37,26 @@ class ArticleService:
         if not subcategory:
             raise ValueError("Subcategory not found")
 
-        # Create tag links if provided
+        # ENHANCEMENT L2 INTERNED TAGS - Reuse existing (key, value) tags, upserting any new ones in bulk
         tag_links = []
         if data.tags:
-            for tag_dict in data.tags:
-                tag = Tag(**tag_dict)
-                await tag.insert()
-                tag_links.append(tag)
+            tag_links = await TagService.intern_tags((tag_dict.get("key"), tag_dict.get("value")) for tag_dict in data.tags)
 
-        # Create article
+        # Create article (id assigned up front so chunk ids can be stored with it)
         article = Article(
+            id=PydanticObjectId(),
             title=data.title,
             content=data.content,
             category_id=category,
             subcategory_id=subcategory,
             tags=tag_links,
-            vector_ids=data.vector_ids or []
         )
+        # ENHANCEMENT L2 KB RENDERING - Derived artifacts are stored with the article
+        article.rendered = await ArticleRenderService.render(article.content)
+        # ENHANCEMENT L2 KB EMBEDDINGS - Vector ids are owned by the embedding pipeline
+        article.vector_ids = KBVectorService.vector_ids_for(article)
         await article.insert()
+        await KBVectorService.upsert_article(article)
 
         return await ArticleService._build_response(article)
 
@@ -52,32 +65,56 @@ class ArticleService:
         article = await Article.get(PydanticObjectId(article_id))
         if not article:
             raise ValueError("Article not found")
-        return await ArticleService._build_response(article)
+        response = await ArticleService._build_response(article)
+        # ENHANCEMENT L2 KB RELATED ARTICLES - Stored on the article, so no extra query
+        response.related = [RelatedArticle(**related.model_dump()) for related in article.related_articles]
+        # ENHANCEMENT L2 KB RENDERING - Clients display the stored sanitized HTML and TOC
+        await ArticleRenderService.ensure_rendered([article])
+        response.rendered = article.rendered
+        return response
+
+    # ENHANCEMENT L2 KB SUGGEST - Article views feed autocomplete popularity
+    @staticmethod
+    async def record_view(article: ArticleResponse) -> None:
+        await Article.find_one(Article.id == PydanticObjectId(article.id)).update({"$inc": {"viewCount": 1}})
+        SuggestService.record_view(article.title)
+
+    @staticmethod
+    async def suggest(query: str, limit: int = 8) -> List[ArticleSuggestion]:
+        suggestions = await SuggestService.suggest(query, limit)
+        return [
+            ArticleSuggestion(text=s.text, kind=s.kind, id=s.ref_id, popularity=s.popularity)
+            for s in suggestions
+        ]
+
+    # ENHANCEMENT L2 KB DEFLECTION - Suggestions for a ticket draft, straight from the search index
+    @staticmethod
+    async def deflect_articles(terms: List[str], category_id: str = None, subcategory_id: str = None, limit: int = 5) -> DeflectResponse:
+        hits, complete = await SearchService.deflect(terms, category_id, subcategory_id, limit)
+        return DeflectResponse(
+            articles=[DeflectSuggestion(id=article_id, title=title, score=round(score, 4)) for article_id, title, score in hits],
+            complete=complete,
+        )
 
     @staticmethod
     async def get_all_articles() -> List[ArticleResponse]:
         articles = await Article.find_all().to_list()
-        return [await ArticleService._build_response(a) for a in articles]
+        return await ArticleService._build_responses(articles)
 
     @staticmethod
     async def get_articles_by_category(category_id: str) -> List[ArticleResponse]:
-        # Since Beanie is storing full objects, get all articles and filter in Python
-        all_articles = await Article.find_all().to_list()
-        articles = []
-        for article in all_articles:
-            if hasattr(article.category_id, 'id') and str(article.category_id.id) == category_id:
-                articles.append(article)
-        return [await ArticleService._build_response(a) for a in articles]
+        if not PydanticObjectId.is_valid(category_id):
+            return []
+        # Links are stored as DBRefs; match on the indexed ref id instead of filtering every article in Python
+        articles = await Article.find({"categoryId.$id": PydanticObjectId(category_id)}).to_list()
+        return await ArticleService._build_responses(articles)
 
     @staticmethod
     async def get_articles_by_subcategory(subcategory_id: str) -> List[ArticleResponse]:
-        # Since Beanie is storing full objects, get all articles and filter in Python
-        all_articles = await Article.find_all().to_list()
-        articles = []
-        for article in all_articles:
-            if hasattr(article.subcategory_id, 'id') and str(article.subcategory_id.id) == subcategory_id:
-                articles.append(article)
-        return [await ArticleService._build_response(a) for a in articles]
+        if not PydanticObjectId.is_valid(subcategory_id):
+            return []
+        articles = await Article.find({"subCategoryId.$id": PydanticObjectId(subcategory_id)}).to_list()
+        return await ArticleService._build_responses(articles)
 
     @staticmethod
     async def update_article(article_id: str, data: ArticleUpdate) -> ArticleResponse:
@@ -89,6 +126,7 @@ class ArticleService:
             article.title = data.title
         if data.content is not None:
             article.content = data.content
+            article.rendered = await ArticleRenderService.render(article.content)
         if data.category_id is not None:
             category = await Category.get(PydanticObjectId(data.category_id))
             if category:
@@ -97,13 +135,13 @@ class ArticleService:
             subcategory = await SubCategory.get(PydanticObjectId(data.subcategory_id))
             if subcategory:
                 article.subcategory_id = subcategory
-        if data.vector_ids is not None:
-            article.vector_ids = data.vector_ids
         
         # Update the updated_at timestamp
         article.updated_at = datetime.now(timezone.utc)
+        article.vector_ids = KBVectorService.vector_ids_for(article)
         
         await article.save()
+        await KBVectorService.upsert_article(article)
         return await ArticleService._build_response(article)
 
     @staticmethod
@@ -111,9 +149,22 @@ class ArticleService:
         article = await Article.get(PydanticObjectId(article_id))
         if article:
             await article.delete()
+            await KBVectorService.delete_article(article_id)
 
+    # ENHANCEMENT L2 INTERNED TAGS - Resolve the tags of a whole page of articles with one $in query
     @staticmethod
-    async def _build_response(article: Article) -> ArticleResponse:
+    def _tag_id(tag_link):
+        return tag_link.id if isinstance(tag_link, Tag) else tag_link.ref.id
+
+    @staticmethod
+    async def _build_responses(articles: List[Article]) -> List[ArticleResponse]:
+        tags_by_id = await TagService.get_tags_by_ids(
+            ArticleService._tag_id(tag_link) for article in articles for tag_link in article.tags
+        )
+        return [await ArticleService._build_response(a, tags_by_id) for a in articles]
+
+    @staticmethod
+    async def _build_response(article: Article, tags_by_id: Optional[Dict[str, Tag]] = None) -> ArticleResponse:
         # Handle linked objects - they might be Link objects (need fetch) or actual objects (already fetched)
         if hasattr(article.category_id, 'fetch'):
             category = await article.category_id.fetch() if article.category_id else None
@@ -162,14 +213,15 @@ class ArticleService:
             subcategory_response = None
 
         # Handle tags
+        if tags_by_id is None:
+            tags_by_id = await TagService.get_tags_by_ids(
+                ArticleService._tag_id(tag_link) for tag_link in article.tags if not isinstance(tag_link, Tag)
+            )
         tag_bases = []
         for tag_link in article.tags:
-            if isinstance(tag_link, Tag):
-                tag_bases.append(TagBase(key=tag_link.key, value=tag_link.value))
-            else:
-                tag_doc = await tag_link.fetch()
-                if tag_doc:
-                    tag_bases.append(TagBase(key=tag_doc.key, value=tag_doc.value))
+            tag_doc = tag_link if isinstance(tag_link, Tag) else tags_by_id.get(str(tag_link.ref.id))
+            if tag_doc:
+                tag_bases.append(TagBase(key=tag_doc.key, value=tag_doc.value))
 
         return ArticleResponse(
             id=str(article.id),
@@ -187,48 +239,66 @@ class ArticleService:
     # ENHANCEMENT L1 KB TITLE SEARCH - Search articles by title and content
     @staticmethod
     async def search_articles(query: str, category_id: str = None, subcategory_id: str = None) -> List[ArticleResponse]:
-        """Search articles by title and content using MongoDB text search"""
-        import re
-        from beanie import PydanticObjectId
+        """Search articles by title, content and tags, best matches first"""
         await SearchService.ensure_kb_indexes()
-        # Build search filters
-        filters = {}
-        
-        # Add category filter if provided
-        if category_id:
-            try:
-                filters["category_id"] = PydanticObjectId(category_id)
-            except:
-                pass  # Invalid ID format, ignore filter
-                
-        # Add subcategory filter if provided  
-        if subcategory_id:
-            try:
-                filters["subcategory_id"] = PydanticObjectId(subcategory_id)
-            except:
-                pass  # Invalid ID format, ignore filter
-        
-        # Create regex pattern for case-insensitive search in title and content
-        search_pattern = re.compile(re.escape(query), re.IGNORECASE)
-        
-        # ENHANCEMENT L2 AI KB TAGS - Search in title, content, and AI-generated tags
-        search_filter = {
-            "$or": [
-                {"title": {"$regex": search_pattern}},
-                {"content.text": {"$regex": search_pattern}},
-                {"ai_generated_tags": {"$regex": search_pattern}}
+
+        # Invalid ID formats are ignored, as before
+        category_id = category_id if category_id and PydanticObjectId.is_valid(category_id) else None
+        subcategory_id = subcategory_id if subcategory_id and PydanticObjectId.is_valid(subcategory_id) else None
+
+        # ENHANCEMENT L2 KB SEARCH - Ranked lookup (BM25 or MongoDB $text, per KB_SEARCH_ENGINE) instead of a $regex scan
+        hits = await SearchService.search(query, category_id, subcategory_id, limit=ArticleService.SEARCH_LIMIT)
+        return await ArticleService._search_results(hits, query)
+
+    # ENHANCEMENT L2 KB FACETS - Search with category, subcategory and AI tag counts
+    @staticmethod
+    async def search_articles_faceted(query: str, category_id: str = None, subcategory_id: str = None) -> ArticleSearchResponse:
+        """Search articles and count matches per category, subcategory and AI tag in the same query"""
+        await SearchService.ensure_kb_indexes()
+
+        category_id = category_id if category_id and PydanticObjectId.is_valid(category_id) else None
+        subcategory_id = subcategory_id if subcategory_id and PydanticObjectId.is_valid(subcategory_id) else None
+
+        result = await SearchService.faceted_search(query, category_id, subcategory_id, limit=ArticleService.SEARCH_LIMIT)
+
+        # One lookup per link collection for facet labels
+        names = {}
+        for model, facet in ((Category, "category"), (SubCategory, "subcategory")):
+            ids = [PydanticObjectId(value) for value, _ in result.facets[facet] if PydanticObjectId.is_valid(value)]
+            if ids:
+                names.update({str(doc.id): doc.name for doc in await model.find(In(model.id, ids)).to_list()})
+
+        def counts(facet: str, labelled: bool) -> List[FacetCount]:
+            return [
+                FacetCount(value=value, label=names.get(value, value) if labelled else value, count=count)
+                for value, count in result.facets[facet]
             ]
-        }
-        
-        # Combine filters
-        if filters:
-            search_filter = {"$and": [search_filter, filters]}
-        
-        # Execute search
-        articles = await Article.find(search_filter).to_list()
-        
-        # Build responses
-        return [await ArticleService._build_response(article) for article in articles]
+
+        return ArticleSearchResponse(
+            hits=await ArticleService._search_results(result.hits, query),
+            total=result.total,
+            facets=ArticleSearchFacets(
+                categories=counts("category", True),
+                subcategories=counts("subcategory", True),
+                ai_tags=counts("ai_tag", False),
+            ),
+        )
+
+    @staticmethod
+    async def _search_results(hits, query: str) -> List[ArticleResponse]:
+        if not hits:
+            return []
+
+        articles = await Article.find(In(Article.id, [PydanticObjectId(article_id) for article_id, _ in hits])).to_list()
+        by_id = {str(article.id): article for article in articles}
+
+        # Build responses in relevance order, with highlighted snippets
+        ranked = [by_id[article_id] for article_id, _ in hits if article_id in by_id]
+        results = await ArticleService._build_responses(ranked)
+        for article, response in zip(ranked, results):
+            text = article.rendered.text if ArticleRenderService.is_current(article) else article.content.text
+            response.snippet = SearchService.snippet(text, query)
+        return results
 
     # ENHANCEMENT L2 AI KB TAGS - Update article with AI-generated tags
     @staticmethod
@@ -243,4 +313,6 @@ class ArticleService:
         article.updated_at = datetime.now(timezone.utc)
         
         await article.save()
+        # Keep the stored version in step with updated_at so restarts don't re-embed
+        await KBVectorService.upsert_article(article)
         return await ArticleService._build_response(article)
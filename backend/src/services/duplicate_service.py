@@ -0,0 +1,227 @@
+# ENHANCEMENT L2 DUPLICATE DETECTION - MinHash signatures and LSH band index for near-duplicate tickets
+
+import asyncio
+import re
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from bson import ObjectId
+
+from src.db.init_db import get_database
+from src.models.ticket import Ticket
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+class MinHasher:
+    """
+    MinHash over word-bigram shingles using universal hashing
+    ``(a * x + b) mod p`` with a fixed seed, so every worker produces the
+    same signature for the same text.
+    """
+
+    def __init__(self, num_perm: int = 128, seed: int = 1):
+        self.num_perm = num_perm
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, np.iinfo(np.int64).max, size=num_perm, dtype=np.int64).astype(np.uint64)
+        self._b = rng.randint(0, np.iinfo(np.int64).max, size=num_perm, dtype=np.int64).astype(np.uint64)
+
+    @staticmethod
+    def shingles(text: str) -> Set[str]:
+        tokens = _TOKEN_RE.findall(text.lower())
+        if len(tokens) < 2:
+            return set(tokens)
+        return {f"{first} {second}" for first, second in zip(tokens, tokens[1:])}
+
+    def signature(self, text: str) -> np.ndarray:
+        shingles = self.shingles(text)
+        if not shingles:
+            return np.full(self.num_perm, _MAX_HASH, dtype=np.uint64)
+
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+        # uint64 wrap-around in a * x is intentional (same scheme as datasketch)
+        with np.errstate(over="ignore"):
+            permuted = ((hashes[:, None] * self._a + self._b) % _MERSENNE_PRIME) & _MAX_HASH
+        return permuted.min(axis=0)
+
+    @staticmethod
+    def similarity(first: np.ndarray, second: np.ndarray) -> float:
+        """Estimated Jaccard similarity of the underlying shingle sets."""
+        return float(np.count_nonzero(first == second)) / len(first)
+
+
+class LSHIndex:
+    """Banded locality-sensitive hashing over MinHash signatures."""
+
+    def __init__(self, bands: int, rows: int):
+        self.bands = bands
+        self.rows = rows
+        self._buckets: List[Dict[bytes, Set[str]]] = [dict() for _ in range(bands)]
+        self._signatures: Dict[str, np.ndarray] = {}
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._signatures
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def insert(self, key: str, signature: np.ndarray) -> None:
+        if key in self._signatures:
+            self.remove(key)
+        self._signatures[key] = signature
+        for band, band_key in zip(self._buckets, self._band_keys(signature)):
+            band.setdefault(band_key, set()).add(key)
+
+    def remove(self, key: str) -> None:
+        signature = self._signatures.pop(key, None)
+        if signature is None:
+            return
+        for band, band_key in zip(self._buckets, self._band_keys(signature)):
+            members = band.get(band_key)
+            if members is not None:
+                members.discard(key)
+                if not members:
+                    del band[band_key]
+
+    def query(self, signature: np.ndarray, threshold: float, exclude: Optional[str] = None) -> List[Tuple[str, float]]:
+        """Candidates sharing at least one band, verified by estimated similarity."""
+        candidates: Set[str] = set()
+        for band, band_key in zip(self._buckets, self._band_keys(signature)):
+            members = band.get(band_key)
+            if members:
+                candidates.update(members)
+        candidates.discard(exclude)
+
+        scored = []
+        for key in candidates:
+            score = MinHasher.similarity(signature, self._signatures[key])
+            if score >= threshold:
+                scored.append((key, score))
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return scored
+
+
+class DuplicateService:
+    """
+    Flags likely duplicate tickets at creation time.
+
+    Signatures are persisted on ``Ticket.minhash_signature`` and loaded
+    into an in-memory LSH index on startup. Before each lookup the index
+    catches up on tickets inserted or re-signed by other workers since the
+    last sync (``_id`` and ``updatedAt`` range scans that normally return
+    nothing). Editing a ticket's title or content re-signs it.
+    """
+
+    NUM_PERM = 128
+    BANDS = 32
+    ROWS = 4
+    SIMILARITY_THRESHOLD = 0.5
+    MAX_CANDIDATES = 10
+    SYNC_OVERLAP = timedelta(seconds=5)
+
+    _hasher = MinHasher(NUM_PERM)
+    _index = LSHIndex(BANDS, ROWS)
+    _synced_at: Optional[datetime] = None
+    _lock = asyncio.Lock()
+
+    @staticmethod
+    def ticket_text(title: str, content_text: str) -> str:
+        return f"{title}\n{content_text or ''}"
+
+    @classmethod
+    def signature_for(cls, title: str, content_text: str) -> np.ndarray:
+        return cls._hasher.signature(cls.ticket_text(title, content_text))
+
+    @staticmethod
+    def _to_array(signature: List[int]) -> np.ndarray:
+        return np.asarray(signature, dtype=np.uint64)
+
+    @classmethod
+    async def initialize(cls) -> None:
+        """Load persisted signatures and backfill tickets that predate duplicate detection."""
+        async with cls._lock:
+            cls._synced_at = datetime.now(timezone.utc)
+            db = await get_database()
+            await db.tickets.create_index([("updatedAt", 1)])  # Catch-up scan for edited tickets
+
+            cursor = db.tickets.find({"minhash_signature": {"$type": "array"}}, {"minhash_signature": 1})
+            async for doc in cursor:
+                cls._index.insert(str(doc["_id"]), cls._to_array(doc["minhash_signature"]))
+
+            backfilled = 0
+            cursor = db.tickets.find(
+                {"minhash_signature": {"$not": {"$type": "array"}}},
+                {"title": 1, "content.text": 1},
+            )
+            async for doc in cursor:
+                signature = cls.signature_for(doc.get("title", ""), (doc.get("content") or {}).get("text", ""))
+                await db.tickets.update_one({"_id": doc["_id"]}, {"$set": {"minhash_signature": signature.tolist()}})
+                cls._index.insert(str(doc["_id"]), signature)
+                backfilled += 1
+
+            print(f"Duplicate index ready: {len(cls._index)} tickets ({backfilled} backfilled)")
+
+    @classmethod
+    async def ticket_signature(cls, ticket: Ticket) -> np.ndarray:
+        """Stored signature of a ticket, computing and persisting it when missing."""
+        if ticket.minhash_signature:
+            return cls._to_array(ticket.minhash_signature)
+
+        signature = cls.signature_for(ticket.title, ticket.content.text if ticket.content else "")
+        await Ticket.find_one(Ticket.id == ticket.id).update({"$set": {"minhash_signature": signature.tolist()}})
+        cls.add(str(ticket.id), signature)
+        return signature
+
+    @classmethod
+    async def refresh_ticket(cls, ticket: Ticket) -> None:
+        """Re-sign a ticket after its title or content changed, so matching uses the current text."""
+        signature = cls.signature_for(ticket.title, ticket.content.text if ticket.content else "")
+        await Ticket.find_one(Ticket.id == ticket.id).update({"$set": {"minhash_signature": signature.tolist()}})
+        cls.add(str(ticket.id), signature)
+
+    @classmethod
+    async def _catch_up(cls) -> None:
+        if cls._synced_at is None:
+            await cls.initialize()
+            return
+
+        now = datetime.now(timezone.utc)
+        since = cls._synced_at - cls.SYNC_OVERLAP
+        cls._synced_at = now
+
+        db = await get_database()
+        cursor = db.tickets.find(
+            {
+                "$or": [{"_id": {"$gte": ObjectId.from_datetime(since)}}, {"updatedAt": {"$gte": since}}],
+                "minhash_signature": {"$type": "array"},
+            },
+            {"minhash_signature": 1},
+        )
+        async for doc in cursor:
+            # Replaces the signature of tickets edited since (insert re-bands an existing key)
+            cls._index.insert(str(doc["_id"]), cls._to_array(doc["minhash_signature"]))
+
+    @classmethod
+    async def find_duplicates(
+        cls,
+        signature: np.ndarray,
+        exclude: Optional[str] = None,
+    ) -> List[Tuple[str, float]]:
+        """Likely duplicates as ``(ticket_id, similarity)``, most similar first."""
+        await cls._catch_up()
+        return cls._index.query(signature, cls.SIMILARITY_THRESHOLD, exclude=exclude)[:cls.MAX_CANDIDATES]
+
+    @classmethod
+    def add(cls, ticket_id: str, signature: np.ndarray) -> None:
+        cls._index.insert(str(ticket_id), signature)
+
+    @classmethod
+    def remove(cls, ticket_id: str) -> None:
+        cls._index.remove(str(ticket_id))
@@ -5,18 +5,28 @@ File service for secure upload, download, and attachment management
 Provides GridFS-based storage with comprehensive security validation
 """
 
+import asyncio
+import gzip
 import hashlib
 import io
 import os
+import sys
+import tempfile
+import zlib
 from datetime import datetime
-from typing import List, Optional
-from bson import ObjectId
+from typing import AsyncIterator, Dict, List, Optional
+from bson import DBRef, ObjectId
 from fastapi import HTTPException, UploadFile
-from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
 
 from ..db.init_db import get_database
 from ..models.file import FileDocument, TicketFileAttachment
-from ..schemas.file import FileUploadResponse, FileAttachmentResponse
+from ..schemas.file import FileUploadResponse, FileAttachmentResponse, StorageStatsResponse, BatchUploadResult
+from ..utils.file_sniff import SNIFF_BYTES, sniff
+from .file_storage import DEFAULT_STORAGE, BlobNotFound, BlobReader, get_storage, open_blob, upload_storage
+from ..utils.image_preview import PREVIEW_VERSION, make_previews
+from ..utils.process_pool import run_in_process
 
 
 class FileValidationService:
@@ -41,6 +51,26 @@ class FileValidationService:
         'application/x-perl', 'application/x-python', 'application/x-php'
     }
     
+    # ENHANCEMENT L2 BATCH UPLOADS - Declared types that leave the real type to content sniffing
+    GENERIC_MIME_TYPES = {'', 'application/octet-stream'}
+    
+    # ENHANCEMENT L2 BATCH UPLOADS - Allowed types each sniffed content family can stand for
+    SNIFFED_TYPE_CHOICES = {
+        'text/plain': {'text/plain', 'text/csv', 'application/json'},
+        'application/zip': {
+            'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+            'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        },
+        'application/x-ole-storage': {'application/msword', 'application/vnd.ms-excel'}
+    }
+    
+    EXTENSION_MIME_TYPES = {
+        '.txt': 'text/plain', '.log': 'text/plain', '.csv': 'text/csv', '.json': 'application/json',
+        '.doc': 'application/msword', '.xls': 'application/vnd.ms-excel',
+        '.docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+        '.xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    }
+    
     MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
     MAX_FILES_PER_TICKET = 5
     
@@ -48,23 +78,15 @@ class FileValidationService:
     def validate_file(cls, file: UploadFile) -> Optional[str]:
         """Validate uploaded file for security and compliance"""
         
-        # Check file size
-        if hasattr(file.file, 'seek') and hasattr(file.file, 'tell'):
-            file.file.seek(0, 2)  # Seek to end
-            size = file.file.tell()
-            file.file.seek(0)  # Reset to beginning
-            
-            if size > cls.MAX_FILE_SIZE:
-                return f"File size ({size} bytes) exceeds maximum allowed size ({cls.MAX_FILE_SIZE} bytes)"
-            
-            if size == 0:
-                return "Empty files are not allowed"
+        # ENHANCEMENT L2 STREAMING UPLOADS - Size is enforced while streaming; reject early when it is already known
+        if file.size is not None and file.size > cls.MAX_FILE_SIZE:
+            return cls.size_error(file.size)
         
         # Check MIME type
         if file.content_type in cls.DANGEROUS_MIME_TYPES:
             return f"File type '{file.content_type}' is not allowed for security reasons"
         
-        if file.content_type not in cls.ALLOWED_MIME_TYPES:
+        if file.content_type not in cls.ALLOWED_MIME_TYPES and (file.content_type or '') not in cls.GENERIC_MIME_TYPES:
             return f"File type '{file.content_type}' is not allowed"
         
         # Validate filename
@@ -77,6 +99,33 @@ class FileValidationService:
         
         return None
     
+    @classmethod
+    def resolve_content_type(cls, declared: Optional[str], filename: str, head: bytes) -> tuple[Optional[str], Optional[str]]:
+        """
+        ENHANCEMENT L2 BATCH UPLOADS - Content type to store, decided by the file's first bytes
+        The declared type (or the extension) only picks between types the content is consistent with
+        Returns (content_type, None) or (None, error)
+        """
+        sniffed = sniff(head)
+        if sniffed is None:
+            return None, "File content is not a recognised file type"
+        if sniffed in cls.DANGEROUS_MIME_TYPES:
+            return None, f"File content is '{sniffed}', which is not allowed for security reasons"
+        
+        choices = cls.SNIFFED_TYPE_CHOICES.get(sniffed, {sniffed})
+        if declared in choices:
+            return declared, None
+        by_extension = cls.EXTENSION_MIME_TYPES.get(os.path.splitext(filename)[1].lower())
+        if by_extension in choices:
+            return by_extension, None
+        if sniffed in cls.ALLOWED_MIME_TYPES:
+            return sniffed, None  # Mislabelled but allowed, e.g. a JPEG sent as image/png
+        return None, f"File content does not match type '{declared}'"
+    
+    @classmethod
+    def size_error(cls, size: int) -> str:
+        return f"File size ({size} bytes) exceeds maximum allowed size ({cls.MAX_FILE_SIZE} bytes)"
+    
     @classmethod
     def _validate_filename(cls, filename: str) -> Optional[str]:
         """Validate filename for security issues"""
@@ -123,17 +172,164 @@ class FileValidationService:
 
 class FileService:
     """
-    ENHANCEMENT L2: FILE ATTACHMENTS - Service for managing file uploads and storage using GridFS
+    ENHANCEMENT L2: FILE ATTACHMENTS - Service for managing file uploads and storage
+    ENHANCEMENT L2 FILE STORAGE - Content is kept by a storage engine (GridFS or local files, see file_storage)
     Handles secure file upload, download, and ticket attachment operations
     """
     
+    # ENHANCEMENT L2 STREAMING UPLOADS - One GridFS chunk per read, so memory per upload is one chunk
+    CHUNK_SIZE = 255 * 1024  # GridFS default chunk size
+    ATTACHMENT_INDEX_NAME = "ticket_file_unique"
+    PREVIEW_INDEX_NAME = "file_preview_unique"
+    UPLOAD_CONCURRENCY = 3  # ENHANCEMENT L2 BATCH UPLOADS - Batch files hashed and written at once, per worker
+    _upload_slots = asyncio.Semaphore(UPLOAD_CONCURRENCY)
+    # ENHANCEMENT L2 FILE PREVIEWS - Longest side in pixels of each derived image
+    PREVIEW_SIZES = {"thumb": 128, "small": 480, "medium": 1280}
+    PREVIEW_MIME_TYPES = {'image/jpeg', 'image/png', 'image/gif', 'image/webp'}
+    # ENHANCEMENT L2 FILE COMPRESSION - Text-like content is stored gzipped when that saves enough
+    COMPRESSIBLE_MIME_TYPES = {'text/plain', 'text/csv', 'application/json'}
+    GZIP_LEVEL = 6
+    MIN_COMPRESSION_SAVING = 0.1  # Fraction of the size; below it the content is stored as is
+    _preview_tasks: Dict[ObjectId, asyncio.Task] = {}  # Source blob id -> running generation, shared by concurrent requests
+    
     def __init__(self):
         self.validation_service = FileValidationService()
     
+    def _hash_stream(self, stream) -> tuple[int, str, str]:
+        """
+        ENHANCEMENT L2 FILE DEDUP - Size, SHA-256 and MD5 of a file object, read chunk by chunk
+        Rejects the upload as soon as the size limit is crossed
+        """
+        max_size = self.validation_service.MAX_FILE_SIZE
+        sha256 = hashlib.sha256()
+        md5 = hashlib.md5()
+        size = 0
+        
+        stream.seek(0)
+        while True:
+            chunk = stream.read(self.CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_size:
+                raise HTTPException(status_code=413, detail=self.validation_service.size_error(size))
+            sha256.update(chunk)
+            md5.update(chunk)
+        if size == 0:
+            raise HTTPException(status_code=400, detail="Empty files are not allowed")
+        return size, sha256.hexdigest(), md5.hexdigest()
+    
+    async def _hash_upload(self, file: UploadFile) -> tuple[int, str, str]:
+        """
+        ENHANCEMENT L2 FILE DEDUP - Hash the locally spooled upload before anything is written to storage
+        Runs in a worker thread: hashlib releases the GIL, so concurrent uploads hash in parallel
+        """
+        return await asyncio.to_thread(self._hash_stream, file.file)
+    
+    def _gzip_stream(self, stream) -> tuple[tempfile.SpooledTemporaryFile, int]:
+        """
+        ENHANCEMENT L2 FILE COMPRESSION - Gzip a file object chunk by chunk into a spooled temporary file
+        No timestamp or name in the header, so equal content always compresses to equal bytes
+        """
+        stream.seek(0)
+        spool = tempfile.SpooledTemporaryFile(max_size=4 * self.CHUNK_SIZE)
+        try:
+            with gzip.GzipFile(filename="", fileobj=spool, mode="wb", compresslevel=self.GZIP_LEVEL, mtime=0) as compressor:
+                while True:
+                    chunk = stream.read(self.CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    compressor.write(chunk)
+            stored_size = spool.tell()
+            spool.seek(0)
+        except BaseException:
+            spool.close()
+            raise
+        return spool, stored_size
+    
+    async def _encode_upload(self, file: UploadFile, content_type: str, size: int) -> tuple[object, Optional[str], int]:
+        """
+        ENHANCEMENT L2 FILE COMPRESSION - What to store for an upload: (file object, encoding, stored size)
+        Runs in a worker thread; zlib releases the GIL
+        """
+        if content_type in self.COMPRESSIBLE_MIME_TYPES:
+            spool, stored_size = await asyncio.to_thread(self._gzip_stream, file.file)
+            if stored_size <= size * (1 - self.MIN_COMPRESSION_SAVING):
+                return spool, "gzip", stored_size
+            spool.close()
+        await file.seek(0)
+        return file.file, None, size
+    
+    async def _store_blob(self, db, file: UploadFile, filename: str, size: int, sha256: str, metadata: dict) -> dict:
+        """
+        ENHANCEMENT L2 FILE DEDUP - Blob holding this content, taking one reference on it
+        Existing content is reused; otherwise the upload is streamed to storage and registered in `file_blobs`
+        Returns the file_blobs document
+        """
+        blobs = db.file_blobs
+        # ENHANCEMENT L2 FILE STORAGE - New content goes to the configured engine, chunk by chunk
+        storage = upload_storage()
+        while True:
+            # Also revives a blob whose last reference was just released but not yet collected
+            blob = await blobs.find_one_and_update(
+                {"_id": sha256},
+                {"$inc": {"ref_count": 1}},
+                return_document=ReturnDocument.AFTER
+            )
+            if blob:
+                return blob
+            
+            # ENHANCEMENT L2 FILE COMPRESSION - Deduplication keys on the original bytes; only new content is compressed
+            source, encoding, stored_size = await self._encode_upload(file, metadata["content_type"], size)
+            try:
+                gridfs_id = await storage.save(source, filename, {**metadata, "encoding": encoding})
+            finally:
+                if source is not file.file:
+                    source.close()
+            blob = {
+                "_id": sha256,
+                "gridfs_id": gridfs_id,
+                "storage": storage.name,
+                "encoding": encoding,
+                "size": size,
+                "stored_size": stored_size,
+                "ref_count": 1,
+                "created_at": datetime.utcnow()
+            }
+            try:
+                await blobs.insert_one(blob)
+                return blob
+            except DuplicateKeyError:
+                # A concurrent upload of the same content registered first; use theirs
+                await storage.delete(gridfs_id)
+    
+    async def _release_blob(self, db, file_doc: FileDocument) -> None:
+        """
+        ENHANCEMENT L2 FILE DEDUP - Drop one reference to a file's content, deleting it with the last one
+        """
+        if not file_doc.sha256:
+            # Stored before deduplication: the file owns its content
+            await get_storage(file_doc.storage).delete(file_doc.gridfs_id)
+            await self._delete_previews(db, file_doc.gridfs_id)
+            return
+        
+        blob = await db.file_blobs.find_one_and_update(
+            {"_id": file_doc.sha256},
+            {"$inc": {"ref_count": -1}},
+            return_document=ReturnDocument.AFTER
+        )
+        if blob is None or blob["ref_count"] > 0:
+            return
+        # Only deleted if no upload took a new reference in between
+        result = await db.file_blobs.delete_one({"_id": file_doc.sha256, "ref_count": {"$lte": 0}})
+        if result.deleted_count:
+            await get_storage(blob.get("storage")).delete(blob["gridfs_id"])
+            await self._delete_previews(db, blob["gridfs_id"])
+    
     async def upload_file(self, file: UploadFile, user_id: str) -> FileUploadResponse:
         """
-        ENHANCEMENT L2: FILE ATTACHMENTS - Upload a single file to GridFS
-        Validates file, stores in GridFS, and creates metadata document
+        ENHANCEMENT L2: FILE ATTACHMENTS - Upload a single file
+        Validates file, stores its content, and creates metadata document
         """
         
         # Validate file
@@ -143,67 +339,190 @@ class FileService:
         
         try:
             db = await get_database()
-            fs_bucket = AsyncIOMotorGridFSBucket(db, bucket_name="files")
             
-            # Reset file pointer
-            await file.seek(0)
-            file_content = await file.read()
+            # ENHANCEMENT L2 BATCH UPLOADS - The stored type comes from the file's first bytes, not the client
             await file.seek(0)
-            
-            # Calculate MD5 hash
-            md5_hash = hashlib.md5(file_content).hexdigest()
+            content_type, type_error = self.validation_service.resolve_content_type(
+                file.content_type, file.filename, await file.read(SNIFF_BYTES)
+            )
+            if type_error:
+                raise HTTPException(status_code=400, detail=type_error)
             
             # Sanitize filename
             safe_filename = self.validation_service.sanitize_filename(file.filename)
+            upload_date = datetime.utcnow()
             
-            # Store file in GridFS
-            file_stream = io.BytesIO(file_content)
-            gridfs_id = await fs_bucket.upload_from_stream(
+            # ENHANCEMENT L2 FILE DEDUP - Content is stored once per SHA-256 and shared by reference
+            size, sha256, md5_hash = await self._hash_upload(file)
+            blob = await self._store_blob(
+                db,
+                file,
                 safe_filename,
-                file_stream,
+                size,
+                sha256,
                 metadata={
                     "original_filename": file.filename,
-                    "content_type": file.content_type,
+                    "content_type": content_type,
                     "uploaded_by": user_id,
-                    "upload_date": datetime.utcnow(),
+                    "upload_date": upload_date,
                     "md5": md5_hash,
-                    "size": len(file_content)
+                    "sha256": sha256,
+                    "size": size
                 }
             )
             
             # Create file document
             file_doc = FileDocument(
                 filename=safe_filename,
-                content_type=file.content_type,
-                size=len(file_content),
-                upload_date=datetime.utcnow(),
+                content_type=content_type,
+                size=size,
+                upload_date=upload_date,
                 uploaded_by=user_id,
-                gridfs_id=gridfs_id,
+                gridfs_id=blob["gridfs_id"],
+                storage=blob.get("storage") or DEFAULT_STORAGE,
+                encoding=blob.get("encoding"),
+                stored_size=blob.get("stored_size", size),
                 md5=md5_hash,
+                sha256=sha256,
                 is_virus_scanned=False
             )
             
             # Store metadata in collection
             files_collection = db.file_metadata
-            result = await files_collection.insert_one(file_doc.model_dump(exclude={"id"}))
+            try:
+                result = await files_collection.insert_one(file_doc.model_dump(exclude={"id"}))
+            except BaseException:
+                await self._release_blob(db, file_doc)
+                raise
             
             file_id = str(result.inserted_id)
             
+            # ENHANCEMENT L2 FILE PREVIEWS - Generated in the background; a duplicate just links the existing ones
+            if content_type in self.PREVIEW_MIME_TYPES:
+                self.schedule_previews(file_doc.gridfs_id, file_doc.storage)
+            
             return FileUploadResponse(
                 id=file_id,
                 filename=safe_filename,
-                content_type=file.content_type,
-                size=len(file_content),
-                url=f"/api/files/{file_id}/download",
-                uploaded_at=file_doc.upload_date
+                content_type=content_type,
+                size=size,
+                url=f"/api/v1/files/{file_id}/download",
+                uploaded_at=file_doc.upload_date,
+                preview_url=self.preview_url(file_id, content_type)
             )
             
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"File upload failed: {str(e)}")
     
-    async def get_file(self, file_id: str, user_id: str = None) -> tuple[bytes, FileDocument]:
+    async def upload_files(self, files: List[UploadFile], user_id: str) -> List[BatchUploadResult]:
+        """
+        ENHANCEMENT L2 BATCH UPLOADS - Upload several files in one request
+        Files are processed concurrently, at most UPLOAD_CONCURRENCY at a time per worker;
+        each gets its own result, so one rejected file does not fail the others
+        """
+        if len(files) > self.validation_service.MAX_FILES_PER_TICKET:
+            raise HTTPException(
+                status_code=400,
+                detail=f"At most {self.validation_service.MAX_FILES_PER_TICKET} files can be uploaded at once"
+            )
+        
+        async def upload_one(file: UploadFile) -> BatchUploadResult:
+            async with self._upload_slots:
+                try:
+                    uploaded = await self.upload_file(file, user_id)
+                    return BatchUploadResult(filename=file.filename or "", status_code=200, file=uploaded)
+                except HTTPException as e:
+                    return BatchUploadResult(filename=file.filename or "", status_code=e.status_code, error=str(e.detail))
+        
+        return list(await asyncio.gather(*(upload_one(file) for file in files)))
+    
+    async def delete_file(self, file_id: str, user_id: str) -> None:
+        """
+        ENHANCEMENT L2 FILE DEDUP - Delete a file uploaded by the user
+        Removes its ticket attachments and releases its content, which is collected with the last reference
+        """
+        try:
+            db = await get_database()
+            file_doc = await self.get_file_metadata(file_id)
+            if file_doc.uploaded_by != user_id:
+                raise HTTPException(status_code=403, detail="Only the uploader can delete a file")
+            
+            result = await db.file_metadata.delete_one({"_id": ObjectId(file_id)})
+            if not result.deleted_count:
+                return  # Deleted concurrently; that request released the content
+            await db.ticket_file_attachments.delete_many({"file_id": file_id})
+            await self._release_blob(db, file_doc)
+            
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Failed to delete file: {str(e)}")
+    
+    async def get_storage_stats(self) -> StorageStatsResponse:
+        """
+        ENHANCEMENT L2 FILE DEDUP - Logical vs. stored bytes, i.e. the storage deduplication (and compression) saves
         """
-        ENHANCEMENT L2: FILE ATTACHMENTS - Retrieve file content and metadata
+        db = await get_database()
+        
+        blob_totals = await db.file_blobs.aggregate([
+            {"$group": {
+                "_id": None,
+                "blobs": {"$sum": 1},
+                "stored": {"$sum": {"$ifNull": ["$stored_size", "$size"]}},  # ENHANCEMENT L2 FILE COMPRESSION - Compressed size
+                "referenced": {"$sum": {"$multiply": ["$size", "$ref_count"]}}
+            }}
+        ]).to_list(length=1)
+        file_totals = await db.file_metadata.aggregate([
+            {"$group": {
+                "_id": None,
+                "files": {"$sum": 1},
+                "logical": {"$sum": "$size"},
+                # Files from before deduplication own their content
+                "unshared": {"$sum": {"$cond": [{"$ifNull": ["$sha256", False]}, 0, "$size"]}}
+            }}
+        ]).to_list(length=1)
+        blobs = blob_totals[0] if blob_totals else {}
+        files = file_totals[0] if file_totals else {}
+        
+        logical = files.get("logical", 0)
+        stored = blobs.get("stored", 0) + files.get("unshared", 0)
+        return StorageStatsResponse(
+            files=files.get("files", 0),
+            blobs=blobs.get("blobs", 0),
+            logical_bytes=logical,
+            stored_bytes=stored,
+            saved_bytes=max(logical - stored, 0)
+        )
+    
+    @classmethod
+    async def ensure_indexes(cls) -> None:
+        """ENHANCEMENT L2 FILE DEDUP - Indexes for content lookups, reference cleanup and attachment listing"""
+        db = await get_database()
+        await db.file_metadata.create_index([("sha256", 1)])
+        # ENHANCEMENT L2 FILE ACL - File access checks; also serves lookups by file_id alone
+        await db.ticket_file_attachments.create_index([("file_id", 1), ("acl", 1)])
+        # ENHANCEMENT L2 FILE PREVIEWS - Files sharing a content, and the previews derived from it
+        await db.file_metadata.create_index([("gridfs_id", 1)])
+        # One preview per content, size and version, however many workers generate it at once
+        try:
+            await db.file_previews.create_index(
+                [("derived_from", 1), ("preview", 1), ("preview_version", 1)], unique=True, name=cls.PREVIEW_INDEX_NAME
+            )
+        except OperationFailure as e:
+            print(f"Could not create unique preview index ({e}); remove duplicate file_previews first")
+        # ENHANCEMENT L2 BATCHED ATTACHMENTS - Makes attaching idempotent and serves the per-ticket listing
+        try:
+            await db.ticket_file_attachments.create_index(
+                [("ticket_id", 1), ("file_id", 1)], unique=True, name=cls.ATTACHMENT_INDEX_NAME
+            )
+        except OperationFailure as e:
+            print(f"Could not create unique attachment index ({e}); remove duplicate ticket_file_attachments first")
+    
+    async def get_file_metadata(self, file_id: str, user_id: str = None) -> FileDocument:
+        """
+        ENHANCEMENT L2: FILE ATTACHMENTS - Retrieve file metadata
         Used for both download and preview functionality with authentication
         """
         
@@ -228,22 +547,217 @@ class FileService:
                 if not await self._user_has_file_access(file_id, user_id):
                     raise HTTPException(status_code=403, detail="Access denied")
             
-            # Get file content from GridFS
-            fs_bucket = AsyncIOMotorGridFSBucket(db, bucket_name="files")
-            
-            try:
-                file_stream = io.BytesIO()
-                await fs_bucket.download_to_stream(file_doc.gridfs_id, file_stream)
-                file_content = file_stream.getvalue()
-                return file_content, file_doc
-            except Exception as e:
-                raise HTTPException(status_code=404, detail="File content not found")
+            return file_doc
                 
         except HTTPException:
             raise
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Failed to retrieve file: {str(e)}")
     
+    @staticmethod
+    def etag(file_doc: FileDocument, encoding: Optional[str] = None) -> str:
+        """
+        ENHANCEMENT L2 FILE ETAGS - Strong validator from the stored content hash
+        Files never change content, so the hash identifies the representation exactly
+        ENHANCEMENT L2 FILE COMPRESSION - The encoded representation is different bytes, so it gets its own tag
+        """
+        digest = file_doc.sha256 or file_doc.md5 or f"{file_doc.gridfs_id}-{file_doc.size}"
+        return f'"{digest}-{encoding}"' if encoding else f'"{digest}"'
+    
+    async def open_file(self, file_doc: FileDocument) -> BlobReader:
+        """
+        ENHANCEMENT L2 STREAMING DOWNLOADS - Open the stored content of a file for reading
+        Opened before the response starts, so missing content is still a clean 404
+        """
+        try:
+            return await open_blob(file_doc.storage, file_doc.gridfs_id)
+        except BlobNotFound:
+            raise HTTPException(status_code=404, detail="File content not found")
+    
+    async def iter_file(self, grid_out: BlobReader, start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+        """
+        ENHANCEMENT L2 STREAMING DOWNLOADS - Yield bytes start..end (inclusive) in chunk-sized reads
+        Only the chunks covering the range are read, one at a time
+        """
+        end = grid_out.length - 1 if end is None else end
+        remaining = end - start + 1
+        try:
+            grid_out.seek(start)
+            while remaining > 0:
+                chunk = await grid_out.read(min(self.CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+        finally:
+            grid_out.close()
+    
+    async def iter_decoded(self, grid_out: BlobReader, start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+        """
+        ENHANCEMENT L2 FILE COMPRESSION - Yield decompressed bytes start..end (inclusive) of gzip-stored content
+        Inflates one stored chunk at a time with bounded output, so memory stays at about one chunk;
+        a range is served by inflating from the start and skipping to it
+        """
+        end = sys.maxsize if end is None else end  # Used in slices, so an int
+        decompressor = zlib.decompressobj(wbits=31)  # gzip container
+        position = 0
+        try:
+            while position <= end:
+                compressed = await grid_out.read(self.CHUNK_SIZE)
+                if not compressed:
+                    break
+                data = decompressor.decompress(compressed, self.CHUNK_SIZE)
+                while data and position <= end:
+                    piece = data[max(start - position, 0):end - position + 1]
+                    position += len(data)
+                    if piece:
+                        yield piece
+                    data = decompressor.decompress(decompressor.unconsumed_tail, self.CHUNK_SIZE) if decompressor.unconsumed_tail else b""
+        finally:
+            grid_out.close()
+    
+    @classmethod
+    def preview_url(cls, file_id: str, content_type: str) -> Optional[str]:
+        """ENHANCEMENT L2 FILE PREVIEWS - Preview endpoint of a file, for types that have previews"""
+        return f"/api/v1/files/{file_id}/preview" if content_type in cls.PREVIEW_MIME_TYPES else None
+    
+    def schedule_previews(self, gridfs_id: ObjectId, storage: Optional[str]) -> asyncio.Task:
+        """
+        ENHANCEMENT L2 FILE PREVIEWS - Start (or join) preview generation for stored content
+        Failures are logged; callers that await the task see them too
+        """
+        task = self._preview_tasks.get(gridfs_id)
+        if task is None:
+            task = asyncio.create_task(self._generate_previews(gridfs_id, storage))
+            self._preview_tasks[gridfs_id] = task
+            
+            def finished(task: asyncio.Task) -> None:
+                self._preview_tasks.pop(gridfs_id, None)
+                if not task.cancelled() and task.exception() is not None:
+                    print(f"Failed to generate previews for {gridfs_id}: {task.exception()}")
+            task.add_done_callback(finished)
+        return task
+    
+    async def _generate_previews(self, gridfs_id: ObjectId, storage: Optional[str]) -> Dict[str, ObjectId]:
+        """
+        ENHANCEMENT L2 FILE PREVIEWS - Create any missing previews of stored content and link them
+        Previews are derived blobs in the content's storage engine, registered in `file_previews`
+        (derived_from = source id). They are made once per content and linked to every file document
+        sharing it. Decoding and resizing run in the process pool. Another worker generating the same
+        previews at once wins the unique index, and its previews are used instead.
+        """
+        db = await get_database()
+        
+        previews = {}
+        outdated = []
+        async for doc in db.file_previews.find({"derived_from": gridfs_id}):
+            if doc.get("preview_version") == PREVIEW_VERSION and doc.get("preview") in self.PREVIEW_SIZES:
+                previews[doc["preview"]] = doc["_id"]
+            else:
+                outdated.append(doc)
+        
+        missing = {name: side for name, side in self.PREVIEW_SIZES.items() if name not in previews}
+        created = []
+        if missing:
+            reader = await open_blob(storage, gridfs_id)
+            try:
+                data = await reader.read()
+            finally:
+                reader.close()
+            rendered = await run_in_process(make_previews, data, missing)
+            target = get_storage(storage)
+            for name, preview in rendered.items():
+                preview_id = await target.save(io.BytesIO(preview.data), f"{gridfs_id}-{name}")
+                doc = {
+                    "_id": preview_id,
+                    "derived_from": gridfs_id,
+                    "preview": name,
+                    "preview_version": PREVIEW_VERSION,
+                    "content_type": preview.content_type,
+                    "width": preview.width,
+                    "height": preview.height,
+                    "size": len(preview.data),
+                    "storage": target.name
+                }
+                try:
+                    await db.file_previews.insert_one(doc)
+                except DuplicateKeyError:
+                    await target.delete(preview_id)
+                    existing = await db.file_previews.find_one(
+                        {"derived_from": gridfs_id, "preview": name, "preview_version": PREVIEW_VERSION}, {"_id": 1}
+                    )
+                    if existing is None:
+                        raise  # Deleted again since; the next request regenerates it
+                    previews[name] = existing["_id"]
+                    continue
+                previews[name] = preview_id
+                created.append(doc)
+        
+        result = await db.file_metadata.update_many(
+            {"gridfs_id": gridfs_id},
+            {"$set": {"previews": previews, "preview_version": PREVIEW_VERSION}}
+        )
+        if result.matched_count == 0:
+            outdated += created  # The content was deleted while its previews were made
+        await self._delete_preview_docs(db, outdated)
+        return previews
+    
+    async def _delete_preview_docs(self, db, docs: List[dict]) -> None:
+        for doc in docs:
+            await get_storage(doc.get("storage")).delete(doc["_id"])
+        if docs:
+            await db.file_previews.delete_many({"_id": {"$in": [doc["_id"] for doc in docs]}})
+    
+    async def _delete_previews(self, db, gridfs_id: ObjectId) -> None:
+        """ENHANCEMENT L2 FILE PREVIEWS - Delete the derived blobs of collected content"""
+        await self._delete_preview_docs(db, await db.file_previews.find({"derived_from": gridfs_id}).to_list(None))
+    
+    async def get_preview_id(self, file_doc: FileDocument, size: str) -> ObjectId:
+        """
+        ENHANCEMENT L2 FILE PREVIEWS - Blob id of a file's preview, generating previews if not done yet
+        (uploaded before previews existed, or still queued behind other work)
+        """
+        if file_doc.content_type not in self.PREVIEW_MIME_TYPES:
+            raise HTTPException(status_code=404, detail="No preview available for this file type")
+        preview_id = file_doc.previews.get(size)
+        if preview_id is not None and file_doc.preview_version == PREVIEW_VERSION:
+            return preview_id
+        # Missing, or made by an older PREVIEW_VERSION: (re)generate, which also replaces the stale ones
+        try:
+            # Shielded: a client disconnecting does not cancel generation others may be waiting on
+            previews = await asyncio.shield(self.schedule_previews(file_doc.gridfs_id, file_doc.storage))
+        except BlobNotFound:
+            raise HTTPException(status_code=404, detail="File content not found")
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=f"Preview could not be generated: {e}")
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Preview generation failed: {str(e)}")
+        return previews[size]
+    
+    async def open_preview(self, preview_id: ObjectId) -> tuple[BlobReader, str]:
+        """ENHANCEMENT L2 FILE PREVIEWS - Open a stored preview; returns (reader, content_type)"""
+        db = await get_database()
+        doc = await db.file_previews.find_one({"_id": preview_id}, {"content_type": 1, "storage": 1})
+        if doc is None:
+            raise HTTPException(status_code=404, detail="Preview not found")
+        try:
+            return await open_blob(doc.get("storage"), preview_id), doc["content_type"]
+        except BlobNotFound:
+            raise HTTPException(status_code=404, detail="Preview not found")
+    
+    @classmethod
+    def _attachment_response(cls, file_doc_data: dict) -> FileAttachmentResponse:
+        file_id = str(file_doc_data["_id"])
+        return FileAttachmentResponse(
+            id=file_id,
+            filename=file_doc_data["filename"],
+            content_type=file_doc_data["content_type"],
+            size=file_doc_data["size"],
+            url=f"/api/v1/files/{file_id}/download",
+            uploaded_at=file_doc_data["upload_date"],
+            preview_url=cls.preview_url(file_id, file_doc_data["content_type"])
+        )
+    
     async def attach_files_to_ticket(self, ticket_id: str, file_ids: List[str], user_id: str) -> List[FileAttachmentResponse]:
         """
         ENHANCEMENT L2: FILE ATTACHMENTS - Attach files to a ticket
@@ -255,57 +769,80 @@ class FileService:
             files_collection = db.file_metadata
             attachments_collection = db.ticket_file_attachments
             
-            # Verify all files exist and user has access
-            attachments = []
-            for file_id in file_ids:
-                try:
-                    file_doc_data = await files_collection.find_one({"_id": ObjectId(file_id)})
-                except Exception as e:
-                    raise HTTPException(status_code=400, detail=f"Invalid file ID format: {file_id}")
-                
-                if not file_doc_data:
-                    raise HTTPException(status_code=404, detail=f"File {file_id} not found")
-                
-                # Convert ObjectId to string for Pydantic model
-                if file_doc_data.get("_id"):
-                    file_doc_data["_id"] = str(file_doc_data["_id"])
-                
-                file_doc = FileDocument(**file_doc_data)
-                
-                # Check if already attached
-                existing = await attachments_collection.find_one({
-                    "ticket_id": ticket_id,
-                    "file_id": file_id
-                })
-                if existing:
-                    continue  # Skip already attached files
-                
-                # Create attachment
-                attachment = TicketFileAttachment(
+            # ENHANCEMENT L2 BATCHED ATTACHMENTS - Validate every id with one query
+            file_ids = list(dict.fromkeys(file_ids))
+            invalid = [file_id for file_id in file_ids if not ObjectId.is_valid(file_id)]
+            if invalid:
+                raise HTTPException(status_code=400, detail=f"Invalid file ID format: {', '.join(invalid)}")
+            
+            projection = {"filename": 1, "content_type": 1, "size": 1, "upload_date": 1, "uploaded_by": 1}
+            files_by_id = {
+                str(doc["_id"]): doc
+                async for doc in files_collection.find({"_id": {"$in": [ObjectId(file_id) for file_id in file_ids]}}, projection)
+            }
+            missing = [file_id for file_id in file_ids if file_id not in files_by_id]
+            if missing:
+                raise HTTPException(status_code=404, detail=f"File {', '.join(missing)} not found")
+            
+            # ENHANCEMENT L2 FILE ACL - Attaching grants the ticket's participants access, so only files
+            # the caller may already open can be attached
+            for file_id, doc in files_by_id.items():
+                if doc.get("uploaded_by") != user_id and not await self._user_has_file_access(file_id, user_id):
+                    raise HTTPException(status_code=403, detail=f"Access denied to file {file_id}")
+            
+            # ENHANCEMENT L2 FILE ACL - Each attachment carries who the ticket grants access to
+            acl = await self._ticket_acl(db, ticket_id)
+            if acl is None:
+                raise HTTPException(status_code=404, detail="Ticket not found")
+            
+            # One unordered write; the unique (ticket_id, file_id) index turns repeats into ignorable duplicate-key errors
+            attachments = [
+                TicketFileAttachment(
                     ticket_id=ticket_id,
                     file_id=file_id,
                     attached_by=user_id,
-                    attached_at=datetime.utcnow()
-                )
-                
-                await attachments_collection.insert_one(attachment.model_dump(exclude={"id"}))
-                
-                attachments.append(FileAttachmentResponse(
-                    id=file_id,
-                    filename=file_doc.filename,
-                    content_type=file_doc.content_type,
-                    size=file_doc.size,
-                    url=f"/api/files/{file_id}/download",
-                    uploaded_at=file_doc.upload_date
-                ))
+                    attached_at=datetime.utcnow(),
+                    acl=acl
+                ).model_dump(exclude={"id"})
+                for file_id in file_ids
+            ]
+            already_attached = set()
+            if attachments:
+                try:
+                    await attachments_collection.insert_many(attachments, ordered=False)
+                except BulkWriteError as e:
+                    errors = e.details.get("writeErrors", [])
+                    if any(error.get("code") != 11000 for error in errors):
+                        raise
+                    already_attached = {error["index"] for error in errors}
+                # An assignment that landed while these were written refreshed the ticket's other attachments only
+                if await self._ticket_acl(db, ticket_id) != acl:
+                    await self.refresh_ticket_acl(ticket_id)
             
-            return attachments
+            # Skip already attached files
+            return [
+                self._attachment_response(files_by_id[file_id])
+                for index, file_id in enumerate(file_ids)
+                if index not in already_attached
+            ]
             
         except HTTPException:
             raise
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Failed to attach files: {str(e)}")
     
+    async def detach_file_from_ticket(self, ticket_id: str, file_id: str, user_id: str) -> bool:
+        """
+        ENHANCEMENT L2 BATCHED ATTACHMENTS - Remove a file from a ticket
+        The file itself stays with its uploader; returns False if it was not attached
+        """
+        try:
+            db = await get_database()
+            result = await db.ticket_file_attachments.delete_one({"ticket_id": ticket_id, "file_id": file_id})
+            return result.deleted_count > 0
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Failed to detach file: {str(e)}")
+    
     async def get_ticket_attachments(self, ticket_id: str) -> List[FileAttachmentResponse]:
         """
         ENHANCEMENT L2: FILE ATTACHMENTS - Get all files attached to a ticket
@@ -318,56 +855,89 @@ class FileService:
             files_collection = db.file_metadata
             
             # Get all attachments for ticket
-            attachments_cursor = attachments_collection.find({"ticket_id": ticket_id})
-            attachments = await attachments_cursor.to_list(length=None)
+            attachments_cursor = attachments_collection.find({"ticket_id": ticket_id}, {"file_id": 1}).sort("attached_at", 1)
+            file_ids = [attachment["file_id"] async for attachment in attachments_cursor]
             
-            results = []
-            for attachment in attachments:
-                # Get file metadata
-                file_doc_data = await files_collection.find_one({"_id": ObjectId(attachment["file_id"])})
-                if file_doc_data:
-                    # Convert ObjectId to string for Pydantic model
-                    if file_doc_data.get("_id"):
-                        file_doc_data["_id"] = str(file_doc_data["_id"])
-                    
-                    file_doc = FileDocument(**file_doc_data)
-                    results.append(FileAttachmentResponse(
-                        id=attachment["file_id"],
-                        filename=file_doc.filename,
-                        content_type=file_doc.content_type,
-                        size=file_doc.size,
-                        url=f"/api/files/{attachment['file_id']}/download",
-                        uploaded_at=file_doc.upload_date
-                    ))
-            
-            return results
+            # ENHANCEMENT L2 BATCHED ATTACHMENTS - All file metadata in one $in query, returned in attachment order
+            projection = {"filename": 1, "content_type": 1, "size": 1, "upload_date": 1}
+            files_by_id = {
+                str(doc["_id"]): doc
+                async for doc in files_collection.find(
+                    {"_id": {"$in": [ObjectId(file_id) for file_id in file_ids if ObjectId.is_valid(file_id)]}},
+                    projection
+                )
+            }
+            return [self._attachment_response(files_by_id[file_id]) for file_id in file_ids if file_id in files_by_id]
             
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Failed to get attachments: {str(e)}")
     
+    @staticmethod
+    def _ref_id(value) -> Optional[str]:
+        """Id of a Beanie Link as stored (DBRef), or of a plain id"""
+        if isinstance(value, DBRef):
+            return str(value.id)
+        if isinstance(value, dict):
+            value = value.get("$id", value.get("_id"))
+        return str(value) if value else None
+    
+    async def _ticket_acl(self, db, ticket_id: str) -> Optional[List[str]]:
+        """
+        ENHANCEMENT L2 FILE ACL - Principals a ticket grants access to its attachments, as TicketService
+        decides ticket visibility: its creator and assigned agent, and while unassigned, agents whose
+        skill category is the ticket's. None if the ticket does not exist.
+        """
+        if not ObjectId.is_valid(ticket_id):
+            return None
+        ticket = await db.tickets.find_one({"_id": ObjectId(ticket_id)}, {"userId": 1, "agentId": 1, "categoryId": 1})
+        if ticket is None:
+            return None
+        acl = []
+        creator = self._ref_id(ticket.get("userId"))
+        agent = self._ref_id(ticket.get("agentId"))
+        category = self._ref_id(ticket.get("categoryId"))
+        if creator:
+            acl.append(f"user:{creator}")
+        if agent:
+            acl.append(f"user:{agent}")
+        elif category:
+            acl.append(f"category:{category}")
+        return acl
+    
+    async def refresh_ticket_acl(self, ticket_id: str) -> None:
+        """
+        ENHANCEMENT L2 FILE ACL - Re-derive the access list on a ticket's attachments
+        Call after the ticket's creator, agent or category changes, or after it is deleted
+        """
+        try:
+            db = await get_database()
+            acl = await self._ticket_acl(db, ticket_id)
+            await db.ticket_file_attachments.update_many({"ticket_id": ticket_id}, {"$set": {"acl": acl or []}})
+        except Exception as e:
+            print(f"Failed to refresh file access for ticket {ticket_id}: {e}")
+    
     async def _user_has_file_access(self, file_id: str, user_id: str) -> bool:
         """
         ENHANCEMENT L2: FILE ATTACHMENTS - Check if user has access to file through ticket attachments
         Used for permission validation when accessing files
+        ENHANCEMENT L2 FILE ACL - One indexed lookup on (file_id, acl); agents not named on a ticket
+        need a second one with their skill category
         """
         
         try:
             db = await get_database()
             attachments_collection = db.ticket_file_attachments
-            tickets_collection = db.tickets
             
-            # Find all tickets that have this file attached
-            attachments_cursor = attachments_collection.find({"file_id": file_id})
-            attachments = await attachments_cursor.to_list(length=None)
+            if await attachments_collection.find_one({"file_id": file_id, "acl": f"user:{user_id}"}, {"_id": 1}):
+                return True
             
-            for attachment in attachments:
-                # Check if user has access to the ticket (is creator or assignee)
-                ticket = await tickets_collection.find_one({"_id": ObjectId(attachment["ticket_id"])})
-                if ticket:
-                    if ticket.get("created_by") == user_id or ticket.get("assigned_to") == user_id:
-                        return True
-            
-            return False
+            if not ObjectId.is_valid(user_id):
+                return False
+            agent_info = await db.agent_info.find_one({"user.$id": ObjectId(user_id)}, {"category": 1})
+            category = self._ref_id(agent_info.get("category")) if agent_info else None
+            if not category:
+                return False
+            return await attachments_collection.find_one({"file_id": file_id, "acl": f"category:{category}"}, {"_id": 1}) is not None
             
         except Exception:
             return False
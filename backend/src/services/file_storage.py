@@ -0,0 +1,244 @@
+"""
+ENHANCEMENT L2 FILE STORAGE
+
+Storage engines for file content (uploads and their derived previews).
+
+Every engine stores opaque blobs under ``ObjectId`` keys, so the ids kept
+in ``file_metadata.gridfs_id``, ``file_blobs`` and ``file_previews`` stay
+valid whichever engine holds the bytes; the documents record the engine
+name in ``storage`` (absent means GridFS, the original engine). Metadata
+lives in those MongoDB documents, not in the engine.
+
+- ``gridfs``: chunks in the ``files`` GridFS bucket of the main database.
+- ``local``: plain files under ``FILE_STORAGE_DIR`` (a local disk or a
+  shared volume), in two levels of 256 sharded directories. Writes go to
+  a temporary file in the target directory, are fsynced and renamed into
+  place, so readers never see a partial blob. Downloads can be served
+  straight from the path (``FileResponse``, or ``X-Accel-Redirect`` to a
+  fronting nginx for kernel ``sendfile``).
+
+Readers share the GridFS ``GridOut`` interface the download code already
+uses: ``length``, ``seek``, ``await read(n)`` and ``close``.
+"""
+
+import asyncio
+import io
+import os
+import shutil
+from functools import lru_cache
+from typing import BinaryIO, Optional, Protocol
+
+from bson import ObjectId
+from gridfs.errors import NoFile
+from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+
+from src.core.config import settings
+from src.db.init_db import get_database
+
+DEFAULT_STORAGE = "gridfs"  # Engine of documents without a ``storage`` field
+CHUNK_SIZE = 255 * 1024  # GridFS default chunk size; also the copy buffer for local files
+
+
+class BlobNotFound(Exception):
+    """No blob with this id in the engine."""
+
+
+class BlobReader(Protocol):
+    length: int
+
+    def seek(self, position: int) -> None:
+        ...
+
+    async def read(self, size: int = -1) -> bytes:
+        ...
+
+    def close(self) -> None:
+        ...
+
+
+class BlobStorage(Protocol):
+    """A place to put file content, addressed by ObjectId."""
+
+    name: str
+
+    async def save(self, source: BinaryIO, filename: str, metadata: Optional[dict] = None, blob_id: Optional[ObjectId] = None) -> ObjectId:
+        """Copy a readable binary file object into a new blob (with a chosen id, for migrations)."""
+        ...
+
+    async def open(self, blob_id: ObjectId) -> BlobReader:
+        """Open a blob for reading. Raises ``BlobNotFound``."""
+        ...
+
+    async def delete(self, blob_id: ObjectId) -> None:
+        """Delete a blob; deleting a missing blob is not an error."""
+        ...
+
+    def path(self, blob_id: ObjectId) -> Optional[str]:
+        """Filesystem path of a blob, for engines that have one."""
+        ...
+
+
+async def _read(source: BinaryIO, size: int) -> bytes:
+    # Spooled uploads may have rolled over to disk; in-memory buffers are read directly
+    if isinstance(source, io.BytesIO):
+        return source.read(size)
+    return await asyncio.to_thread(source.read, size)
+
+
+class GridFSStorage:
+    name = "gridfs"
+
+    def __init__(self, db=None, bucket_name: str = "files"):
+        self._db = db
+        self.bucket_name = bucket_name
+
+    async def _bucket(self) -> AsyncIOMotorGridFSBucket:
+        return AsyncIOMotorGridFSBucket(self._db if self._db is not None else await get_database(), bucket_name=self.bucket_name)
+
+    async def save(self, source: BinaryIO, filename: str, metadata: Optional[dict] = None, blob_id: Optional[ObjectId] = None) -> ObjectId:
+        fs_bucket = await self._bucket()
+        if blob_id is None:
+            grid_in = fs_bucket.open_upload_stream(filename, chunk_size_bytes=CHUNK_SIZE, metadata=metadata)
+        else:
+            grid_in = fs_bucket.open_upload_stream_with_id(blob_id, filename, chunk_size_bytes=CHUNK_SIZE, metadata=metadata)
+        try:
+            while True:
+                chunk = await _read(source, CHUNK_SIZE)
+                if not chunk:
+                    break
+                await grid_in.write(chunk)
+            await grid_in.close()
+        except BaseException:
+            await grid_in.abort()  # Deletes the chunks written so far
+            raise
+        return grid_in._id
+
+    async def open(self, blob_id: ObjectId) -> BlobReader:
+        fs_bucket = await self._bucket()
+        try:
+            return await fs_bucket.open_download_stream(blob_id)
+        except NoFile:
+            raise BlobNotFound(blob_id)
+
+    async def delete(self, blob_id: ObjectId) -> None:
+        fs_bucket = await self._bucket()
+        try:
+            await fs_bucket.delete(blob_id)
+        except NoFile:
+            pass
+
+    def path(self, blob_id: ObjectId) -> Optional[str]:
+        return None
+
+
+class LocalFileReader:
+    """``GridOut``-compatible reader over a local file; reads run in a worker thread."""
+
+    def __init__(self, handle: BinaryIO, path: str, relative_path: str):
+        self._handle = handle
+        self.path = path
+        self.relative_path = relative_path  # Below the storage root, e.g. for X-Accel-Redirect
+        self.stat = os.fstat(handle.fileno())
+        self.length = self.stat.st_size
+
+    def seek(self, position: int) -> None:
+        self._handle.seek(position)
+
+    async def read(self, size: int = -1) -> bytes:
+        return await asyncio.to_thread(self._handle.read, size)
+
+    def close(self) -> None:
+        self._handle.close()
+
+
+class LocalStorage:
+    name = "local"
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+
+    def path(self, blob_id: ObjectId) -> str:
+        key = str(blob_id)
+        # The trailing bytes of an ObjectId are a counter and random value, so they spread
+        # evenly; the leading timestamp bytes would pile recent uploads into one directory
+        return os.path.join(self.root, key[-2:], key[-4:-2], key)
+
+    def _write(self, source: BinaryIO, path: str) -> None:
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{ObjectId()}.tmp"
+        try:
+            with open(tmp, "wb") as handle:
+                shutil.copyfileobj(source, handle, CHUNK_SIZE)
+                handle.flush()
+                os.fsync(handle.fileno())
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except FileNotFoundError:
+                pass
+            raise
+        # Make the rename itself durable
+        dir_fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+    async def save(self, source: BinaryIO, filename: str, metadata: Optional[dict] = None, blob_id: Optional[ObjectId] = None) -> ObjectId:
+        blob_id = blob_id or ObjectId()
+        await asyncio.to_thread(self._write, source, self.path(blob_id))
+        return blob_id
+
+    async def open(self, blob_id: ObjectId) -> BlobReader:
+        path = self.path(blob_id)
+        try:
+            handle = await asyncio.to_thread(open, path, "rb")
+        except FileNotFoundError:
+            raise BlobNotFound(blob_id)
+        return LocalFileReader(handle, path, os.path.relpath(path, self.root))
+
+    async def delete(self, blob_id: ObjectId) -> None:
+        try:
+            await asyncio.to_thread(os.unlink, self.path(blob_id))
+        except FileNotFoundError:
+            pass
+
+
+STORAGE_ENGINES = ("gridfs", "local")
+
+
+@lru_cache(maxsize=None)
+def get_storage(name: Optional[str]) -> BlobStorage:
+    """Engine by the name a document records (``None``: GridFS, for documents from before engines existed)."""
+    name = name or DEFAULT_STORAGE
+    if name == "gridfs":
+        return GridFSStorage()
+    if name == "local":
+        return LocalStorage(settings.file_storage_dir)
+    raise ValueError(f"Unknown file storage engine '{name}' (expected one of {', '.join(STORAGE_ENGINES)})")
+
+
+def upload_storage() -> BlobStorage:
+    """Engine new content is written to (``FILE_STORAGE_BACKEND``)."""
+    return get_storage(settings.file_storage_backend)
+
+
+async def open_blob(storage: Optional[str], blob_id: ObjectId) -> BlobReader:
+    """
+    Open a blob in the engine a document records, falling back to the
+    other engines: a document written while a migration moved its content
+    may still name the old one.
+    """
+    recorded = storage or DEFAULT_STORAGE
+    try:
+        return await get_storage(recorded).open(blob_id)
+    except BlobNotFound:
+        for name in STORAGE_ENGINES:
+            if name != recorded:
+                try:
+                    return await get_storage(name).open(blob_id)
+                except BlobNotFound:
+                    pass
+        raise
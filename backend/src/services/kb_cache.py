@@ -0,0 +1,75 @@
+# ENHANCEMENT L2 KB RESULT CACHE - Generation-stamped cache and ETags for article list/search responses
+
+import hashlib
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+
+from src.services.search import SearchService
+from src.utils.result_cache import GenerationLRUCache
+
+
+class KBResultCache:
+    """
+    Caches serialized article list and search responses per worker.
+
+    Keys are ``(endpoint, normalized query, filters)``; every entry is
+    stamped with the KB generation from ``SearchService``, which any article
+    write (on any worker) advances. ETags are derived from the same
+    generation, so clients revalidate for free until the KB changes.
+    """
+
+    MAX_ENTRIES = 256
+    MAX_BYTES = 64 * 1024 * 1024
+
+    _cache = GenerationLRUCache(MAX_ENTRIES, MAX_BYTES)
+    _adapters: Dict[Any, TypeAdapter] = {}
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        return " ".join(query.lower().split())
+
+    @staticmethod
+    def _etag(generation: int, key: tuple) -> str:
+        digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()[:16]
+        return f'W/"kb-{generation}-{digest}"'
+
+    @classmethod
+    async def respond(
+        cls,
+        request: Request,
+        endpoint: str,
+        params: Dict[str, Any],
+        compute: Callable[[], Awaitable[Any]],
+        response_type: Any,
+        cacheable: Optional[Callable[[Any], bool]] = None,
+    ) -> Response:
+        """
+        Serve ``compute()`` serialized as ``response_type`` from the cache,
+        or a 304 when the client already holds the current version.
+        Results for which ``cacheable(result)`` is false are served but not
+        stored.
+        """
+        await SearchService.ensure_kb_indexes()
+        generation = SearchService.generation()
+        key = (endpoint, tuple(sorted((name, value) for name, value in params.items() if value is not None)))
+        headers = {"ETag": cls._etag(generation, key), "Cache-Control": "private, no-cache"}
+
+        if_none_match = request.headers.get("if-none-match", "")
+        if headers["ETag"] in (tag.strip() for tag in if_none_match.split(",")):
+            return Response(status_code=304, headers=headers)
+
+        body = cls._cache.get(key, generation)
+        if body is None:
+            result = await compute()
+            # Same aliased JSON FastAPI would produce for the route's response_model
+            adapter = cls._adapters.get(response_type)
+            if adapter is None:
+                adapter = cls._adapters[response_type] = TypeAdapter(response_type)
+            body = adapter.dump_json(result, by_alias=True)
+            # Don't cache a result computed while another worker's change was being applied
+            if SearchService.generation() == generation and (cacheable is None or cacheable(result)):
+                cls._cache.put(key, generation, body)
+
+        return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,172 @@
+# ENHANCEMENT L2 KB EMBEDDINGS - Keeps the local article vector index in sync with article writes
+
+import asyncio
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from beanie import PydanticObjectId
+from beanie.operators import In
+
+from src.core.config import settings
+from src.db.init_db import get_database
+from src.langchain_app.utils.text_to_vectors import article_chunks, encode_chunks, get_encoder
+from src.langchain_app.utils.vector_index import VectorHit, VectorIndex
+from src.models.article import Article
+
+
+class KBVectorService:
+    """
+    Owns the per-process article vector index.
+
+    Each article is split into chunks whose ids (``<article_id>:<n>``) are
+    stored on ``Article.vector_ids``. The index is snapshotted to
+    ``KB_INDEX_DIR`` shortly after writes and reconciled against the
+    ``articles`` collection on startup, so only articles that changed while
+    the process was down are re-embedded. Writes made by other workers
+    arrive through ``article_changed``, a ``SearchService`` listener.
+    """
+
+    SNAPSHOT_DELAY_SECONDS = 2.0
+
+    _index: Optional[VectorIndex] = None
+    _init_lock = asyncio.Lock()
+    _snapshot_task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _version(updated_at: datetime) -> str:
+        # MongoDB returns naive UTC datetimes truncated to milliseconds
+        if updated_at.tzinfo is not None:
+            updated_at = updated_at.astimezone(timezone.utc).replace(tzinfo=None)
+        return updated_at.isoformat(timespec="milliseconds")
+
+    @staticmethod
+    def _chunks(article: Article) -> List[str]:
+        text = article.content.text if article.content else ""
+        if article.rendered is not None:
+            text = article.rendered.text
+        return article_chunks(article.title, text)
+
+    @staticmethod
+    def vector_ids_for(article: Article) -> List[str]:
+        """Deterministic chunk ids for an article (the value stored in ``vector_ids``)."""
+        return [f"{article.id}:{n}" for n in range(len(KBVectorService._chunks(article)))]
+
+    @classmethod
+    async def get_index(cls) -> VectorIndex:
+        if cls._index is None:
+            await cls.initialize()
+        return cls._index
+
+    @classmethod
+    async def initialize(cls) -> None:
+        """Load the snapshot (memory-mapped) and re-embed anything that changed since."""
+        async with cls._init_lock:
+            if cls._index is not None:
+                return
+
+            encoder = get_encoder()
+            index = await asyncio.to_thread(VectorIndex.load, settings.kb_index_dir, encoder.dim, encoder.name)
+            if index is None:
+                index = VectorIndex(encoder.dim, encoder.name)
+
+            db = await get_database()
+            current = {
+                str(doc["_id"]): cls._version(doc["updatedAt"]) if doc.get("updatedAt") else ""
+                async for doc in db.articles.find({}, {"updatedAt": 1})
+            }
+
+            for owner in set(index.owners()) - set(current):
+                index.delete(owner)
+
+            stale_ids = [
+                PydanticObjectId(article_id)
+                for article_id, version in current.items()
+                if index.owner_versions.get(article_id) != version
+            ]
+            if stale_ids:
+                articles = await Article.find(In(Article.id, stale_ids)).to_list()
+                for article in articles:
+                    vector_ids = await cls._embed_into(index, article)
+                    if vector_ids != article.vector_ids:
+                        # Backfill ids for articles written outside ArticleService (e.g. seed data)
+                        await db.articles.update_one({"_id": article.id}, {"$set": {"vectorIds": vector_ids}})
+
+            cls._index = index
+            print(f"KB vector index ready: {len(index)} chunks, {len(stale_ids)} articles re-embedded")
+            if stale_ids:
+                cls._schedule_snapshot()
+
+    @classmethod
+    async def _embed_into(cls, index: VectorIndex, article: Article) -> List[str]:
+        chunks = cls._chunks(article)
+        article_id = str(article.id)
+        keys = [f"{article_id}:{n}" for n in range(len(chunks))]
+        if not chunks:
+            index.delete(article_id)
+            return keys
+
+        vectors = await asyncio.to_thread(encode_chunks, article.title, chunks)
+        metadata = [{"article_id": article_id, "chunk": n, "text": chunk} for n, chunk in enumerate(chunks)]
+        index.upsert(article_id, keys, vectors, metadata, version=cls._version(article.updated_at))
+        return keys
+
+    @classmethod
+    async def upsert_article(cls, article: Article) -> List[str]:
+        """(Re-)embed an article after it has been written. Returns its chunk ids."""
+        index = await cls.get_index()
+        keys = await cls._embed_into(index, article)
+        cls._schedule_snapshot()
+        return keys
+
+    @classmethod
+    async def delete_article(cls, article_id: str) -> None:
+        index = await cls.get_index()
+        index.delete(str(article_id))
+        cls._schedule_snapshot()
+
+    @classmethod
+    async def article_changed(cls, article_id: str, doc: Optional[dict]) -> None:
+        """SearchService listener: re-embed or drop an article changed by any worker."""
+        if cls._index is None:
+            return
+        if doc is None:
+            cls._index.delete(article_id)
+            cls._schedule_snapshot()
+            return
+
+        version = cls._version(doc["updatedAt"]) if doc.get("updatedAt") else ""
+        if cls._index.owner_versions.get(article_id) == version:
+            return  # This worker's own write, already embedded by upsert_article
+        article = await Article.get(PydanticObjectId(article_id))
+        if article is None:
+            return
+        await cls._embed_into(cls._index, article)
+        cls._schedule_snapshot()
+
+    @classmethod
+    async def search(cls, query: str, k: int = 5, article_ids: Optional[set] = None) -> List[VectorHit]:
+        """Top-k article chunks by cosine similarity to the query text."""
+        index = await cls.get_index()
+        query_vector = (await asyncio.to_thread(get_encoder().encode, [query]))[0]
+        return index.search(query_vector, k=k, owners=article_ids)
+
+    @classmethod
+    def _schedule_snapshot(cls) -> None:
+        # Coalesce bursts of writes into one snapshot
+        if cls._snapshot_task is None or cls._snapshot_task.done():
+            cls._snapshot_task = asyncio.create_task(cls._snapshot_later())
+
+    @classmethod
+    async def _snapshot_later(cls) -> None:
+        await asyncio.sleep(cls.SNAPSHOT_DELAY_SECONDS)
+        await cls.snapshot()
+
+    @classmethod
+    async def snapshot(cls) -> None:
+        if cls._index is None:
+            return
+        try:
+            state = cls._index.export()
+            await asyncio.to_thread(VectorIndex.write, settings.kb_index_dir, state)
+        except Exception as e:
+            print(f"Failed to snapshot KB vector index: {e}")
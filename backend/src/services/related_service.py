@@ -0,0 +1,135 @@
+# ENHANCEMENT L2 KB RELATED ARTICLES - Precomputed "related articles" from TF-IDF similarity
+
+import asyncio
+from typing import Dict, Iterable, Optional
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from src.db.init_db import get_database
+from src.services.search import SearchService
+from src.utils.tfidf_neighbors import TfidfNeighbors
+
+
+class RelatedArticleService:
+    """
+    Keeps ``Article.related_articles`` filled with each article's most
+    similar articles.
+
+    A background job fits a TF-IDF neighbour model over all articles at
+    startup and writes every article's top-k list. After that, the
+    ``SearchService`` change listener updates only the rows an edit affects
+    and writes only the lists that changed. Vocabulary and IDF weights are
+    frozen between fits, so the model is refit in the background once
+    enough articles have changed. Writes are conditional on the stored list
+    differing, so several workers applying the same change is harmless.
+    """
+
+    K = 5
+    MIN_SCORE = 0.05
+    REFIT_FRACTION = 0.2  # Refit after this share of articles changed since the last fit
+    MIN_REFIT_CHANGES = 50
+    PROJECTION = {"title": 1, "tags": 1, "aiGeneratedTags": 1, "content.text": 1, "rendered.text": 1}
+
+    _model: Optional[TfidfNeighbors] = None
+    _titles: Dict[str, str] = {}
+    _pending: Dict[str, Optional[dict]] = {}  # Article id -> latest raw doc (None when deleted), not yet applied
+    _lock = asyncio.Lock()
+    _fit_task: Optional[asyncio.Task] = None
+    _drain_task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _text(doc: dict, tags_by_id) -> str:
+        fields = SearchService.document_fields(doc, tags_by_id)
+        # Title twice so it outweighs a long body
+        return " ".join([fields["title"], fields["title"], fields["tags"], fields["content"]])
+
+    @classmethod
+    def initialize(cls) -> None:
+        SearchService.add_listener(cls.article_changed)
+        cls._schedule_fit()
+
+    @classmethod
+    def _schedule_fit(cls) -> None:
+        if cls._fit_task is None or cls._fit_task.done():
+            cls._fit_task = asyncio.create_task(cls.fit())
+
+    @classmethod
+    async def fit(cls) -> None:
+        """Rebuild the model from every article and store all neighbour lists."""
+        try:
+            db = await get_database()
+            docs = await db.articles.find({}, cls.PROJECTION).to_list(None)
+            tags_by_id = await SearchService.resolve_tags(docs)
+            texts = [(str(doc["_id"]), cls._text(doc, tags_by_id)) for doc in docs]
+
+            model = TfidfNeighbors(k=cls.K, min_score=cls.MIN_SCORE)
+            await asyncio.to_thread(model.fit, texts)
+
+            async with cls._lock:
+                cls._model = model
+                cls._titles = {str(doc["_id"]): doc.get("title", "") for doc in docs}
+                written = await cls._store(model.neighbors)
+            print(f"KB related articles ready: {len(model)} articles, {len(model.vocabulary)} terms, {written} lists updated")
+            # Edits made while the fit was reading and computing
+            await cls._drain()
+        except Exception as e:
+            print(f"Failed to build related articles: {e}")
+
+    @classmethod
+    async def article_changed(cls, article_id: str, doc: Optional[dict]) -> None:
+        """SearchService listener: queue the change; a background task applies queued changes in order."""
+        cls._pending[article_id] = doc
+        fitting = cls._fit_task is not None and not cls._fit_task.done()
+        # While a fit runs, changes wait for the new model rather than going into the old one
+        if cls._model is not None and not fitting and (cls._drain_task is None or cls._drain_task.done()):
+            cls._drain_task = asyncio.create_task(cls._drain())
+
+    @classmethod
+    async def _drain(cls) -> None:
+        async with cls._lock:
+            while cls._pending:
+                pending, cls._pending = cls._pending, {}
+                changed = set()
+                for article_id, doc in pending.items():
+                    try:
+                        changed |= await cls._apply(article_id, doc)
+                    except Exception as e:
+                        print(f"Failed to update related articles for {article_id}: {e}")
+                await cls._store(changed)
+
+            threshold = max(cls.MIN_REFIT_CHANGES, int(len(cls._model) * cls.REFIT_FRACTION))
+            if cls._model.changes_since_fit >= threshold:
+                cls._schedule_fit()
+
+    @classmethod
+    async def _apply(cls, article_id: str, doc: Optional[dict]) -> set:
+        # Call under _lock; the model is only mutated off the event loop, one change at a time
+        if doc is None:
+            cls._titles.pop(article_id, None)
+            return await asyncio.to_thread(cls._model.remove, article_id)
+        cls._titles[article_id] = doc.get("title", "")
+        text = cls._text(doc, await SearchService.resolve_tags([doc]))
+        changed = await asyncio.to_thread(cls._model.upsert, article_id, text)
+        # Lists that mention this article carry its (possibly new) title
+        return changed | cls._model.listed_by(article_id)
+
+    @classmethod
+    async def _store(cls, article_ids: Iterable[str]) -> int:
+        requests = []
+        for article_id in article_ids:
+            if not ObjectId.is_valid(article_id) or article_id not in cls._model:
+                continue
+            related = [
+                {"id": other, "title": cls._titles.get(other, ""), "score": score}
+                for other, score in cls._model.neighbors.get(article_id, [])
+            ]
+            requests.append(UpdateOne(
+                {"_id": ObjectId(article_id), "relatedArticles": {"$ne": related}},
+                {"$set": {"relatedArticles": related}},
+            ))
+        if not requests:
+            return 0
+        db = await get_database()
+        result = await db.articles.bulk_write(requests, ordered=False)
+        return result.modified_count
@@ -0,0 +1,672 @@
+# ENHANCEMENT L2 KB SEARCH - Incremental BM25 index over knowledge base articles, with a MongoDB $text alternative
+
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import OperationFailure
+
+from src.core.config import settings
+from src.db.init_db import get_database
+from src.services.kb_vector_service import KBVectorService
+from src.utils.bm25_index import BM25Index
+from src.utils.rank_fusion import reciprocal_rank_fusion
+from src.utils.text_analysis import analyze, highlight_snippet
+
+ArticleListener = Callable[[str, Optional[dict]], Awaitable[None]]
+MetadataListener = Callable[[Optional[List[str]]], Awaitable[None]]
+
+# Article fields linking categories, subcategories and tags (DBRefs)
+LINK_FIELDS = ("categoryId", "subCategoryId", "tags")
+
+# ENHANCEMENT L2 KB FACETS - Facet name -> index metadata key / field path in the faceted aggregation
+# (link ids are projected out of the DBRefs first: field paths may not contain "$id")
+FACET_FIELDS = {
+    "category": ("category_id", "$category_id"),
+    "subcategory": ("subcategory_id", "$subcategory_id"),
+    "ai_tag": ("ai_tags", "$aiGeneratedTags"),
+}
+
+
+class FacetedHits(NamedTuple):
+    hits: List[Tuple[str, float]]  # Top ranked (article_id, score) pairs
+    total: int  # Number of matching articles, before the limit
+    facets: Dict[str, List[Tuple[str, int]]]  # Facet name -> (value, count), most common first
+
+
+def ref_id(value) -> Optional[str]:
+    """Id of a stored Beanie link (DBRef), or of an already-plain id."""
+    if value is None:
+        return None
+    if hasattr(value, "id"):
+        return str(value.id)
+    if isinstance(value, dict):
+        return str(value.get("$id") or value.get("_id") or "") or None
+    return str(value)
+
+
+class SearchService:
+    """
+    Owns the per-process BM25 article index.
+
+    Every worker keeps its own index, so writes are propagated through a
+    shared ``kb_state`` document holding a KB generation counter and a
+    bounded log of changed article ids. ``article_documents_changed``
+    re-indexes the article locally and bumps the generation;
+    ``ensure_kb_indexes`` (called before each search) polls that document at
+    most once per ``SYNC_INTERVAL_SECONDS`` and replays changes made by
+    other workers. Listeners registered with ``add_listener`` are notified
+    of every applied change, local or replicated. Renamed or deleted
+    categories, subcategories and tags are logged too: every worker tells
+    its ``add_metadata_listener`` listeners, then re-indexes the articles
+    linking them.
+    """
+
+    FIELD_BOOSTS = {"title": 3.0, "tags": 2.0, "content": 1.0}
+    TEXT_INDEX_NAME = "article_text"
+    TEXT_INDEX_WEIGHTS = {"title": 10, "aiGeneratedTags": 5, "content.text": 1}
+    SYNC_INTERVAL_SECONDS = 1.0
+    CHANGE_LOG_SIZE = 500
+    SNAPSHOT_DELAY_SECONDS = 2.0
+    FACET_LIMIT = 20  # Values returned per facet
+    STATE_ID = "articles"
+
+    _index: Optional[BM25Index] = None
+    _generation = 0
+    _last_sync = 0.0
+    _init_lock = asyncio.Lock()
+    _sync_lock = asyncio.Lock()
+    _listeners: List[ArticleListener] = []
+    _metadata_listeners: List[MetadataListener] = []
+    _snapshot_task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _version(updated_at) -> str:
+        if not updated_at:
+            return ""
+        # MongoDB returns naive UTC datetimes truncated to milliseconds
+        if updated_at.tzinfo is not None:
+            updated_at = updated_at.astimezone(timezone.utc).replace(tzinfo=None)
+        return updated_at.isoformat(timespec="milliseconds")
+
+    @classmethod
+    def generation(cls) -> int:
+        """KB generation this worker has applied; changes whenever any article changes."""
+        return cls._generation
+
+    @classmethod
+    def add_listener(cls, listener: ArticleListener) -> None:
+        """Register ``listener(article_id, raw_doc_or_None)``, awaited after each applied change."""
+        if listener not in cls._listeners:
+            cls._listeners.append(listener)
+
+    @classmethod
+    def add_metadata_listener(cls, listener: MetadataListener) -> None:
+        """
+        Register ``listener(link_ids_or_None)``, awaited with the ids of changed
+        categories, subcategories or tags (``None``: any may have changed)
+        before the articles linking them are re-indexed.
+        """
+        if listener not in cls._metadata_listeners:
+            cls._metadata_listeners.append(listener)
+
+    @classmethod
+    async def get_index(cls) -> BM25Index:
+        await cls.ensure_kb_indexes()
+        return cls._index
+
+    @classmethod
+    async def initialize(cls) -> None:
+        """Load the snapshot and re-index anything that changed while the process was down."""
+        async with cls._init_lock:
+            if cls._index is not None:
+                return
+
+            db = await get_database()
+            await cls._ensure_mongo_indexes(db)
+            state = await db.kb_state.find_one({"_id": cls.STATE_ID}, {"generation": 1})
+            generation = (state or {}).get("generation", 0)
+
+            index = await asyncio.to_thread(BM25Index.load, settings.kb_index_dir, cls.FIELD_BOOSTS)
+            if index is None:
+                index = BM25Index(cls.FIELD_BOOSTS)
+
+            cls._index = index
+            cls._generation = generation
+            cls._last_sync = time.monotonic()
+            reindexed = await cls._reconcile(notify=False)
+            print(f"KB search index ready: {len(index)} articles, {index.vocabulary_size()} terms, {reindexed} re-indexed")
+
+    @staticmethod
+    def engine() -> str:
+        return settings.kb_search_engine
+
+    @classmethod
+    async def _ensure_mongo_indexes(cls, db) -> None:
+        # Category/subcategory filters match on the DBRef id, which needs its own index
+        await db.articles.create_index([("categoryId.$id", 1)])
+        await db.articles.create_index([("subCategoryId.$id", 1)])
+        if cls.engine() != "mongo_text":
+            return
+        try:
+            await db.articles.create_index(
+                [(field, "text") for field in cls.TEXT_INDEX_WEIGHTS],
+                weights=cls.TEXT_INDEX_WEIGHTS,
+                default_language="english",
+                name=cls.TEXT_INDEX_NAME,
+            )
+        except OperationFailure as e:
+            # A collection has at most one text index; an older definition must be dropped by hand
+            print(f"Could not create article text index: {e}")
+
+    @classmethod
+    async def ensure_kb_indexes(cls) -> None:
+        """Make sure the index is loaded and has applied other workers' recent changes."""
+        if cls._index is None:
+            await cls.initialize()
+            return
+        if time.monotonic() - cls._last_sync < cls.SYNC_INTERVAL_SECONDS:
+            return
+
+        async with cls._sync_lock:
+            if time.monotonic() - cls._last_sync < cls.SYNC_INTERVAL_SECONDS:
+                return
+            db = await get_database()
+            state = await db.kb_state.find_one({"_id": cls.STATE_ID})
+            cls._last_sync = time.monotonic()
+            await cls._apply_state(state)
+
+    @classmethod
+    async def article_documents_changed(cls, article_id, force_reindex: bool = False) -> None:
+        """
+        Re-index an article after it was created, updated or deleted, and
+        publish the change to other workers. Without ``force_reindex`` an
+        article whose ``updatedAt`` matches the indexed version is skipped.
+        """
+        await cls.ensure_kb_indexes()
+        article_id = str(article_id)
+
+        async with cls._sync_lock:
+            changed = await cls._reindex([article_id], force=force_reindex)
+            if changed:
+                await cls._publish(article_id)
+
+    # ENHANCEMENT L2 KB RESULT CACHE - Category, subcategory and tag edits change cached article responses too
+    @classmethod
+    async def kb_metadata_changed(cls, link_field: Optional[str] = None, link_id: Optional[str] = None) -> None:
+        """
+        Bump the KB generation after a category, subcategory or tag was
+        renamed or deleted. With the article field linking it (one of
+        ``LINK_FIELDS``) and its id, the articles linking it are re-indexed
+        here and in the other workers, since their indexed text includes the name.
+        """
+        await cls.ensure_kb_indexes()
+        link = f"{link_field}:{link_id}" if link_field and link_id else None
+        async with cls._sync_lock:
+            if link:
+                await cls._links_changed([link])
+            await cls._publish(None, link=link)
+
+    @classmethod
+    async def _links_changed(cls, links: Optional[List[str]]) -> None:
+        """Notify metadata listeners and force re-indexing of the articles linking ``<field>:<id>`` links (``None``: all)."""
+        for listener in cls._metadata_listeners:
+            try:
+                await listener(None if links is None else [link.split(":", 1)[1] for link in links])
+            except Exception as e:
+                print(f"KB metadata listener failed: {e}")
+
+        query = {}
+        if links is not None:
+            clauses = [
+                {f"{field}.$id": ObjectId(link_id)}
+                for field, link_id in (link.split(":", 1) for link in links)
+                if field in LINK_FIELDS and ObjectId.is_valid(link_id)
+            ]
+            if not clauses:
+                return
+            query = {"$or": clauses}
+        db = await get_database()
+        article_ids = [str(doc["_id"]) async for doc in db.articles.find(query, {"_id": 1})]
+        for start in range(0, len(article_ids), 500):
+            await cls._reindex(article_ids[start:start + 500], force=True)
+
+    @classmethod
+    async def _publish(cls, article_id: Optional[str], link: Optional[str] = None) -> None:
+        """Bump the shared generation and log the change for other workers (call under ``_sync_lock``)."""
+        db = await get_database()
+        state = await db.kb_state.find_one_and_update(
+            {"_id": cls.STATE_ID},
+            [
+                {"$set": {"generation": {"$add": [{"$ifNull": ["$generation", 0]}, 1]}}},
+                {"$set": {
+                    "changes": {"$slice": [
+                        {"$concatArrays": [
+                            {"$ifNull": ["$changes", []]},
+                            [{"generation": "$generation", "article_id": article_id, "link": link}],
+                        ]},
+                        -cls.CHANGE_LOG_SIZE,
+                    ]},
+                    "updated_at": datetime.now(timezone.utc),
+                }},
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        await cls._apply_state(state, own_generation=state["generation"])
+
+    @classmethod
+    async def _apply_state(cls, state: Optional[dict], own_generation: Optional[int] = None) -> None:
+        if not state or state.get("generation", 0) <= cls._generation:
+            return
+
+        pending = [
+            change for change in state.get("changes", [])
+            if change["generation"] > cls._generation and change["generation"] != own_generation
+        ]
+        expected = state["generation"] - cls._generation - (1 if own_generation else 0)
+        if len(pending) < expected:
+            # Fell further behind than the change log reaches; compare everything, and since
+            # renames do not change article versions, re-read every article's linked names
+            await cls._reconcile(notify=True)
+            await cls._links_changed(None)
+        elif pending:
+            links = [change["link"] for change in pending if change.get("link")]
+            if links:
+                await cls._links_changed(list(dict.fromkeys(links)))
+            article_ids = [change["article_id"] for change in pending if change.get("article_id")]
+            await cls._reindex(list(dict.fromkeys(article_ids)))
+        cls._generation = state["generation"]
+
+    @classmethod
+    async def _reconcile(cls, notify: bool) -> int:
+        db = await get_database()
+        current = {
+            str(doc["_id"]): cls._version(doc.get("updatedAt"))
+            async for doc in db.articles.find({}, {"updatedAt": 1})
+        }
+
+        index = cls._index
+        removed = set(index.doc_ids()) - set(current)
+        for article_id in removed:
+            index.remove(article_id)
+            if notify:
+                await cls._notify(article_id, None)
+
+        stale = [article_id for article_id, version in current.items() if index.versions.get(article_id) != version]
+        for start in range(0, len(stale), 500):
+            await cls._reindex(stale[start:start + 500], force=True, notify=notify)
+
+        if removed or stale:
+            cls._schedule_snapshot()
+        return len(stale)
+
+    @classmethod
+    async def resolve_tags(cls, docs: Iterable[dict]) -> Dict[str, Tuple[str, str]]:
+        """``(key, value)`` of every tag linked from the given raw article documents, by tag id."""
+        tag_ids = {ref_id(tag) for doc in docs for tag in doc.get("tags") or []}
+        tag_ids = [ObjectId(tag_id) for tag_id in tag_ids if tag_id and ObjectId.is_valid(tag_id)]
+        if not tag_ids:
+            return {}
+        db = await get_database()
+        return {
+            str(tag["_id"]): (tag.get("key", ""), tag.get("value", ""))
+            async for tag in db.tags.find({"_id": {"$in": tag_ids}}, {"key": 1, "value": 1})
+        }
+
+    @classmethod
+    def document_fields(cls, doc: dict, tags_by_id: Dict[str, Tuple[str, str]]) -> Dict[str, str]:
+        """Searchable field texts for a raw ``articles`` document."""
+        tags = list(doc.get("aiGeneratedTags") or [])
+        tags += [" ".join(tags_by_id.get(ref_id(tag), ())) for tag in doc.get("tags") or []]
+        return {
+            "title": doc.get("title", ""),
+            "tags": " ".join(tags),
+            # ENHANCEMENT L2 KB RENDERING - Normalized text from the stored rendering when there is one
+            "content": (doc.get("rendered") or {}).get("text") or (doc.get("content") or {}).get("text", ""),
+        }
+
+    @classmethod
+    async def _reindex(cls, article_ids: List[str], force: bool = False, notify: bool = True) -> List[str]:
+        """Re-read articles from MongoDB and (re-)index them. Returns the ids that changed."""
+        db = await get_database()
+        object_ids = [ObjectId(article_id) for article_id in article_ids if ObjectId.is_valid(article_id)]
+        docs = {str(doc["_id"]): doc async for doc in db.articles.find({"_id": {"$in": object_ids}})}
+        tags_by_id = await cls.resolve_tags(docs.values())
+
+        index = cls._index
+        changed = []
+        for article_id in article_ids:
+            doc = docs.get(article_id)
+            if doc is None:
+                if article_id not in index:
+                    continue
+                index.remove(article_id)
+            else:
+                version = cls._version(doc.get("updatedAt"))
+                if not force and article_id in index and index.versions.get(article_id) == version:
+                    continue
+                index.upsert(
+                    article_id,
+                    cls.document_fields(doc, tags_by_id),
+                    metadata={
+                        "category_id": ref_id(doc.get("categoryId")),
+                        "subcategory_id": ref_id(doc.get("subCategoryId")),
+                        "ai_tags": list(dict.fromkeys(tag for tag in doc.get("aiGeneratedTags") or [] if tag)),
+                        "title": doc.get("title", ""),
+                    },
+                    version=version,
+                )
+            changed.append(article_id)
+            if notify:
+                await cls._notify(article_id, doc)
+
+        if changed:
+            cls._schedule_snapshot()
+        return changed
+
+    @classmethod
+    async def _notify(cls, article_id: str, doc: Optional[dict]) -> None:
+        for listener in cls._listeners:
+            try:
+                await listener(article_id, doc)
+            except Exception as e:
+                print(f"KB change listener failed for article {article_id}: {e}")
+
+    @classmethod
+    async def search(
+        cls,
+        query: str,
+        category_id: Optional[str] = None,
+        subcategory_id: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[Tuple[str, float]]:
+        """Ranked ``(article_id, score)`` pairs for a free-text query, using the configured engine."""
+        if cls.engine() == "mongo_text":
+            return await cls.text_search(query, category_id, subcategory_id, limit)
+        if cls.engine() == "hybrid":
+            return await cls.hybrid_search(query, category_id, subcategory_id, limit)
+        return await cls.bm25_search(query, category_id, subcategory_id, limit)
+
+    # ENHANCEMENT L2 KB HYBRID SEARCH - Fuse BM25 with embedding similarity so paraphrased queries still match
+    @classmethod
+    async def hybrid_search(
+        cls,
+        query: str,
+        category_id: Optional[str] = None,
+        subcategory_id: Optional[str] = None,
+        limit: Optional[int] = None,
+        lexical_weight: Optional[float] = None,
+        vector_weight: Optional[float] = None,
+    ) -> List[Tuple[str, float]]:
+        """
+        BM25 and vector rankings combined with weighted reciprocal rank
+        fusion. Scores are fused RRF scores, not BM25 scores. Weights
+        default to the ``KB_HYBRID_*`` settings.
+        """
+        lexical_weight = settings.kb_hybrid_lexical_weight if lexical_weight is None else lexical_weight
+        vector_weight = settings.kb_hybrid_vector_weight if vector_weight is None else vector_weight
+        candidates = max(settings.kb_hybrid_candidates, limit or 0)
+
+        lexical = []
+        if lexical_weight > 0:
+            lexical = [article_id for article_id, _ in await cls.bm25_search(query, category_id, subcategory_id, candidates)]
+        semantic = []
+        if vector_weight > 0:
+            semantic = await cls.vector_ranking(query, category_id, subcategory_id, candidates)
+
+        return reciprocal_rank_fusion(
+            [(lexical_weight, lexical), (vector_weight, semantic)],
+            k=settings.kb_hybrid_rrf_k,
+            limit=limit,
+        )
+
+    @classmethod
+    async def vector_ranking(
+        cls,
+        query: str,
+        category_id: Optional[str] = None,
+        subcategory_id: Optional[str] = None,
+        limit: int = 100,
+        min_similarity: Optional[float] = None,
+    ) -> List[str]:
+        """
+        Article ids by their best chunk's cosine similarity to the query, leaving
+        out articles below ``min_similarity`` (default ``KB_HYBRID_MIN_SIMILARITY``)
+        so unrelated queries add no semantic matches.
+        """
+        min_similarity = settings.kb_hybrid_min_similarity if min_similarity is None else min_similarity
+        await cls.ensure_kb_indexes()  # Applies other workers' edits to the vector index too
+        allowed = None
+        accept = cls._metadata_filter(category_id, subcategory_id)
+        if accept is not None:
+            index = await cls.get_index()
+            allowed = {doc_id for doc_id, metadata in index.metadata.items() if accept(doc_id, metadata)}
+            if not allowed:
+                return []
+        # Articles have several chunks; over-fetch so enough distinct articles remain
+        hits = await KBVectorService.search(query, k=limit * 3, article_ids=allowed)
+        return list(dict.fromkeys(hit.owner for hit in hits if hit.score >= min_similarity))[:limit]
+
+    # ENHANCEMENT L2 KB FACETS - Hits plus category, subcategory and AI tag counts in one query
+    @classmethod
+    async def faceted_search(
+        cls,
+        query: str,
+        category_id: Optional[str] = None,
+        subcategory_id: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> FacetedHits:
+        """
+        Like ``search``, plus per-facet counts over every matching article
+        (filters applied), so clients can show narrowing options without
+        re-running the query per filter.
+        """
+        if cls.engine() == "mongo_text":
+            return await cls.text_faceted_search(query, category_id, subcategory_id, limit)
+
+        index = await cls.get_index()
+        if cls.engine() == "hybrid":
+            # Facets cover every fused candidate, including semantic-only matches
+            fused = [hit for hit in await cls.hybrid_search(query, category_id, subcategory_id) if hit[0] in index]
+            scores = dict(fused)
+            hits = fused[:limit] if limit else fused
+        else:
+            scores = index.score(query, cls._metadata_filter(category_id, subcategory_id))
+            hits = index.rank(scores, limit)
+        counts = index.facet_counts(scores, (key for key, _ in FACET_FIELDS.values()))
+        return FacetedHits(
+            hits=hits,
+            total=len(scores),
+            facets={
+                name: counts[key].most_common(cls.FACET_LIMIT)
+                for name, (key, _) in FACET_FIELDS.items()
+            },
+        )
+
+    @classmethod
+    async def text_faceted_search(
+        cls,
+        query: str,
+        category_id: Optional[str] = None,
+        subcategory_id: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> FacetedHits:
+        """``$text`` match with hits, total and facet counts from a single ``$facet`` aggregation."""
+        db = await get_database()
+
+        def count_by(path: str) -> List[dict]:
+            return [
+                {"$group": {"_id": path, "count": {"$sum": 1}}},
+                {"$match": {"_id": {"$ne": None}}},
+                {"$sort": {"count": -1, "_id": 1}},
+                {"$limit": cls.FACET_LIMIT},
+            ]
+
+        hits_stage = [{"$sort": {"score": -1}}]
+        if limit:
+            hits_stage.append({"$limit": limit})
+        hits_stage.append({"$project": {"score": 1}})
+
+        facets = {name: count_by(path) for name, (_, path) in FACET_FIELDS.items()}
+        # Count each distinct AI tag once per article
+        facets["ai_tag"] = [
+            {"$unwind": "$aiGeneratedTags"},
+            {"$group": {"_id": {"article": "$_id", "tag": "$aiGeneratedTags"}}},
+            {"$project": {"aiGeneratedTags": "$_id.tag"}},
+        ] + facets["ai_tag"]
+
+        pipeline = [
+            {"$match": cls._text_filter(query, category_id, subcategory_id)},
+            {"$project": {
+                "score": {"$meta": "textScore"},
+                "category_id": {"$getField": {"field": {"$literal": "$id"}, "input": "$categoryId"}},
+                "subcategory_id": {"$getField": {"field": {"$literal": "$id"}, "input": "$subCategoryId"}},
+                "aiGeneratedTags": 1,
+            }},
+            {"$facet": {"hits": hits_stage, "total": [{"$count": "n"}], **facets}},
+        ]
+        result = (await db.articles.aggregate(pipeline).to_list(1) or [{}])[0]
+        total = result.get("total") or [{"n": 0}]
+        return FacetedHits(
+            hits=[(str(doc["_id"]), doc["score"]) for doc in result.get("hits", [])],
+            total=total[0]["n"],
+            facets={
+                name: [(str(bucket["_id"]), bucket["count"]) for bucket in result.get(name, [])]
+                for name in FACET_FIELDS
+            },
+        )
+
+    @staticmethod
+    def _text_filter(query: str, category_id: Optional[str], subcategory_id: Optional[str]) -> dict:
+        search_filter = {"$text": {"$search": query}}
+        if category_id:
+            search_filter["categoryId.$id"] = ObjectId(category_id)
+        if subcategory_id:
+            search_filter["subCategoryId.$id"] = ObjectId(subcategory_id)
+        return search_filter
+
+    @staticmethod
+    def _metadata_filter(category_id: Optional[str], subcategory_id: Optional[str]) -> Optional[Callable[[str, dict], bool]]:
+        if not category_id and not subcategory_id:
+            return None
+
+        def accept(doc_id: str, metadata: dict) -> bool:
+            return (
+                (not category_id or metadata.get("category_id") == category_id)
+                and (not subcategory_id or metadata.get("subcategory_id") == subcategory_id)
+            )
+        return accept
+
+    @classmethod
+    async def text_search(
+        cls,
+        query: str,
+        category_id: Optional[str] = None,
+        subcategory_id: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[Tuple[str, float]]:
+        """Ranked matches from the weighted MongoDB ``$text`` index, by ``textScore``."""
+        db = await get_database()
+        score = {"$meta": "textScore"}
+        cursor = db.articles.find(cls._text_filter(query, category_id, subcategory_id), {"score": score}).sort([("score", score)])
+        if limit:
+            cursor = cursor.limit(limit)
+        return [(str(doc["_id"]), doc["score"]) async for doc in cursor]
+
+    @classmethod
+    async def bm25_search(
+        cls,
+        query: str,
+        category_id: Optional[str] = None,
+        subcategory_id: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[Tuple[str, float]]:
+        """Ranked matches from the in-process BM25 index."""
+        index = await cls.get_index()
+        return index.search(query, limit=limit, accept=cls._metadata_filter(category_id, subcategory_id))
+
+    # ENHANCEMENT L2 KB DEFLECTION - Suggest articles for a ticket draft within a latency budget
+    @staticmethod
+    def deflection_terms(title: str, description: str) -> List[str]:
+        """
+        Sorted distinct query terms of a ticket draft. A word still being
+        typed (the text does not end in a separator) is left out while other
+        terms remain, so every keystroke inside a word maps to the same terms
+        and hits the same cache entry.
+        """
+        text = "\n".join(part for part in (title, description) if part)
+        terms = analyze(text)
+        if terms and text[-1:].isalnum():
+            tail = analyze(text.split()[-1])
+            if tail and tail[-1] == terms[-1] and len(terms) > 1:
+                terms.pop()
+        return sorted(set(terms))
+
+    @classmethod
+    async def deflect(
+        cls,
+        terms: List[str],
+        category_id: Optional[str] = None,
+        subcategory_id: Optional[str] = None,
+        limit: int = 5,
+        budget_ms: Optional[float] = None,
+    ) -> Tuple[List[Tuple[str, str, float]], bool]:
+        """
+        Top ``(article_id, title, score)`` BM25 matches for ``deflection_terms``,
+        answered from the in-process index without touching MongoDB. At most
+        ``KB_DEFLECT_MAX_TERMS`` of the rarest terms are scored and scoring
+        stops once the budget is spent; the flag is False when results were
+        cut short (or the index was not ready in time).
+        """
+        budget = (settings.kb_deflect_budget_ms if budget_ms is None else budget_ms) / 1000.0
+        deadline = time.perf_counter() + budget
+        if not terms:
+            return [], True
+        try:
+            # A pending sync with other workers may use part of the budget, never all of it
+            await asyncio.wait_for(asyncio.shield(cls.ensure_kb_indexes()), timeout=budget / 2)
+        except asyncio.TimeoutError:
+            if cls._index is None:
+                return [], False
+
+        index = cls._index
+        scores, complete = index.score_terms(
+            terms,
+            accept=cls._metadata_filter(category_id, subcategory_id),
+            max_terms=settings.kb_deflect_max_terms,
+            deadline=deadline,
+        )
+        return [
+            (article_id, index.metadata[article_id].get("title", ""), score)
+            for article_id, score in index.rank(scores, limit)
+        ], complete
+
+    @staticmethod
+    def snippet(text: str, query: str) -> str:
+        """Highlighted excerpt of an article's text around the query terms."""
+        return highlight_snippet(text, query)
+
+    @classmethod
+    def _schedule_snapshot(cls) -> None:
+        # Coalesce bursts of writes into one snapshot
+        if cls._snapshot_task is None or cls._snapshot_task.done():
+            cls._snapshot_task = asyncio.create_task(cls._snapshot_later())
+
+    @classmethod
+    async def _snapshot_later(cls) -> None:
+        await asyncio.sleep(cls.SNAPSHOT_DELAY_SECONDS)
+        await cls.snapshot()
+
+    @classmethod
+    async def snapshot(cls) -> None:
+        if cls._index is None:
+            return
+        try:
+            state = cls._index.export()
+            await asyncio.to_thread(BM25Index.write, settings.kb_index_dir, state)
+        except Exception as e:
+            print(f"Failed to snapshot KB search index: {e}")
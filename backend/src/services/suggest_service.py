@@ -0,0 +1,125 @@
+# ENHANCEMENT L2 KB SUGGEST - Prefix autocomplete over article titles, tags and categories
+
+import asyncio
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from bson import ObjectId
+
+from src.db.init_db import get_database
+from src.services.search import SearchService, ref_id
+from src.utils.prefix_index import PrefixIndex, Suggestion
+
+KIND_TITLE = "title"
+KIND_TAG = "tag"
+KIND_CATEGORY = "category"
+KIND_SUBCATEGORY = "subcategory"
+
+
+class SuggestService:
+    """
+    Owns the per-process autocomplete index.
+
+    Built once at startup from the ``articles`` collection and then kept
+    current through ``SearchService`` change notifications, so edits made
+    on other workers arrive with the next search-index sync. Title
+    popularity comes from article view counts; tag and category popularity
+    is the number of articles using them.
+    """
+
+    PROJECTION = {"title": 1, "tags": 1, "aiGeneratedTags": 1, "categoryId": 1, "subCategoryId": 1, "viewCount": 1}
+
+    _index: Optional[PrefixIndex] = None
+    _init_lock = asyncio.Lock()
+    _category_names: Dict[str, Tuple[str, str]] = {}  # id -> (kind, name)
+
+    @classmethod
+    async def _load_category_names(cls, ids: Optional[Iterable[str]] = None) -> None:
+        db = await get_database()
+        query = {}
+        if ids is not None:
+            query = {"_id": {"$in": [ObjectId(i) for i in ids if ObjectId.is_valid(i)]}}
+        async for doc in db.categories.find(query, {"name": 1}):
+            cls._category_names[str(doc["_id"])] = (KIND_CATEGORY, doc.get("name", ""))
+        async for doc in db.subcategories.find(query, {"name": 1}):
+            cls._category_names[str(doc["_id"])] = (KIND_SUBCATEGORY, doc.get("name", ""))
+
+    @classmethod
+    def _suggestions_for(cls, article_id: str, doc: dict, tags_by_id: Dict[str, Tuple[str, str]]) -> List[Tuple[str, str, Optional[str]]]:
+        suggestions = [(doc.get("title", ""), KIND_TITLE, article_id)]
+        suggestions += [(tag, KIND_TAG, None) for tag in doc.get("aiGeneratedTags") or []]
+        for tag in doc.get("tags") or []:
+            key_value = tags_by_id.get(ref_id(tag))
+            if key_value:
+                suggestions.append((f"{key_value[0]}: {key_value[1]}", KIND_TAG, None))
+        for field in ("categoryId", "subCategoryId"):
+            link_id = ref_id(doc.get(field))
+            if link_id in cls._category_names:
+                kind, name = cls._category_names[link_id]
+                suggestions.append((name, kind, link_id))
+        return suggestions
+
+    @classmethod
+    async def initialize(cls) -> None:
+        async with cls._init_lock:
+            if cls._index is not None:
+                return
+
+            await cls._load_category_names()
+            db = await get_database()
+            docs = await db.articles.find({}, cls.PROJECTION).to_list(None)
+            tags_by_id = await SearchService.resolve_tags(docs)
+
+            index = PrefixIndex()
+            index.build((str(doc["_id"]), cls._suggestions_for(str(doc["_id"]), doc, tags_by_id)) for doc in docs)
+            for doc in docs:
+                if doc.get("viewCount"):
+                    index.set_boost(KIND_TITLE, doc.get("title", ""), doc["viewCount"])
+
+            cls._index = index
+            SearchService.add_listener(cls.article_changed)
+            SearchService.add_metadata_listener(cls.metadata_changed)
+            print(f"KB suggest index ready: {len(index)} suggestions from {len(docs)} articles")
+
+    @classmethod
+    async def article_changed(cls, article_id: str, doc: Optional[dict]) -> None:
+        """SearchService listener: refresh one article's suggestions."""
+        if cls._index is None:
+            return
+        if doc is None:
+            cls._index.remove_owner(article_id)
+            return
+
+        missing = [
+            link_id for link_id in (ref_id(doc.get("categoryId")), ref_id(doc.get("subCategoryId")))
+            if link_id and link_id not in cls._category_names
+        ]
+        if missing:
+            await cls._load_category_names(missing)
+
+        cls._index.set_owner(article_id, cls._suggestions_for(article_id, doc, await SearchService.resolve_tags([doc])))
+        if doc.get("viewCount"):
+            cls._index.set_boost(KIND_TITLE, doc.get("title", ""), doc["viewCount"])
+
+    @classmethod
+    async def metadata_changed(cls, link_ids: Optional[List[str]]) -> None:
+        """SearchService metadata listener: forget renamed or deleted category names."""
+        if link_ids is None:
+            cls._category_names.clear()
+            await cls._load_category_names()
+            return
+        for link_id in link_ids:
+            cls._category_names.pop(link_id, None)
+        # Reloaded as the re-indexed articles arrive through article_changed
+
+    @classmethod
+    def record_view(cls, title: str) -> None:
+        """Count an article view towards its title's popularity in this worker."""
+        if cls._index is not None:
+            cls._index.boost(KIND_TITLE, title)
+
+    @classmethod
+    async def suggest(cls, query: str, limit: int = 8) -> List[Suggestion]:
+        await SearchService.ensure_kb_indexes()  # Applies other workers' edits via article_changed
+        if cls._index is None:
+            await cls.initialize()
+        return cls._index.lookup(query, limit=limit)
@@ -0,0 +1,104 @@
+# ENHANCEMENT L1 AI TICKET SUMMARY STREAMING - Shared in-flight summary generations
+
+import asyncio
+import json
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+
+class SummaryGeneration:
+    """
+    A single summary generation for one ticket.
+
+    Chunks are buffered as they arrive so that subscribers attaching late
+    replay everything produced so far before following the live stream.
+    """
+
+    def __init__(self, ticket_id: str):
+        self.ticket_id = ticket_id
+        self.chunks: List[str] = []
+        self.done = False
+        self.error: Optional[str] = None
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Condition()
+
+    @property
+    def text(self) -> str:
+        return "".join(self.chunks)
+
+    async def publish(self, chunk: str) -> None:
+        async with self._changed:
+            self.chunks.append(chunk)
+            self._changed.notify_all()
+
+    async def finish(self, error: Optional[str] = None) -> None:
+        async with self._changed:
+            self.done = True
+            self.error = error
+            self._changed.notify_all()
+
+    async def subscribe(self) -> AsyncIterator[str]:
+        """Yield every chunk of the generation, raising if it failed."""
+        position = 0
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: position < len(self.chunks) or self.done)
+                pending = self.chunks[position:]
+                position += len(pending)
+                finished = self.done and position == len(self.chunks)
+
+            for chunk in pending:
+                yield chunk
+
+            if finished:
+                if self.error:
+                    raise RuntimeError(self.error)
+                return
+
+
+class SummaryStreamBroker:
+    """Ensures concurrent requests for the same ticket share one model call."""
+
+    def __init__(self) -> None:
+        self._in_flight: Dict[str, SummaryGeneration] = {}
+
+    def attach(
+        self,
+        ticket_id: str,
+        produce: Callable[[SummaryGeneration], Awaitable[None]],
+    ) -> SummaryGeneration:
+        """
+        Return the in-flight generation for a ticket, starting one with
+        ``produce`` when none is running. The generation runs as its own task
+        so it completes (and persists) even if every subscriber disconnects.
+        """
+        generation = self._in_flight.get(ticket_id)
+        if generation is None:
+            generation = SummaryGeneration(ticket_id)
+            self._in_flight[ticket_id] = generation
+            generation.task = asyncio.create_task(self._run(generation, produce))
+        return generation
+
+    def get(self, ticket_id: str) -> Optional[SummaryGeneration]:
+        return self._in_flight.get(ticket_id)
+
+    async def _run(
+        self,
+        generation: SummaryGeneration,
+        produce: Callable[[SummaryGeneration], Awaitable[None]],
+    ) -> None:
+        try:
+            await produce(generation)
+            await generation.finish()
+        except Exception as e:
+            print(f"Summary generation failed for ticket {generation.ticket_id}: {e}")
+            await generation.finish(error=str(e))
+        finally:
+            self._in_flight.pop(generation.ticket_id, None)
+
+
+def format_sse(event: str, data: dict) -> str:
+    """Encode a single server-sent event frame."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+summary_stream_broker = SummaryStreamBroker()
@@ -1,12 +1,84 @@
 from src.models.tag import Tag
 from src.schemas.tag import TagCreate, TagUpdate, TagResponse
-from typing import List
+from src.db.init_db import get_database
+from beanie import PydanticObjectId
+from fastapi import HTTPException
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, OperationFailure
+from typing import Dict, Iterable, List, Tuple
 
 class TagService:
+    # ENHANCEMENT L2 INTERNED TAGS - One tag document per distinct (key, value)
+    UNIQUE_INDEX_NAME = "tag_key_value"
+
+    @staticmethod
+    def _normalize(key: str, value: str) -> Tuple[str, str]:
+        return (key or "").strip(), (value or "").strip()
+
+    @classmethod
+    def _validated(cls, key: str, value: str) -> Tuple[str, str]:
+        """Normalized (key, value); both must be non-blank."""
+        key, value = cls._normalize(key, value)
+        if not key or not value:
+            raise HTTPException(status_code=400, detail="Tag key and value must not be blank")
+        return key, value
+
+    @classmethod
+    async def ensure_indexes(cls) -> None:
+        db = await get_database()
+        try:
+            await db.tags.create_index([("key", 1), ("value", 1)], unique=True, name=cls.UNIQUE_INDEX_NAME)
+        except OperationFailure as e:
+            # Existing duplicates block the unique index until they are merged
+            print(f"Could not create unique tag index ({e}); run `python -m src.db.migrations.dedup_tags`")
+
+    @classmethod
+    async def intern_tags(cls, pairs: Iterable[Tuple[str, str]]) -> List[Tag]:
+        """
+        Tags for ``(key, value)`` pairs, in order and without repeats,
+        creating the missing ones. One bulk upsert plus one lookup,
+        however many tags are given.
+        """
+        wanted = list(dict.fromkeys(cls._normalize(key, value) for key, value in pairs))
+        wanted = [(key, value) for key, value in wanted if key or value]
+        if not wanted:
+            return []
+
+        db = await get_database()
+        requests = [
+            UpdateOne({"key": key, "value": value}, {"$setOnInsert": {"key": key, "value": value}}, upsert=True)
+            for key, value in wanted
+        ]
+        try:
+            await db.tags.bulk_write(requests, ordered=False)
+        except BulkWriteError as e:
+            # A concurrent upsert of the same pair wins the unique index; anything else is a real failure
+            if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+                raise
+
+        found: Dict[Tuple[str, str], Tag] = {}
+        cursor = db.tags.find({"$or": [{"key": key, "value": value} for key, value in wanted]})
+        async for doc in cursor.sort("_id", 1):
+            # Oldest wins if duplicates predating the unique index are still around
+            found.setdefault((doc["key"], doc["value"]), Tag(id=doc["_id"], key=doc["key"], value=doc["value"]))
+        return [found[pair] for pair in wanted if pair in found]
+
+    @staticmethod
+    async def get_tags_by_ids(tag_ids: Iterable[PydanticObjectId]) -> Dict[str, Tag]:
+        """Tags by id string, in a single ``$in`` query."""
+        ids = list(dict.fromkeys(tag_ids))
+        if not ids:
+            return {}
+        db = await get_database()
+        return {
+            str(doc["_id"]): Tag(id=doc["_id"], key=doc["key"], value=doc["value"])
+            async for doc in db.tags.find({"_id": {"$in": ids}})
+        }
+
     @staticmethod
     async def create_tag(tag_data: TagCreate) -> TagResponse:
-        tag = Tag(**tag_data.dict())
-        await tag.insert()
+        # Creating an existing (key, value) returns that tag rather than a duplicate
+        tag = (await TagService.intern_tags([TagService._validated(tag_data.key, tag_data.value)]))[0]
         tag_dict = tag.model_dump()
         tag_dict["id"] = str(tag.id)
         return TagResponse(**tag_dict)
@@ -27,8 +99,11 @@ class TagService:
         if tag is None:
             return None
         tag_data_dict = tag_data.dict(exclude_unset=True)
-        for k, v in tag_data_dict.items():
-            setattr(tag, k, v)
+        # Same normalization as interning, so the edited pair still matches its unique (key, value) entry
+        tag.key, tag.value = TagService._validated(
+            tag_data_dict.get("key", tag.key),
+            tag_data_dict.get("value", tag.value)
+        )
         await tag.save()
         tag_dict = tag.model_dump()
         tag_dict["id"] = str(tag.id)
@@ -5,10 +5,14 @@ from src.models.subcategory import SubCategory
 from src.models.user import User
 from src.models.agent_info import AgentInfo
 from src.models.enums import TicketStatus
-from src.schemas.ticket import TicketCreate, TicketUpdate, TicketResponse, UserInfo, TagData
+from src.schemas.ticket import TicketCreate, TicketUpdate, TicketResponse, UserInfo, TagData, DuplicateTicketResponse
 from src.schemas.category import CategoryResponse
 from src.schemas.subcategory import SubCategoryResponse
+from src.services.duplicate_service import DuplicateService
+from src.services.file_service import file_service
+from src.core.config import settings
 from beanie import PydanticObjectId, Link
+from beanie.operators import In
 from typing import List, Optional
 from datetime import datetime, timezone, timedelta
 from fastapi import HTTPException
@@ -112,6 +116,8 @@ class TicketService:
             slaPausedAt=ticket.sla_paused_at,
             slaTotalPausedTime=ticket.sla_total_paused_time,
             version=ticket.version,
+            # ENHANCEMENT L2 DUPLICATE DETECTION - Likely duplicates flagged at creation
+            possible_duplicate_ids=ticket.possible_duplicate_ids or [],
             )
 
 
@@ -137,6 +143,10 @@ class TicketService:
         # Handle tags if provided - tags are stored as key-value pairs directly in the ticket
         tag_ids = data.tag_ids if data.tag_ids else []
 
+        # ENHANCEMENT L2 DUPLICATE DETECTION - Link likely duplicates before the AI pipeline runs
+        signature = DuplicateService.signature_for(data.title, data.content.text)
+        duplicates = await DuplicateService.find_duplicates(signature)
+
         # Create ticket with 'new' status and no agent assignment initially
         # Beanie should automatically convert objects to Links based on model definition
         ticket = Ticket(
@@ -149,18 +159,31 @@ class TicketService:
             content=data.content,
             status=TicketStatus.new,
             priority=data.priority,
-            tag_ids=tag_ids
+            tag_ids=tag_ids,
+            minhash_signature=signature.tolist(),
+            possible_duplicate_ids=[duplicate_id for duplicate_id, _ in duplicates]
         )
         
         ticket = await ticket.insert()
+        DuplicateService.add(str(ticket.id), signature)
+        if duplicates:
+            print(f"Ticket {ticket.id} looks like a duplicate of {ticket.possible_duplicate_ids}")
         
         # ENHANCEMENT L2 AI AGENT ASSIGNMENT - Use AI to intelligently assign the ticket
         try:
             print(f"Attempting AI-powered assignment for ticket {ticket.id} in category {category.name}")
             from src.services.assignment_service import AssignmentService
             
-            # Use AI assignment service to find the best agent
-            selected_agent = await AssignmentService.assign_ticket_to_agent(ticket)
+            # ENHANCEMENT L2 DUPLICATE DETECTION - Optionally route likely duplicates to the agent already
+            # working the original, skipping the AI call
+            selected_agent = None
+            if settings.duplicate_routing:
+                selected_agent = await TicketService._agent_for_duplicates(ticket.possible_duplicate_ids)
+            if selected_agent:
+                print(f"Ticket {ticket.id} routed to {selected_agent.email}, who owns an open duplicate")
+            else:
+                # Use AI assignment service to find the best agent
+                selected_agent = await AssignmentService.assign_ticket_to_agent(ticket)
             
             if selected_agent:
                 print(f"AI assigned ticket {ticket.id} to agent {selected_agent.email}")
@@ -188,13 +211,15 @@ class TicketService:
 
         # ENHANCEMENT L1 AI TICKET SUMMARY - Generate initial summary after ticket creation
         try:
-            print(f"Generating AI summary for new ticket {ticket.id}")
-            # Import here to avoid circular imports
-            from src.services.ai_service import AIService
-            import asyncio
-            
-            # Fire and forget - don't wait for summary generation
-            asyncio.create_task(TicketService._generate_initial_summary(str(ticket.id)))
+            if settings.duplicate_routing and ticket.possible_duplicate_ids:
+                # Likely duplicates get their summary on demand instead of eagerly
+                print(f"Skipping eager summary for likely duplicate ticket {ticket.id}")
+            else:
+                print(f"Generating AI summary for new ticket {ticket.id}")
+                import asyncio
+
+                # Fire and forget - don't wait for summary generation
+                asyncio.create_task(TicketService._generate_initial_summary(str(ticket.id)))
         except Exception as e:
             print(f"Failed to start summary generation for ticket {ticket.id}: {e}")
             # Don't fail ticket creation if summary generation fails
@@ -202,6 +227,63 @@ class TicketService:
         
         return await TicketService._build_ticket_response(ticket)
 
+    @staticmethod
+    async def _agent_for_duplicates(duplicate_ids: List[str]) -> Optional[User]:
+        """Agent assigned to the most similar still-open duplicate, if any."""
+        if not duplicate_ids:
+            return None
+
+        open_statuses = [TicketStatus.new, TicketStatus.in_progress, TicketStatus.waiting_for_customer, TicketStatus.waiting_for_agent]
+        duplicates = await Ticket.find(In(Ticket.id, [PydanticObjectId(d) for d in duplicate_ids])).to_list()
+        by_id = {str(d.id): d for d in duplicates}
+
+        for duplicate_id in duplicate_ids:  # Ordered most similar first
+            duplicate = by_id.get(duplicate_id)
+            if duplicate and duplicate.agent_id and duplicate.status in open_statuses:
+                if hasattr(duplicate.agent_id, 'fetch'):
+                    return await duplicate.agent_id.fetch()
+                return duplicate.agent_id
+        return None
+
+    # ENHANCEMENT L2 DUPLICATE DETECTION - Candidate duplicates of an existing ticket
+    @staticmethod
+    async def get_duplicate_candidates(ticket_id: PydanticObjectId, current_user: User) -> List[DuplicateTicketResponse]:
+        ticket = await Ticket.get(ticket_id)
+        if not ticket:
+            raise HTTPException(status_code=404, detail="Ticket not found")
+
+        signature = await DuplicateService.ticket_signature(ticket)
+        matches = await DuplicateService.find_duplicates(signature, exclude=str(ticket.id))
+        if not matches:
+            return []
+
+        candidates = await Ticket.find(In(Ticket.id, [PydanticObjectId(m) for m, _ in matches])).to_list()
+        by_id = {str(c.id): c for c in candidates}
+
+        results = []
+        for candidate_id, similarity in matches:
+            candidate = by_id.get(candidate_id)
+            if not candidate:
+                # Deleted by another worker since it was indexed
+                DuplicateService.remove(candidate_id)
+                continue
+            if not await TicketService._can_access(candidate, current_user):
+                continue  # Only tickets the caller could open themselves
+
+            agent = candidate.agent_id
+            if hasattr(agent, 'fetch') and agent:
+                agent = await agent.fetch()
+
+            results.append(DuplicateTicketResponse(
+                id=str(candidate.id),
+                title=candidate.title,
+                status=candidate.status,
+                similarity=round(similarity, 3),
+                created_at=candidate.created_at,
+                agent_info=UserInfo(id=str(agent.id), email=agent.email, name=(agent.first_name + " " + agent.last_name)) if agent else None,
+            ))
+        return results
+
     @staticmethod
     async def _generate_initial_summary(ticket_id: str):
         """Generate initial AI summary for a new ticket (background task)"""
@@ -329,6 +411,14 @@ class TicketService:
                 detail="Ticket was updated by another user. Refresh and try again."
             )
 
+        # ENHANCEMENT L2 FILE ACL - Attachment access follows the ticket's agent and category
+        if "agent_id" in payload or "category_id" in payload:
+            await file_service.refresh_ticket_acl(str(ticket_id))
+
+        # ENHANCEMENT L2 DUPLICATE DETECTION - Match on the edited text
+        if "title" in payload or "content" in payload:
+            await DuplicateService.refresh_ticket(updated_ticket)
+
         return await TicketService._build_ticket_response(updated_ticket)
 
     @staticmethod
@@ -336,6 +426,8 @@ class TicketService:
         ticket = await Ticket.get(ticket_id)
         if ticket:
             await ticket.delete()
+            DuplicateService.remove(str(ticket_id))
+            await file_service.refresh_ticket_acl(str(ticket_id))  # ENHANCEMENT L2 FILE ACL - Revokes access through it
             return True
         return False
 
@@ -375,6 +467,7 @@ class TicketService:
         ticket.updated_at = datetime.now(timezone.utc)
         
         await ticket.save()
+        await file_service.refresh_ticket_acl(str(ticket_id))  # ENHANCEMENT L2 FILE ACL - The new agent can open attachments
         return await TicketService._build_ticket_response(ticket)
 
     @staticmethod
@@ -616,7 +709,11 @@ class TicketService:
         ticket = await Ticket.get(ticket_id)
         if not ticket:
             return False
-        
+        return await TicketService._can_access(ticket, current_user)
+
+    @staticmethod
+    async def _can_access(ticket: Ticket, current_user: User) -> bool:
+        """Access rules of ``can_access_ticket`` for an already loaded ticket"""
         if current_user.role == "user":
             # Users can only access their own tickets
             if hasattr(ticket.user_id, 'id'):
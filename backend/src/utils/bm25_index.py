@@ -0,0 +1,257 @@
+"""
+ENHANCEMENT L2 KB SEARCH
+
+In-memory inverted index with BM25F scoring.
+
+Each document has several text fields (e.g. title, tags, content) with
+their own boost and length normalisation; per-field term frequencies are
+combined into one pseudo-frequency before BM25 saturation, so a term that
+appears in the title counts more than one buried in the body without
+simply adding separate per-field scores. Documents are replaced or
+removed individually, and the whole index exports to a JSON-able dict for
+snapshots.
+"""
+
+import heapq
+import json
+import math
+import os
+import time
+from collections import Counter
+from itertools import chain
+from operator import methodcaller
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from src.utils.text_analysis import analyze
+
+SNAPSHOT_FILE = "bm25.json"
+SNAPSHOT_FORMAT = 3  # 2: metadata carries AI tags for facet counts; 3: and titles for deflection
+
+
+class BM25Index:
+    def __init__(self, field_boosts: Dict[str, float], k1: float = 1.2, b: float = 0.75):
+        self.fields = list(field_boosts)
+        self.boosts = [field_boosts[f] for f in self.fields]
+        self.k1 = k1
+        self.b = b
+
+        # term -> doc_id -> per-field term frequencies
+        self._postings: Dict[str, Dict[str, List[int]]] = {}
+        self._doc_lengths: Dict[str, List[int]] = {}
+        self._doc_terms: Dict[str, List[str]] = {}  # Forward index so removals touch only the doc's own terms
+        self._total_lengths = [0] * len(self.fields)
+        self.metadata: Dict[str, dict] = {}
+        self.versions: Dict[str, str] = {}
+
+        # Per-document length normalisation, valid until the collection statistics change
+        self._norms: Dict[str, List[float]] = {}
+        self._norms_key: Optional[tuple] = None
+
+    def __len__(self) -> int:
+        return len(self._doc_lengths)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._doc_lengths
+
+    def doc_ids(self) -> List[str]:
+        return list(self._doc_lengths)
+
+    def vocabulary_size(self) -> int:
+        return len(self._postings)
+
+    def upsert(self, doc_id: str, fields: Dict[str, str], metadata: Optional[dict] = None, version: Optional[str] = None) -> None:
+        """Index (or re-index) a document from its raw field texts."""
+        self.remove(doc_id)
+
+        lengths = []
+        doc_terms = set()
+        for position, field in enumerate(self.fields):
+            terms = analyze(fields.get(field) or "")
+            lengths.append(len(terms))
+            for term, count in Counter(terms).items():
+                doc_terms.add(term)
+                postings = self._postings.setdefault(term, {})
+                frequencies = postings.get(doc_id)
+                if frequencies is None:
+                    frequencies = postings[doc_id] = [0] * len(self.fields)
+                frequencies[position] = count
+
+        self._doc_lengths[doc_id] = lengths
+        self._doc_terms[doc_id] = list(doc_terms)
+        for position, length in enumerate(lengths):
+            self._total_lengths[position] += length
+        self.metadata[doc_id] = metadata or {}
+        if version is not None:
+            self.versions[doc_id] = version
+
+    def remove(self, doc_id: str) -> None:
+        lengths = self._doc_lengths.pop(doc_id, None)
+        self.metadata.pop(doc_id, None)
+        self.versions.pop(doc_id, None)
+        if lengths is None:
+            return
+
+        for position, length in enumerate(lengths):
+            self._total_lengths[position] -= length
+        for term in self._doc_terms.pop(doc_id, []):
+            postings = self._postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self._postings[term]
+
+    def _idf(self, document_frequency: int) -> float:
+        n = len(self._doc_lengths)
+        return math.log(1 + (n - document_frequency + 0.5) / (document_frequency + 0.5))
+
+    def search(
+        self,
+        query: str,
+        limit: Optional[int] = None,
+        accept: Optional[Callable[[str, dict], bool]] = None,
+    ) -> List[Tuple[str, float]]:
+        """
+        Documents matching any query term, best first. ``accept`` filters
+        candidates on their metadata before scoring.
+        """
+        return self.rank(self.score(query, accept), limit)
+
+    @staticmethod
+    def rank(scores: Dict[str, float], limit: Optional[int] = None) -> List[Tuple[str, float]]:
+        if limit:
+            return heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+    def score(self, query: str, accept: Optional[Callable[[str, dict], bool]] = None) -> Dict[str, float]:
+        """Unordered scores of every accepted document matching any query term."""
+        return self.score_terms(set(analyze(query)), accept)[0]
+
+    def score_terms(
+        self,
+        terms: Iterable[str],
+        accept: Optional[Callable[[str, dict], bool]] = None,
+        max_terms: Optional[int] = None,
+        deadline: Optional[float] = None,
+    ) -> Tuple[Dict[str, float], bool]:
+        """
+        Scores for already-analyzed query terms. With ``max_terms`` only the
+        rarest (highest-IDF) terms are used. With a ``deadline``
+        (``time.perf_counter()`` value) terms are scored rarest first and
+        scoring stops once it passes; the flag is False when terms were
+        skipped for time.
+        """
+        if not self._doc_lengths:
+            return {}, True
+        terms = [term for term in set(terms) if term in self._postings]
+        if max_terms is not None or deadline is not None:
+            terms.sort(key=lambda term: len(self._postings[term]))
+            if max_terms is not None:
+                del terms[max_terms:]
+
+        norms = self._current_norms()
+        scores: Dict[str, float] = {}
+        rejected = set()
+        k1 = self.k1
+
+        for term in terms:
+            if deadline is not None and time.perf_counter() > deadline:
+                return scores, False
+            postings = self._postings[term]
+            idf = self._idf(len(postings))
+            for doc_id, frequencies in postings.items():
+                if doc_id in rejected:
+                    continue
+                if accept is not None and doc_id not in scores and not accept(doc_id, self.metadata[doc_id]):
+                    rejected.add(doc_id)
+                    continue
+
+                doc_norms = norms.get(doc_id)
+                if doc_norms is None:
+                    doc_norms = norms[doc_id] = self._doc_norms(doc_id)
+                weighted_tf = sum(tf * norm for tf, norm in zip(frequencies, doc_norms))
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * weighted_tf * (k1 + 1) / (weighted_tf + k1)
+
+        return scores, True
+
+    def facet_counts(self, doc_ids: Iterable[str], fields: Iterable[str]) -> Dict[str, Counter]:
+        """
+        Count metadata values over ``doc_ids`` (e.g. the keys of ``score``).
+        List-valued metadata counts every element, so lists should hold
+        distinct values. ``None`` values are not counted.
+        """
+        rows = list(map(self.metadata.__getitem__, doc_ids))
+        counts = {}
+        for field in fields:
+            values = list(map(methodcaller("get", field), rows))
+            if any(isinstance(value, list) for value in values):
+                counter = Counter(chain.from_iterable(filter(None, values)))
+            else:
+                counter = Counter(values)
+            counter.pop(None, None)
+            counts[field] = counter
+        return counts
+
+    def _current_norms(self) -> Dict[str, List[float]]:
+        key = (len(self._doc_lengths), tuple(self._total_lengths))
+        if key != self._norms_key:
+            self._norms = {}
+            self._norms_key = key
+        return self._norms
+
+    def _doc_norms(self, doc_id: str) -> List[float]:
+        """Boost divided by the BM25 length normalisation, per field."""
+        n = len(self._doc_lengths)
+        lengths = self._doc_lengths[doc_id]
+        return [
+            boost / (1 - self.b + self.b * length / max(total / n, 1e-9))
+            for boost, length, total in zip(self.boosts, lengths, self._total_lengths)
+        ]
+
+    def export(self) -> dict:
+        """Copy the index state so it can be written off the event loop."""
+        return {
+            "format": SNAPSHOT_FORMAT,
+            "fields": dict(zip(self.fields, self.boosts)),
+            "k1": self.k1,
+            "b": self.b,
+            "postings": {term: dict(postings) for term, postings in self._postings.items()},
+            "doc_lengths": dict(self._doc_lengths),
+            "metadata": dict(self.metadata),
+            "versions": dict(self.versions),
+        }
+
+    @staticmethod
+    def write(directory: str, state: dict) -> None:
+        """Write an exported state atomically (temp file + rename)."""
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, SNAPSHOT_FILE)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as handle:
+            json.dump(state, handle, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, directory: str, field_boosts: Dict[str, float]) -> Optional["BM25Index"]:
+        """Load a snapshot; returns None when missing or built with different fields."""
+        path = os.path.join(directory, SNAPSHOT_FILE)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, encoding="utf-8") as handle:
+                state = json.load(handle)
+        except (OSError, ValueError):
+            return None
+        if state.get("format") != SNAPSHOT_FORMAT or list(state.get("fields", {})) != list(field_boosts):
+            return None
+
+        index = cls(field_boosts, k1=state["k1"], b=state["b"])
+        index._postings = state["postings"]
+        index._doc_lengths = state["doc_lengths"]
+        index.metadata = state["metadata"]
+        index.versions = state["versions"]
+        for lengths in index._doc_lengths.values():
+            for position, length in enumerate(lengths):
+                index._total_lengths[position] += length
+        for term, postings in index._postings.items():
+            for doc_id in postings:
+                index._doc_terms.setdefault(doc_id, []).append(term)
+        return index
@@ -0,0 +1,85 @@
+"""
+ENHANCEMENT L2 BATCH UPLOADS
+
+Content type detection from a file's first bytes ("magic numbers"), so
+validation does not depend on the type the client declares.
+
+``sniff`` returns a concrete MIME type for self-identifying formats,
+``application/zip`` / ``application/x-ole-storage`` for containers whose
+document type depends on the extension, ``text/plain`` for anything that
+decodes as text, and ``None`` for unrecognised binary data.
+
+Text is UTF-8, UTF-16/UTF-32 with a byte order mark, or a single-byte
+encoding (Latin-1, cp1252, ...) without control characters other than
+tab, newline, form feed and carriage return. As in WHATWG MIME sniffing,
+text counts as markup only when it starts with a marker (after
+whitespace and a byte order mark), not when one merely appears in it.
+"""
+
+import codecs
+from typing import Optional
+
+SNIFF_BYTES = 4096
+
+_SIGNATURES = [
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"%PDF-", "application/pdf"),
+    (b"PK\x03\x04", "application/zip"),
+    (b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", "application/x-ole-storage"),
+    (b"MZ", "application/x-msdownload"),
+    (b"\x7fELF", "application/x-executable"),
+    (b"\xcf\xfa\xed\xfe", "application/x-executable"),  # Mach-O
+    (b"#!", "application/x-sh"),
+]
+_MARKUP_MARKERS = ("<!doctype html", "<html", "<script", "<svg", "<?php")
+# UTF-32 first: its little-endian mark starts with the UTF-16 one
+_BOMS = [
+    (codecs.BOM_UTF8, "utf-8"),
+    (codecs.BOM_UTF32_LE, "utf-32-le"),
+    (codecs.BOM_UTF32_BE, "utf-32-be"),
+    (codecs.BOM_UTF16_LE, "utf-16-le"),
+    (codecs.BOM_UTF16_BE, "utf-16-be"),
+]
+_TEXT_CONTROLS = frozenset(b"\t\n\f\r")
+
+
+def _decode(head: bytes, encoding: str) -> Optional[str]:
+    try:
+        # Not final: a multi-byte character cut at the end of the sample is fine
+        return codecs.getincrementaldecoder(encoding)().decode(head, final=False)
+    except UnicodeDecodeError:
+        return None
+
+
+def _text(head: bytes) -> Optional[str]:
+    """The sample decoded as text, or None if it looks binary."""
+    for bom, encoding in _BOMS:
+        if head.startswith(bom):
+            text = _decode(head[len(bom):], encoding)
+            return None if text is None or "\0" in text else text
+    if b"\0" in head:
+        return None
+    text = _decode(head, "utf-8")
+    if text is not None:
+        return text
+    if any((byte < 0x20 and byte not in _TEXT_CONTROLS) or byte == 0x7f for byte in head):
+        return None
+    return head.decode("latin-1")
+
+
+def sniff(head: bytes) -> Optional[str]:
+    """Content type indicated by the first bytes of a file (up to ``SNIFF_BYTES``)."""
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    for signature, content_type in _SIGNATURES:
+        if head.startswith(signature):
+            return content_type
+    text = _text(head)
+    if text is None:
+        return None
+    if text.lstrip().lower().startswith(_MARKUP_MARKERS):
+        return "text/html"
+    return "text/plain"
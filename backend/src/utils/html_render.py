@@ -0,0 +1,225 @@
+"""
+ENHANCEMENT L2 KB RENDERING
+
+Single-pass rendering of editor HTML into the artifacts read paths need:
+sanitized HTML, a table of contents, normalised plain text and a word
+count.
+
+The stdlib ``HTMLParser`` tokenizer streams start tags, end tags and text
+to one handler, which writes all four outputs as it goes; there is no
+DOM. Sanitizing keeps an allow-list of formatting tags and attributes,
+drops the contents of script-like elements, rejects unsafe URL schemes
+and closes unbalanced tags, so the output is well-formed whatever the
+input. Headings get stable ``id`` anchors that the TOC links to.
+
+Everything here is plain data and top-level functions, so ``render_html``
+can run in a worker process.
+"""
+
+import re
+from html import escape
+from html.parser import HTMLParser
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+RENDER_VERSION = 1  # Bump to re-render stored artifacts when the output changes
+
+ALLOWED_TAGS = {
+    "p", "br", "hr", "h1", "h2", "h3", "h4", "h5", "h6", "strong", "b", "em", "i", "u", "s", "strike",
+    "code", "pre", "blockquote", "ul", "ol", "li", "a", "img", "table", "thead", "tbody", "tr", "th", "td",
+    "span", "mark", "sub", "sup", "div",
+}
+ALLOWED_ATTRIBUTES = {
+    "a": {"href", "title", "target"},
+    "img": {"src", "alt", "title", "width", "height"},
+    "ol": {"start"},
+    "td": {"colspan", "rowspan"},
+    "th": {"colspan", "rowspan"},
+    "code": {"class"},
+    "pre": {"class"},
+}
+URL_ATTRIBUTES = {"href", "src"}
+SAFE_SCHEMES = ("http:", "https:", "mailto:", "tel:")
+DROP_CONTENT_TAGS = {"script", "style", "iframe", "object", "embed", "noscript", "template", "svg", "math", "head", "title", "textarea", "select"}
+VOID_TAGS = {"br", "hr", "img"}
+BLOCK_TAGS = {
+    "p", "div", "h1", "h2", "h3", "h4", "h5", "h6", "pre", "blockquote", "ul", "ol", "li",
+    "table", "thead", "tbody", "tr", "hr",
+}
+# Start tag -> open tags it implicitly ends ("<li>a<li>b"); any block also ends an open <p>
+IMPLIED_END = {"li": {"li"}, "tr": {"tr", "td", "th"}, "td": {"td", "th"}, "th": {"td", "th"}}
+SCOPE_TAGS = {"ul", "ol", "table", "thead", "tbody", "blockquote", "div", "pre"}  # Implied ends stop here
+HEADING_LEVELS = {"h1": 1, "h2": 2, "h3": 3, "h4": 4, "h5": 5, "h6": 6}
+
+_SPACE_RE = re.compile(r"[ \t\r\f\v\u00a0]+")
+_BLANK_LINES_RE = re.compile(r"\n\s*\n+")
+_SLUG_RE = re.compile(r"[^\w]+", re.UNICODE)
+_WORD_RE = re.compile(r"\w+(?:['’]\w+)*", re.UNICODE)
+_CLASS_RE = re.compile(r"^language-[\w+#-]+$")
+
+
+class TocEntry(NamedTuple):
+    level: int
+    text: str
+    anchor: str
+
+
+class Rendering(NamedTuple):
+    html: str
+    toc: List[TocEntry]
+    text: str
+    word_count: int
+    version: int = RENDER_VERSION
+
+
+def _safe_url(value: str, tag: str) -> bool:
+    url = "".join(value.split()).lower()  # Browsers ignore whitespace inside schemes ("java\tscript:")
+    if not url or url.startswith(("#", "/", "?")) or ":" not in url.split("/", 1)[0]:
+        return True  # Relative
+    if tag == "img" and url.startswith("data:image/") and not url.startswith("data:image/svg"):
+        return True  # Pasted images
+    return url.startswith(SAFE_SCHEMES)
+
+
+def _slug(text: str) -> str:
+    return _SLUG_RE.sub("-", text.lower()).strip("-_")[:64] or "section"
+
+
+class _Renderer(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.html: List[str] = []
+        self.text: List[str] = []
+        self.toc: List[TocEntry] = []
+        self._open: List[str] = []  # Allowed tags written and not yet closed
+        self._dropping: List[str] = []  # Open script-like tags whose content is discarded
+        self._heading: Optional[Tuple[str, int, List[str]]] = None  # (tag, html position, text parts)
+        self._anchors: Set[str] = set()  # Heading ids already issued
+        self._suffixes: Dict[str, int] = {}  # Last numeric suffix tried per slug
+        self._pre_depth = 0
+
+    # Tokenizer callbacks
+
+    def handle_starttag(self, tag: str, attrs) -> None:
+        if self._dropping or tag in DROP_CONTENT_TAGS:
+            if tag in DROP_CONTENT_TAGS and tag not in VOID_TAGS:
+                self._dropping.append(tag)
+            return
+        if tag in BLOCK_TAGS or tag == "br":
+            self.text.append("\n")
+        if tag not in ALLOWED_TAGS:
+            return
+
+        if tag in IMPLIED_END or tag in BLOCK_TAGS:
+            self._end_implied(tag)
+        if tag == "pre":
+            self._pre_depth += 1
+        if tag in HEADING_LEVELS and self._heading is None:
+            # The id attribute is added at the end tag, once the heading text is known
+            self._heading = (tag, len(self.html), [])
+        self.html.append(f"<{tag}{self._attributes(tag, attrs)}>")
+        if tag not in VOID_TAGS:
+            self._open.append(tag)
+
+    def handle_startendtag(self, tag: str, attrs) -> None:
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag: str) -> None:
+        if self._dropping:
+            if tag in self._dropping:
+                while self._dropping.pop() != tag:
+                    pass
+            return
+        if tag in BLOCK_TAGS:
+            self.text.append("\n")
+        if tag not in self._open:
+            return  # Stray or disallowed end tag
+        # Implicitly close anything left open inside this element
+        while True:
+            open_tag = self._open.pop()
+            self._close(open_tag)
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data: str) -> None:
+        if self._dropping or not data:
+            return
+        self.html.append(escape(data, quote=False))
+        self.text.append(data if self._pre_depth else data.replace("\n", " "))
+        if self._heading is not None:
+            self._heading[2].append(data)
+
+    def _end_implied(self, tag: str) -> None:
+        ends = IMPLIED_END.get(tag, set()) | ({"p"} if tag in BLOCK_TAGS else set())
+        depth = None
+        for position in range(len(self._open) - 1, -1, -1):
+            if self._open[position] in ends:
+                depth = position
+            elif self._open[position] in SCOPE_TAGS:
+                break
+        while depth is not None and len(self._open) > depth:
+            self._close(self._open.pop())
+
+    # Output
+
+    def _attributes(self, tag: str, attrs) -> str:
+        allowed = ALLOWED_ATTRIBUTES.get(tag)
+        if not allowed:
+            return ""
+        parts = []
+        for name, value in attrs:
+            if name not in allowed or value is None:
+                continue
+            if name in URL_ATTRIBUTES and not _safe_url(value, tag):
+                continue
+            if name == "class" and not all(_CLASS_RE.match(cls) for cls in value.split()):
+                continue
+            parts.append(f' {name}="{escape(value)}"')
+        if tag == "a" and any(name == "target" for name, _ in attrs):
+            parts.append(' rel="noopener noreferrer"')
+        return "".join(parts)
+
+    def _close(self, tag: str) -> None:
+        self.html.append(f"</{tag}>")
+        if tag == "pre":
+            self._pre_depth -= 1
+        if self._heading is not None and self._heading[0] == tag:
+            _, position, parts = self._heading
+            self._heading = None
+            text = " ".join("".join(parts).split())
+            if not text:
+                return
+            base = anchor = _slug(text)
+            # A literal "Setup 2" heading can already own "setup-2", so keep counting until the id is free
+            while anchor in self._anchors:
+                self._suffixes[base] = self._suffixes.get(base, 1) + 1
+                anchor = f"{base}-{self._suffixes[base]}"
+            self._anchors.add(anchor)
+            self.html[position] = f'<{tag} id="{anchor}">'
+            self.toc.append(TocEntry(HEADING_LEVELS[tag], text, anchor))
+
+    def finish(self) -> Rendering:
+        self.close()
+        while self._open:
+            self._close(self._open.pop())
+        lines = (_SPACE_RE.sub(" ", line).strip() for line in "".join(self.text).split("\n"))
+        text = _BLANK_LINES_RE.sub("\n\n", "\n".join(lines)).strip()
+        return Rendering(
+            html="".join(self.html),
+            toc=self.toc,
+            text=text,
+            word_count=len(_WORD_RE.findall(text)),
+        )
+
+
+def render_html(html: str) -> Rendering:
+    """Sanitized HTML, table of contents, plain text and word count of editor HTML."""
+    renderer = _Renderer()
+    renderer.feed(html or "")
+    return renderer.finish()
+
+
+def render_text(text: str) -> Rendering:
+    """Rendering of plain text, one paragraph per line (for content that has no HTML)."""
+    return render_html("".join(f"<p>{escape(line)}</p>" for line in (text or "").split("\n") if line.strip()))
@@ -0,0 +1,87 @@
+"""
+ENHANCEMENT L2 FILE ETAGS
+
+Conditional request helpers (RFC 9110, section 13) for immutable
+downloads: ETag / Last-Modified validators, ``If-None-Match`` /
+``If-Modified-Since`` for 304 responses and ``If-Range`` for resumed
+range requests. Also ``Accept-Encoding`` negotiation (section 12.5.3)
+for content stored compressed.
+"""
+
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Mapping, Optional
+
+
+def http_date(value: datetime) -> str:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)  # MongoDB datetimes are naive UTC
+    return format_datetime(value.astimezone(timezone.utc).replace(microsecond=0), usegmt=True)
+
+
+def _parse_date(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    # asctime dates and "-0000" parse naive; HTTP dates are always UTC
+    return parsed.replace(tzinfo=timezone.utc) if parsed.tzinfo is None else parsed
+
+
+def etag_matches(header: str, etag: str, weak: bool = True) -> bool:
+    """Whether an ``If-None-Match``-style list names ``etag`` (weak comparison unless ``weak`` is False)."""
+    if header.strip() == "*":
+        return True
+    for tag in header.split(","):
+        tag = tag.strip()
+        if weak:
+            if tag.removeprefix("W/") == etag.removeprefix("W/"):
+                return True
+        elif tag == etag and not tag.startswith("W/"):
+            return True
+    return False
+
+
+def not_modified(headers: Mapping[str, str], etag: str, last_modified: datetime) -> bool:
+    """True when the client's cached copy is current. ``If-None-Match`` takes precedence over dates."""
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+    since = _parse_date(headers.get("if-modified-since"))
+    return since is not None and _parse_date(http_date(last_modified)) <= since
+
+
+def if_range_allows(headers: Mapping[str, str], etag: str, last_modified: datetime) -> bool:
+    """Whether a ``Range`` header may be honoured: no ``If-Range``, or it still names this representation."""
+    if_range = headers.get("if-range")
+    if not if_range:
+        return True
+    if if_range.strip().startswith(('"', 'W/"')):
+        return etag_matches(if_range, etag, weak=False)
+    since = _parse_date(if_range)
+    return since is not None and _parse_date(http_date(last_modified)) == since
+
+
+def accepts_encoding(header: Optional[str], coding: str) -> bool:
+    """Whether an ``Accept-Encoding`` header allows ``coding`` (named, or via ``*``, with a non-zero q)."""
+    if not header:
+        return False
+    wildcard = None
+    for item in header.split(","):
+        name, _, params = item.partition(";")
+        name = name.strip().lower()
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name == coding or (coding == "gzip" and name == "x-gzip"):
+            return quality > 0
+        if name == "*":
+            wildcard = quality > 0
+    return bool(wildcard)
@@ -0,0 +1,46 @@
+"""
+ENHANCEMENT L2 STREAMING DOWNLOADS
+
+``Range`` request header parsing (RFC 9110, section 14) for byte ranges.
+Only single ranges are served as 206; multi-range requests get the whole
+representation, which the RFC allows.
+"""
+
+from typing import Optional, Tuple
+
+
+class RangeNotSatisfiable(Exception):
+    """The requested range lies entirely beyond the end of the content."""
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Inclusive ``(start, end)`` byte positions requested by ``header`` for
+    content of ``size`` bytes, or None when the whole content should be
+    sent (no header, an unsupported unit, multiple ranges or a malformed
+    value). Raises ``RangeNotSatisfiable`` for a valid but unsatisfiable range.
+    """
+    if not header:
+        return None
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, dash, last = spec.strip().partition("-")
+    if not dash:
+        return None
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else max(size - 1, start)
+            if start < 0 or end < start:
+                return None
+        else:
+            suffix = int(last)  # Last N bytes
+            if suffix <= 0:
+                raise RangeNotSatisfiable()
+            start, end = max(size - suffix, 0), size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable()
+    return start, min(end, size - 1)
@@ -0,0 +1,73 @@
+"""
+ENHANCEMENT L2 FILE PREVIEWS
+
+Thumbnails and web-optimized previews of uploaded images.
+
+``make_previews`` decodes an image once and produces every requested size
+from it, largest first, each downscaled from the previous one rather than
+from the original. JPEGs are decoded with ``draft`` straight at a reduced
+scale when the largest preview allows it, which skips most of the IDCT
+work on big photos. EXIF orientation is applied before resizing, and
+EXIF metadata is not copied to the output.
+
+Output is WebP when Pillow was built with it, otherwise JPEG (or PNG for
+images with transparency). Everything is a top-level function on bytes,
+so it runs in a worker process.
+"""
+
+import io
+from typing import Dict, NamedTuple, Tuple
+
+from PIL import Image, ImageOps, features
+
+PREVIEW_VERSION = 1  # Bump to regenerate stored previews when the output changes
+MAX_PIXELS = 50_000_000  # Larger images are rejected instead of decoded (decompression bombs)
+WEBP_QUALITY = 80
+JPEG_QUALITY = 82
+
+
+class Preview(NamedTuple):
+    data: bytes
+    content_type: str
+    width: int
+    height: int
+
+
+def _encode(image: Image.Image) -> Tuple[bytes, str]:
+    buffer = io.BytesIO()
+    if features.check("webp"):
+        image.save(buffer, "WEBP", quality=WEBP_QUALITY, method=4)
+        return buffer.getvalue(), "image/webp"
+    if image.mode == "RGBA":
+        image.save(buffer, "PNG", optimize=True)
+        return buffer.getvalue(), "image/png"
+    image.save(buffer, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+    return buffer.getvalue(), "image/jpeg"
+
+
+def make_previews(data: bytes, sizes: Dict[str, int]) -> Dict[str, Preview]:
+    """
+    Previews of an image fitting within ``sizes`` (name -> longest side in
+    pixels), never upscaled. Animated images use their first frame. Raises
+    ``ValueError`` for data that is not a decodable image.
+    """
+    try:
+        image = Image.open(io.BytesIO(data))
+        if image.width * image.height > MAX_PIXELS:
+            raise ValueError(f"Image too large to preview ({image.width}x{image.height})")
+        largest = max(sizes.values())
+        if image.format == "JPEG":
+            image.draft("RGB", (largest, largest))  # Decode at 1/2, 1/4 or 1/8 scale when that is still large enough
+        image = ImageOps.exif_transpose(image)
+        # Palette and CMYK images would resize with nearest-neighbour or not encode at all
+        has_alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+        image = image.convert("RGBA" if has_alpha else "RGB")
+    except (OSError, Image.DecompressionBombError) as e:
+        raise ValueError(f"Cannot decode image: {e}") from e
+
+    previews = {}
+    for name, side in sorted(sizes.items(), key=lambda item: -item[1]):
+        image.thumbnail((side, side), Image.Resampling.LANCZOS, reducing_gap=3.0)
+        encoded, content_type = _encode(image)
+        previews[name] = Preview(encoded, content_type, image.width, image.height)
+    return previews
@@ -0,0 +1,226 @@
+"""
+ENHANCEMENT L2 KB SUGGEST
+
+Sorted-array prefix index for search-box autocomplete.
+
+Each suggestion is indexed under every word boundary of its normalised
+text ("reset vpn password", "vpn password", "password"), so typing the
+start of any word finds it. Lookups are two binary searches for the
+matching key range; small ranges are ranked directly, while the top
+results of large ranges (short or very common prefixes) are memoised and
+patched in place as entries are added, removed or change popularity, so
+the hot path never rescans thousands of keys. The same suggestion text can
+be contributed by many owners (e.g. a tag used by several articles); it is
+stored once and reference-counted, and its popularity is the number of
+owners plus any explicit boosts.
+"""
+
+import heapq
+import re
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+_SPACE_RE = re.compile(r"\s+")
+_PUNCT_RE = re.compile(r"[^\w\s:\-]+", re.UNICODE)
+
+
+def normalize(text: str) -> str:
+    return _SPACE_RE.sub(" ", _PUNCT_RE.sub(" ", text.lower())).strip()
+
+
+class Suggestion(NamedTuple):
+    text: str
+    kind: str
+    ref_id: Optional[str]
+    popularity: float
+
+
+class _Entry:
+    __slots__ = ("text", "kind", "ref_id", "owners", "boost", "keys")
+
+    def __init__(self, text: str, kind: str, ref_id: Optional[str], keys: List[str]):
+        self.text = text
+        self.kind = kind
+        self.ref_id = ref_id
+        self.owners: Set[str] = set()
+        self.boost = 0.0
+        self.keys = keys
+
+    @property
+    def popularity(self) -> float:
+        return len(self.owners) + self.boost
+
+
+EntryKey = Tuple[str, str]  # (kind, normalised text)
+
+
+class PrefixIndex:
+    MEMO_SIZE = 20  # Results kept per memoised prefix; the largest limit callers may ask for
+
+    def __init__(self, memo_threshold: int = 64):
+        self.memo_threshold = memo_threshold
+        self._keys: List[Tuple[str, EntryKey]] = []  # Sorted (word-boundary key, entry)
+        self._entries: Dict[EntryKey, _Entry] = {}
+        self._owned: Dict[str, Set[EntryKey]] = {}
+        self._memo: Dict[str, List[EntryKey]] = {}  # Prefix -> ranked entries, for large key ranges
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _boundary_keys(normalized: str) -> List[str]:
+        keys = [normalized]
+        for match in re.finditer(r"[\s:\-]+", normalized):
+            tail = normalized[match.end():]
+            if tail:
+                keys.append(tail)
+        return list(dict.fromkeys(keys))
+
+    def _add(self, owner: str, text: str, kind: str, ref_id: Optional[str], bulk: bool = False) -> Optional[EntryKey]:
+        normalized = normalize(text)
+        if not normalized:
+            return None
+        entry_key = (kind, normalized)
+        entry = self._entries.get(entry_key)
+        if entry is None:
+            entry = self._entries[entry_key] = _Entry(text.strip(), kind, ref_id, self._boundary_keys(normalized))
+            for key in entry.keys:
+                if bulk:
+                    self._keys.append((key, entry_key))
+                else:
+                    insort(self._keys, (key, entry_key))
+        if owner not in entry.owners:
+            entry.owners.add(owner)
+            if not bulk:
+                self._popularity_increased(entry_key)
+        return entry_key
+
+    def _release(self, owner: str, entry_key: EntryKey) -> None:
+        entry = self._entries.get(entry_key)
+        if entry is None:
+            return
+        entry.owners.discard(owner)
+        self._invalidate(entry_key)
+        if entry.owners:
+            return
+        del self._entries[entry_key]
+        for key in entry.keys:
+            position = bisect_left(self._keys, (key, entry_key))
+            if position < len(self._keys) and self._keys[position] == (key, entry_key):
+                del self._keys[position]
+
+    def set_owner(self, owner: str, suggestions: Iterable[Tuple[str, str, Optional[str]]]) -> None:
+        """Replace everything ``owner`` contributes with ``(text, kind, ref_id)`` suggestions."""
+        previous = self._owned.pop(owner, set())
+        current = set()
+        for text, kind, ref_id in suggestions:
+            entry_key = self._add(owner, text, kind, ref_id)
+            if entry_key:
+                current.add(entry_key)
+        for entry_key in previous - current:
+            self._release(owner, entry_key)
+        if current:
+            self._owned[owner] = current
+
+    def build(self, owners: Iterable[Tuple[str, Iterable[Tuple[str, str, Optional[str]]]]]) -> None:
+        """Bulk-load an empty index, sorting the key array once at the end."""
+        for owner, suggestions in owners:
+            current = {
+                entry_key for entry_key in (
+                    self._add(owner, text, kind, ref_id, bulk=True) for text, kind, ref_id in suggestions
+                ) if entry_key
+            }
+            if current:
+                self._owned[owner] = current
+        self._keys.sort()
+        self._memo.clear()
+        self._warm()
+
+    def _warm(self, max_length: int = 2) -> None:
+        """Precompute rankings for the one- and two-letter prefixes that every typed query starts with."""
+        for length in range(1, max_length + 1):
+            position = 0
+            while position < len(self._keys):
+                prefix = self._keys[position][0][:length]
+                if len(prefix) < length:
+                    position += 1
+                    continue
+                hi = bisect_left(self._keys, (prefix + "\U0010ffff",), position)
+                if hi - position > self.memo_threshold:
+                    self._memo[prefix] = self._ranked_range(prefix, position, hi, self.MEMO_SIZE)
+                position = hi
+
+    def remove_owner(self, owner: str) -> None:
+        for entry_key in self._owned.pop(owner, set()):
+            self._release(owner, entry_key)
+
+    def boost(self, kind: str, text: str, amount: float = 1.0) -> None:
+        self.set_boost(kind, text, None, amount)
+
+    def set_boost(self, kind: str, text: str, value: Optional[float], amount: float = 0.0) -> None:
+        entry_key = (kind, normalize(text))
+        entry = self._entries.get(entry_key)
+        if entry is None:
+            return
+        previous = entry.boost
+        entry.boost = previous + amount if value is None else value
+        if entry.boost > previous:
+            self._popularity_increased(entry_key)
+        elif entry.boost < previous:
+            self._invalidate(entry_key)
+
+    def _memoised_prefixes(self, entry_key: EntryKey):
+        entry = self._entries.get(entry_key)
+        if entry is None or not self._memo:
+            return
+        seen = set()
+        for key in entry.keys:
+            for end in range(1, len(key) + 1):
+                prefix = key[:end]
+                if prefix in self._memo and prefix not in seen:
+                    seen.add(prefix)
+                    yield prefix
+
+    def _popularity_increased(self, entry_key: EntryKey) -> None:
+        # The entry can only move up, so patch memoised rankings in place
+        for prefix in list(self._memoised_prefixes(entry_key)):
+            ranked = self._memo[prefix]
+            if entry_key not in ranked:
+                ranked.append(entry_key)
+            ranked.sort(key=lambda candidate: self._rank(candidate, prefix))
+            del ranked[self.MEMO_SIZE:]
+
+    def _invalidate(self, entry_key: EntryKey) -> None:
+        # Entries outside a memoised list might now outrank it; recompute lazily
+        for prefix in list(self._memoised_prefixes(entry_key)):
+            if entry_key in self._memo[prefix]:
+                del self._memo[prefix]
+
+    def _rank(self, entry_key: EntryKey, prefix: str) -> tuple:
+        # Most popular first, then matches at the very start of the text, then shorter texts
+        return (-self._entries[entry_key].popularity, not entry_key[1].startswith(prefix), len(entry_key[1]))
+
+    def _ranked_range(self, prefix: str, lo: int, hi: int, limit: int) -> List[EntryKey]:
+        matches = {entry_key for _, entry_key in self._keys[lo:hi]}
+        return heapq.nsmallest(limit, matches, key=lambda entry_key: self._rank(entry_key, prefix))
+
+    def lookup(self, prefix: str, limit: int = 8) -> List[Suggestion]:
+        """Most popular suggestions with a word starting with ``prefix``."""
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        limit = min(limit, self.MEMO_SIZE)
+
+        ranked = self._memo.get(prefix)
+        if ranked is None:
+            lo = bisect_left(self._keys, (prefix,))
+            hi = bisect_left(self._keys, (prefix + "\U0010ffff",), lo)
+            if hi - lo <= self.memo_threshold:
+                ranked = self._ranked_range(prefix, lo, hi, limit)
+            else:
+                ranked = self._memo[prefix] = self._ranked_range(prefix, lo, hi, self.MEMO_SIZE)
+
+        return [
+            Suggestion(entry.text, entry.kind, entry.ref_id, entry.popularity)
+            for entry in (self._entries[entry_key] for entry_key in ranked[:limit])
+        ]
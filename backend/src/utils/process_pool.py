@@ -0,0 +1,47 @@
+"""
+ENHANCEMENT L2 KB RENDERING
+
+Shared process pool for CPU-bound work (HTML rendering, image
+processing) that would otherwise hold the GIL and stall the event loop.
+
+Workers are started lazily with the ``spawn`` method, so they never
+inherit the parent's event loop, MongoDB client threads or open sockets.
+A pool whose worker died is replaced on the next call.
+"""
+
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+
+from src.core.config import settings
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def _pool() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        workers = settings.cpu_pool_workers or min(4, os.cpu_count() or 1)
+        _executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    return _executor
+
+
+async def run_in_process(fn: Callable[..., Any], *args: Any) -> Any:
+    """Run a picklable top-level ``fn(*args)`` in the pool."""
+    global _executor
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(_pool(), fn, *args)
+    except BrokenProcessPool:
+        _executor = None
+        return await loop.run_in_executor(_pool(), fn, *args)
+
+
+def shutdown() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
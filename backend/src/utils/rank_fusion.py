@@ -0,0 +1,32 @@
+"""
+ENHANCEMENT L2 KB HYBRID SEARCH
+
+Weighted reciprocal rank fusion (Cormack et al., 2009).
+
+Each ranked list contributes ``weight / (k + rank)`` to every document it
+contains (ranks start at 1), so documents near the top of several lists
+win without having to calibrate the lists' raw scores against each other.
+A larger ``k`` flattens the difference between top and lower ranks.
+"""
+
+import heapq
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+def reciprocal_rank_fusion(
+    rankings: Iterable[Tuple[float, Sequence[str]]],
+    k: int = 60,
+    limit: Optional[int] = None,
+) -> List[Tuple[str, float]]:
+    """Fuse ``(weight, ranked ids)`` lists into ``(id, fused score)`` pairs, best first."""
+    scores: Dict[str, float] = {}
+    for weight, ranked in rankings:
+        if weight <= 0:
+            continue
+        for rank, doc_id in enumerate(ranked, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + weight / (k + rank)
+
+    if limit:
+        return heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
@@ -0,0 +1,54 @@
+"""
+ENHANCEMENT L2 KB RESULT CACHE
+
+Size-bounded LRU cache of serialized responses stamped with the data
+generation they were computed at. A lookup at a newer generation is a
+miss, so entries never need explicit invalidation; stale ones are dropped
+when touched or pushed out by LRU eviction.
+"""
+
+from collections import OrderedDict
+from typing import Hashable, Optional, Tuple
+
+
+class GenerationLRUCache:
+    def __init__(self, max_entries: int = 256, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Tuple[int, bytes]]" = OrderedDict()
+        self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, generation: int) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != generation:
+            if entry is not None:
+                self._drop(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: Hashable, generation: int, body: bytes) -> None:
+        if len(body) > self.max_bytes:
+            return
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = (generation, body)
+        self._bytes += len(body)
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+
+    def _drop(self, key: Hashable) -> None:
+        _, body = self._entries.pop(key)
+        self._bytes -= len(body)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
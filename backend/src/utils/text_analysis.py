@@ -0,0 +1,193 @@
+"""
+ENHANCEMENT L2 KB SEARCH
+
+Text analysis shared by the knowledge base search indexes: tokenization,
+stopword removal, Porter stemming and snippet highlighting.
+"""
+
+import html
+import re
+from functools import lru_cache
+from typing import List
+
+_TOKEN_RE = re.compile(r"[^\W_]+", re.UNICODE)
+
+STOPWORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being below
+between both but by can could did do does doing down during each few for from further had has have
+having he her here hers herself him himself his how i if in into is it its itself just me more most
+my myself no nor not now of off on once only or other our ours ourselves out over own same she
+should so some such than that the their theirs them themselves then there these they this those
+through to too under until up very was we were what when where which while who whom why will with
+would you your yours yourself yourselves
+""".split())
+
+_VOWELS = frozenset("aeiou")
+
+
+def _is_consonant(word: str, i: int) -> bool:
+    if word[i] in _VOWELS:
+        return False
+    if word[i] == "y":
+        return i == 0 or not _is_consonant(word, i - 1)
+    return True
+
+
+def _measure(stem: str) -> int:
+    """Number of vowel-consonant sequences (Porter's m)."""
+    m, previous_vowel = 0, False
+    for i in range(len(stem)):
+        vowel = not _is_consonant(stem, i)
+        if previous_vowel and not vowel:
+            m += 1
+        previous_vowel = vowel
+    return m
+
+
+def _has_vowel(stem: str) -> bool:
+    return any(not _is_consonant(stem, i) for i in range(len(stem)))
+
+
+def _ends_double_consonant(word: str) -> bool:
+    return len(word) >= 2 and word[-1] == word[-2] and _is_consonant(word, len(word) - 1)
+
+
+def _ends_cvc(word: str) -> bool:
+    return (
+        len(word) >= 3
+        and _is_consonant(word, len(word) - 3)
+        and not _is_consonant(word, len(word) - 2)
+        and _is_consonant(word, len(word) - 1)
+        and word[-1] not in "wxy"
+    )
+
+
+def _replace(word: str, suffixes, min_measure: int) -> str:
+    for suffix, replacement in suffixes:
+        if word.endswith(suffix):
+            stem = word[:-len(suffix)] if suffix else word
+            return stem + replacement if _measure(stem) > min_measure else word
+    return word
+
+
+_STEP2 = [
+    ("ational", "ate"), ("tional", "tion"), ("enci", "ence"), ("anci", "ance"), ("izer", "ize"),
+    ("abli", "able"), ("alli", "al"), ("entli", "ent"), ("eli", "e"), ("ousli", "ous"),
+    ("ization", "ize"), ("ation", "ate"), ("ator", "ate"), ("alism", "al"), ("iveness", "ive"),
+    ("fulness", "ful"), ("ousness", "ous"), ("aliti", "al"), ("iviti", "ive"), ("biliti", "ble"),
+]
+_STEP2.sort(key=lambda pair: len(pair[0]), reverse=True)
+
+_STEP3 = [
+    ("icate", "ic"), ("ative", ""), ("alize", "al"), ("iciti", "ic"), ("ical", "ic"), ("ful", ""), ("ness", ""),
+]
+
+_STEP4 = sorted([
+    "al", "ance", "ence", "er", "ic", "able", "ible", "ant", "ement", "ment", "ent",
+    "ion", "ou", "ism", "ate", "iti", "ous", "ive", "ize",
+], key=len, reverse=True)
+
+
+@lru_cache(maxsize=65536)
+def stem(word: str) -> str:
+    """Porter (1980) stemmer for lowercase English words."""
+    if len(word) <= 2 or not word.isalpha():
+        return word
+
+    # Step 1a: plurals
+    if word.endswith("sses"):
+        word = word[:-2]
+    elif word.endswith("ies"):
+        word = word[:-2]
+    elif word.endswith("s") and not word.endswith("ss"):
+        word = word[:-1]
+
+    # Step 1b: -ed / -ing
+    step1b_trimmed = False
+    if word.endswith("eed"):
+        if _measure(word[:-3]) > 0:
+            word = word[:-1]
+    elif word.endswith("ed") and _has_vowel(word[:-2]):
+        word, step1b_trimmed = word[:-2], True
+    elif word.endswith("ing") and _has_vowel(word[:-3]):
+        word, step1b_trimmed = word[:-3], True
+
+    if step1b_trimmed:
+        if word.endswith(("at", "bl", "iz")):
+            word += "e"
+        elif _ends_double_consonant(word) and word[-1] not in "lsz":
+            word = word[:-1]
+        elif _measure(word) == 1 and _ends_cvc(word):
+            word += "e"
+
+    # Step 1c: terminal y
+    if word.endswith("y") and _has_vowel(word[:-1]):
+        word = word[:-1] + "i"
+
+    word = _replace(word, _STEP2, 0)
+    word = _replace(word, _STEP3, 0)
+
+    # Step 4: strip derivational suffixes on long stems
+    for suffix in _STEP4:
+        if word.endswith(suffix):
+            stem_part = word[:-len(suffix)]
+            if _measure(stem_part) > 1 and (suffix != "ion" or stem_part.endswith(("s", "t"))):
+                word = stem_part
+            break
+
+    # Step 5: tidy trailing e / double l
+    if word.endswith("e"):
+        stem_part = word[:-1]
+        m = _measure(stem_part)
+        if m > 1 or (m == 1 and not _ends_cvc(stem_part)):
+            word = stem_part
+    if word.endswith("ll") and _measure(word) > 1:
+        word = word[:-1]
+
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens, without stopwords or stemming."""
+    return [token for token in _TOKEN_RE.findall(text.lower()) if token not in STOPWORDS]
+
+
+def analyze(text: str) -> List[str]:
+    """Index/query terms for a piece of text: tokenized, stopword-filtered and stemmed."""
+    return [stem(token) for token in tokenize(text)]
+
+
+_WORD_SPAN_RE = re.compile(r"\S+")
+
+
+def highlight_snippet(text: str, query: str, max_words: int = 30, mark: str = "mark") -> str:
+    """
+    Best window of ``max_words`` words from ``text`` for a query, with the
+    matching words wrapped in ``<mark>``. The text is HTML-escaped. Windows
+    are ranked by how many distinct query terms they contain.
+    """
+    words = _WORD_SPAN_RE.findall(text or "")
+    if not words:
+        return ""
+
+    query_terms = set(analyze(query))
+    word_terms = [set(analyze(word)) & query_terms for word in words]
+
+    best_start, best_score = 0, -1
+    if query_terms:
+        for start in range(0, max(1, len(words) - max_words + 1)):
+            window = set().union(*word_terms[start:start + max_words])
+            if len(window) > best_score:
+                best_start, best_score = start, len(window)
+                if best_score == len(query_terms):
+                    break
+        # Lead with a little context before the first match rather than a full window of it
+        first_match = next((i for i in range(best_start, len(words)) if word_terms[i]), best_start)
+        best_start = max(0, min(first_match - 5, len(words) - max_words))
+
+    end = min(len(words), best_start + max_words)
+    rendered = [
+        f"<{mark}>{html.escape(word)}</{mark}>" if word_terms[i] else html.escape(word)
+        for i, word in enumerate(words[best_start:end], start=best_start)
+    ]
+    return ("... " if best_start > 0 else "") + " ".join(rendered) + (" ..." if end < len(words) else "")
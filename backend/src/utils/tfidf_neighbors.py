@@ -0,0 +1,245 @@
+"""
+ENHANCEMENT L2 KB RELATED ARTICLES
+
+Top-k nearest neighbours by TF-IDF cosine similarity, kept current as
+documents change.
+
+``fit`` builds a sparse CSR matrix of L2-normalised TF-IDF rows
+(sublinear term frequency, smoothed IDF) and computes every row's
+neighbours block by block, so memory stays at ``block_size x n`` dense
+scores. ``upsert`` and ``remove`` then touch only the affected rows: the
+changed document's similarities to all others are one sparse
+matrix-vector product, and another row is recomputed in full only when
+the change pushed one of its current neighbours out of its top k.
+Rows that merely gain the changed document, or keep it with a better
+score, are patched in place. Changed rows are tracked as stale and
+scored directly instead of rebuilding the CSR matrix on every update.
+
+The vocabulary and IDF weights are fixed at ``fit`` time; terms first
+seen in later updates are ignored until the next ``fit``
+(``changes_since_fit`` tells callers when a refit is due).
+"""
+
+import math
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from src.utils.text_analysis import analyze
+
+Neighbor = Tuple[str, float]
+
+
+class TfidfNeighbors:
+    STALE_LIMIT = 256  # Changed rows scored one by one before the CSR matrix is rebuilt
+
+    def __init__(self, k: int = 5, min_score: float = 0.05, block_size: int = 512):
+        self.k = k
+        self.min_score = min_score
+        self.block_size = block_size
+        self.changes_since_fit = 0
+
+        self.vocabulary: Dict[str, int] = {}
+        self.idf = np.zeros(0, dtype=np.float32)
+        self.neighbors: Dict[str, List[Neighbor]] = {}
+
+        self._ids: List[Optional[str]] = []  # Row -> doc id (None for removed rows)
+        self._row_of: Dict[str, int] = {}
+        self._rows: List[Tuple[np.ndarray, np.ndarray]] = []  # Row -> (term indices, weights)
+        self._listed_by: Dict[str, Set[str]] = {}  # Doc id -> ids whose neighbours include it
+        self._matrix: Optional[sparse.csr_matrix] = None
+        self._stale: Set[int] = set()  # Rows changed or added since the matrix was built
+        self._bar = np.zeros(0, dtype=np.float32)  # Row -> score a newcomer must beat to enter its top k
+
+    def __len__(self) -> int:
+        return len(self._row_of)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._row_of
+
+    def listed_by(self, doc_id: str) -> Set[str]:
+        """Ids whose neighbour lists include ``doc_id``."""
+        return set(self._listed_by.get(doc_id, ()))
+
+    # Vectors
+
+    def _vector(self, counts: Counter) -> Tuple[np.ndarray, np.ndarray]:
+        pairs = sorted(
+            (self.vocabulary[term], 1.0 + math.log(count))
+            for term, count in counts.items()
+            if term in self.vocabulary
+        )
+        if not pairs:
+            return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32)
+        indices = np.fromiter((index for index, _ in pairs), dtype=np.int32, count=len(pairs))
+        weights = np.fromiter((tf for _, tf in pairs), dtype=np.float32, count=len(pairs)) * self.idf[indices]
+        norm = float(np.linalg.norm(weights))
+        return indices, weights / norm if norm else weights
+
+    def _csr(self) -> sparse.csr_matrix:
+        if self._matrix is None or len(self._stale) > self.STALE_LIMIT:
+            lengths = [len(indices) for indices, _ in self._rows]
+            indptr = np.zeros(len(self._rows) + 1, dtype=np.int64)
+            np.cumsum(lengths, out=indptr[1:])
+            indices = np.concatenate([row[0] for row in self._rows]) if self._rows else np.zeros(0, dtype=np.int32)
+            data = np.concatenate([row[1] for row in self._rows]) if self._rows else np.zeros(0, dtype=np.float32)
+            self._matrix = sparse.csr_matrix((data, indices, indptr), shape=(len(self._rows), len(self.vocabulary)))
+            self._stale = set()
+        return self._matrix
+
+    def _similarities(self, row: Tuple[np.ndarray, np.ndarray]) -> np.ndarray:
+        """Cosine similarity of one vector to every row."""
+        scores = np.zeros(len(self._rows), dtype=np.float32)
+        if not len(row[0]):
+            return scores
+        matrix = self._csr()
+        dense = np.zeros(len(self.vocabulary), dtype=np.float32)
+        dense[row[0]] = row[1]
+        scores[:matrix.shape[0]] = matrix @ dense
+        for stale_row in self._stale:
+            indices, weights = self._rows[stale_row]
+            scores[stale_row] = float(dense[indices] @ weights) if len(indices) else 0.0
+        return scores
+
+    def _replace_row(self, row: int, vector: Tuple[np.ndarray, np.ndarray]) -> None:
+        if row == len(self._rows):
+            self._rows.append(vector)
+            self._bar = np.append(self._bar, np.float32(self.min_score))
+        else:
+            self._rows[row] = vector
+        self._stale.add(row)
+
+    def _top_k(self, own_row: int, scores: np.ndarray) -> List[Neighbor]:
+        scores = scores.copy()
+        scores[own_row] = -1.0
+        k = min(self.k, len(scores) - 1)
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [
+            (self._ids[row], round(float(scores[row]), 4))
+            for row in top
+            if scores[row] >= self.min_score and self._ids[row] is not None
+        ]
+
+    def _set_neighbors(self, doc_id: str, neighbors: List[Neighbor]) -> bool:
+        previous = self.neighbors.get(doc_id, [])
+        if previous == neighbors:
+            return False
+        for other, _ in previous:
+            self._listed_by.get(other, set()).discard(doc_id)
+        for other, _ in neighbors:
+            self._listed_by.setdefault(other, set()).add(doc_id)
+        self.neighbors[doc_id] = neighbors
+        row = self._row_of.get(doc_id)
+        if row is not None:
+            # Strictly above the k-th score once full; anything at or above min_score until then
+            self._bar[row] = neighbors[-1][1] if len(neighbors) >= self.k else np.nextafter(np.float32(self.min_score), np.float32(0))
+        return True
+
+    # Building
+
+    def fit(self, docs: Iterable[Tuple[str, str]]) -> None:
+        """(Re)build the vocabulary, IDF weights and every row's neighbours."""
+        ids, counts = [], []
+        for doc_id, text in docs:
+            ids.append(doc_id)
+            counts.append(Counter(analyze(text)))
+
+        document_frequency = Counter()
+        for doc_counts in counts:
+            document_frequency.update(doc_counts.keys())
+        n = len(ids)
+        self.vocabulary = {term: index for index, term in enumerate(sorted(document_frequency))}
+        self.idf = np.array(
+            [math.log((1 + n) / (1 + document_frequency[term])) + 1.0 for term in sorted(document_frequency)],
+            dtype=np.float32,
+        )
+
+        self._ids = list(ids)
+        self._row_of = {doc_id: row for row, doc_id in enumerate(ids)}
+        self._rows = [self._vector(doc_counts) for doc_counts in counts]
+        self._matrix = None
+        self._bar = np.full(n, np.nextafter(np.float32(self.min_score), np.float32(0)), dtype=np.float32)
+        self._listed_by = {}
+        self.neighbors = {}
+        self.changes_since_fit = 0
+
+        matrix = self._csr()
+        transposed = matrix.T.tocsc()
+        for start in range(0, n, self.block_size):
+            block = (matrix[start:start + self.block_size] @ transposed).toarray()
+            for offset, scores in enumerate(block):
+                row = start + offset
+                self._set_neighbors(ids[row], self._top_k(row, scores))
+
+    # Incremental updates
+
+    def upsert(self, doc_id: str, text: str) -> Set[str]:
+        """Add or replace a document. Returns the ids whose neighbour lists changed."""
+        vector = self._vector(Counter(analyze(text)))
+        row = self._row_of.get(doc_id)
+        if row is None:
+            row = self._row_of[doc_id] = len(self._ids)
+            self._ids.append(doc_id)
+        self._replace_row(row, vector)
+        self.changes_since_fit += 1
+
+        scores = self._similarities(vector)
+        changed = set()
+        if self._set_neighbors(doc_id, self._top_k(row, scores)):
+            changed.add(doc_id)
+
+        listing = set(self._listed_by.get(doc_id, ()))
+        for other_row in np.flatnonzero(scores > self._bar):
+            other = self._ids[other_row]
+            if other is None or other == doc_id or other in listing:
+                continue
+            # Newly close enough to beat the current k-th neighbour: patch it in
+            current = self.neighbors.get(other, [])
+            score = round(float(scores[other_row]), 4)
+            if score < self.min_score or (len(current) >= self.k and score <= current[-1][1]):
+                continue  # Lost to rounding
+            patched = sorted(current + [(doc_id, score)], key=lambda neighbor: -neighbor[1])[:self.k]
+            if self._set_neighbors(other, patched):
+                changed.add(other)
+
+        for other in list(listing):
+            current = self.neighbors.get(other, [])
+            score = round(float(scores[self._row_of[other]]), 4)
+            if current and score >= current[-1][1] and score >= self.min_score:
+                patched = sorted(
+                    [(n, s) for n, s in current if n != doc_id] + [(doc_id, score)],
+                    key=lambda neighbor: -neighbor[1],
+                )
+            else:
+                # It dropped below the k-th neighbour; something outside the list may now belong in it
+                patched = self._recompute(other)
+            if self._set_neighbors(other, patched):
+                changed.add(other)
+        return changed
+
+    def remove(self, doc_id: str) -> Set[str]:
+        """Drop a document. Returns the ids whose neighbour lists changed."""
+        row = self._row_of.pop(doc_id, None)
+        if row is None:
+            return set()
+        self._set_neighbors(doc_id, [])
+        self.neighbors.pop(doc_id, None)
+        self._ids[row] = None
+        self._replace_row(row, (np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32)))
+        self._bar[row] = np.inf
+        self.changes_since_fit += 1
+
+        changed = set()
+        for other in list(self._listed_by.pop(doc_id, set())):
+            if self._set_neighbors(other, self._recompute(other)):
+                changed.add(other)
+        return changed
+
+    def _recompute(self, doc_id: str) -> List[Neighbor]:
+        row = self._row_of[doc_id]
+        return self._top_k(row, self._similarities(self._rows[row]))